@@ -0,0 +1,140 @@
+from src.rag_service.config import get_app_config
+from src.rag_service.embeddings.local_hf_embeddings import load_local_hf_embeddings
+from src.rag_service.embeddings.onnx_backend import ONNX_QUANTIZATIONS
+from benchmarks.synthetic_rfp import make_passages
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "local_embeddings.json"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=(
+            "로컬 HF 임베딩 모델의 torch/onnx backend 처리량(chunks/s)과 벡터 일치도를 비교합니다."
+        )
+    )
+    parser.add_argument("--chunks", type=int, default=512, help="임베딩할 합성 청크 수")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 횟수 (최고 처리량 사용)")
+    parser.add_argument(
+        "--quantization",
+        default=None,
+        choices=ONNX_QUANTIZATIONS,
+        help="지정하면 onnx int8 양자화 모델도 측정",
+    )
+    parser.add_argument(
+        "--min-cosine", type=float, default=0.999, help="onnx float32 벡터의 torch 대비 최소 코사인"
+    )
+    parser.add_argument(
+        "--min-cosine-int8", type=float, default=0.98, help="onnx int8 벡터의 torch 대비 최소 코사인"
+    )
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="결과 JSON 경로")
+    return parser.parse_args()
+
+
+def measure(
+    backend: str, quantization: Optional[str], texts: List[str], repeat: int
+) -> Tuple[np.ndarray, Dict]:
+    """
+    한 backend로 모델을 로드하고 texts를 반복 임베딩합니다.
+    Returns:
+        (마지막 실행의 벡터, 측정 결과 dict)
+    """
+    start = time.perf_counter()
+    model = load_local_hf_embeddings(backend, quantization)
+    load_s = time.perf_counter() - start
+    model.embed_documents(texts[:8])  # warm-up (ONNX Runtime 세션 초기화, 스레드 풀 생성)
+
+    best = float("inf")
+    vectors = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        vectors = model.embed_documents(texts)
+        best = min(best, time.perf_counter() - start)
+    return np.asarray(vectors, dtype=np.float32), {
+        "load_seconds": round(load_s, 3),
+        "seconds": round(best, 4),
+        "chunks_per_second": round(len(texts) / best, 1),
+    }
+
+
+def agreement(reference: np.ndarray, vectors: np.ndarray) -> Dict:
+    """
+    기준(torch) 벡터와의 일치도를 계산합니다.
+    """
+    ref = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    vec = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    cos = np.sum(ref * vec, axis=1)
+    return {
+        "min_cosine": round(float(cos.min()), 6),
+        "mean_cosine": round(float(cos.mean()), 6),
+        "max_abs_diff": round(float(np.abs(reference - vectors).max()), 6),
+    }
+
+
+def main():
+    args = parse_args()
+    cfg = get_app_config()
+    texts = make_passages(args.chunks)
+
+    runs = [("torch", None), ("onnx", None)]
+    if args.quantization:
+        runs.append(("onnx", args.quantization))
+
+    results: Dict[str, Dict] = {}
+    reference = None
+    failed = False
+    for backend, quant in runs:
+        name = backend if quant is None else f"{backend}-{quant}"
+        print(f"[BENCH] {name} ...")
+        vectors, res = measure(backend, quant, texts, args.repeat)
+        if reference is None:
+            reference = vectors
+        else:
+            res.update(agreement(reference, vectors))
+            threshold = args.min_cosine if quant is None else args.min_cosine_int8
+            if res["min_cosine"] < threshold:
+                print(f"[BENCH] FAIL: {name} min cosine {res['min_cosine']} < {threshold}")
+                failed = True
+        results[name] = res
+
+    base_tput = results["torch"]["chunks_per_second"]
+    print(f"\n=== {cfg.embeddings.model_name}, {len(texts)} chunks ===")
+    print(f"{'backend':<20}{'chunks/s':>10}{'speedup':>9}{'min cos':>10}{'max |diff|':>12}")
+    for name, r in results.items():
+        print(
+            f"{name:<20}{r['chunks_per_second']:>10}{r['chunks_per_second'] / base_tput:>8.2f}x"
+            f"{r.get('min_cosine', ''):>10}{r.get('max_abs_diff', ''):>12}"
+        )
+
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "model": cfg.embeddings.model_name,
+            "chunks": len(texts),
+            "batch_size": cfg.embeddings.batch_size,
+            "num_threads": cfg.local_inference.num_threads,
+            "repeat": args.repeat,
+        },
+        "backends": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n결과 저장: {args.output}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
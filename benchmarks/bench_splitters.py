@@ -0,0 +1,136 @@
+from src.rag_service.chunking.sentence_splitter import SentenceSplitter
+from benchmarks.synthetic_rfp import generate_corpus
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import fitz
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "splitters.json"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="합성 RFP 코퍼스에서 recursive/sentence splitter의 처리량과 청크 품질을 비교합니다."
+    )
+    parser.add_argument("--docs", type=int, default=20, help="합성 PDF 수")
+    parser.add_argument("--pages", type=int, default=20, help="PDF당 페이지 수")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="청크 크기 (글자)")
+    parser.add_argument("--chunk-overlap", type=int, default=150, help="청크 겹침 (글자)")
+    parser.add_argument("--repeat", type=int, default=5, help="반복 횟수 (중앙값 사용)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="결과 JSON 경로")
+    return parser.parse_args()
+
+
+def load_pages(files: List[Path]) -> List[Document]:
+    """
+    로더와 같은 방식(fitz get_text)으로 페이지 텍스트만 추출합니다.
+    """
+    pages = []
+    for fp in files:
+        with fitz.open(fp) as doc:
+            for i, page in enumerate(doc):
+                text = page.get_text("text").strip()
+                if text:
+                    meta = {"source": str(fp), "page": i + 1, "type": "text"}
+                    pages.append(Document(page_content=text, metadata=meta))
+    return pages
+
+
+def ends_at_sentence(chunk: str) -> bool:
+    """
+    청크가 문장 끝(마침표 등 또는 개조식 종결 …함/…음)에서 끝나는지 확인합니다.
+    """
+    tail = chunk.rstrip()
+    return bool(tail) and tail[-1] in ".!?。다함음됨임"
+
+
+def run(split: Callable[[List[Document]], List[Document]], pages, repeat: int) -> Dict:
+    """
+    splitter를 repeat번 실행해 처리량과 청크 통계를 구합니다.
+    """
+    times = []
+    chunks: List[Document] = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        chunks = split(pages)
+        times.append(time.perf_counter() - start)
+    seconds = statistics.median(times)
+    n_bytes = sum(len(p.page_content.encode("utf-8")) for p in pages)
+    sizes = [len(c.page_content) for c in chunks]
+    return {
+        "seconds": round(seconds, 6),
+        "pages_per_second": round(len(pages) / seconds, 1),
+        "mb_per_second": round(n_bytes / 1e6 / seconds, 2),
+        "chunks": len(chunks),
+        "avg_chunk_chars": round(statistics.mean(sizes), 1) if sizes else 0,
+        "sentence_end_ratio": round(
+            sum(ends_at_sentence(c.page_content) for c in chunks) / max(1, len(chunks)), 3
+        ),
+    }
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        files = generate_corpus(corpus_dir, n_docs=args.docs, pages_per_doc=args.pages)
+        pages = load_pages(files)
+
+    recursive = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+    )
+    sentence = SentenceSplitter(args.chunk_size, args.chunk_overlap)
+    merged = SentenceSplitter(args.chunk_size, args.chunk_overlap, merge_pages=True)
+    candidates = {
+        # 현재 splitter.py의 recursive 경로와 같은 호출 방식 (페이지마다 split_documents)
+        "recursive": lambda docs: [c for d in docs for c in recursive.split_documents([d])],
+        "sentence": sentence.split_documents,
+        "sentence_merge_pages": merged.split_documents,
+    }
+
+    results = {}
+    for name, fn in candidates.items():
+        print(f"[BENCH] {name} ...")
+        results[name] = run(fn, pages, args.repeat)
+
+    base = results["recursive"]["seconds"]
+    print(f"\n=== {len(pages)} pages, chunk_size {args.chunk_size} (중앙값, {args.repeat}회) ===")
+    print(
+        f"{'splitter':<22}{'pages/s':>10}{'speedup':>9}{'chunks':>8}"
+        f"{'avg chars':>11}{'sent.end':>10}"
+    )
+    for name, r in results.items():
+        print(
+            f"{name:<22}{r['pages_per_second']:>10}{base / r['seconds']:>8.2f}x{r['chunks']:>8}"
+            f"{r['avg_chunk_chars']:>11}{r['sentence_end_ratio']:>10}"
+        )
+
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "pages": len(pages),
+            "chunk_size": args.chunk_size,
+            "chunk_overlap": args.chunk_overlap,
+            "repeat": args.repeat,
+        },
+        "splitters": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
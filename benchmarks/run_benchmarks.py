@@ -0,0 +1,393 @@
+from src.rag_service.config import get_app_config
+from src.rag_service.chunking.near_dedup import NearDuplicateIndex
+from src.rag_service.chunking.splitter import split_documents
+from src.rag_service.embeddings.batching import BatchedEmbeddings
+from src.rag_service.image_processing.image_to_docs import ImageToDocs
+from src.rag_service.loaders.multimodal_loader import MultiModalLoader
+from src.rag_service.pipelines.manifest import make_chunk_id
+from src.rag_service.pipelines.context_packer import ContextPacker
+from src.rag_service.pipelines.qa_chain import _format_docs, build_rag_chain
+from src.rag_service.pipelines.retrieval import RetrievalEngine
+from src.rag_service.vectorstores import flush_vectorstore, get_vectorstore, upsert_embeddings
+from src.rag_service.vectorstores.lexical_index import (
+    LexicalIndex,
+    get_lexical_index_path,
+    reset_lexical_index,
+)
+from benchmarks.synthetic_rfp import generate_corpus
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import fitz
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel, FakeListLLM
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "results" / "baseline.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "latest.json"
+NOISE_FLOOR_SECONDS = 0.005
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=(
+            "네트워크 없이 합성 RFP PDF와 가짜 임베딩/LLM으로 인덱싱·검색 단계별 성능을 측정합니다."
+        )
+    )
+    parser.add_argument("--docs", type=int, default=6, help="합성 PDF 수")
+    parser.add_argument("--pages", type=int, default=12, help="PDF당 페이지 수")
+    parser.add_argument("--queries", type=int, default=50, help="검색/질의 단계의 질문 수")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 횟수 (단계별 중앙값 사용)")
+    parser.add_argument("--workers", type=int, default=1, help="로드 단계 프로세스 수")
+    parser.add_argument("--dim", type=int, default=384, help="가짜 임베딩 차원")
+    parser.add_argument(
+        "--backend", default="numpy", choices=["numpy", "chroma"], help="벡터저장소 backend"
+    )
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="결과 JSON 경로")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="비교 기준 JSON")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="이번 결과를 비교 기준으로 저장"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="이 비율 이상 느려지면 회귀로 표시"
+    )
+    parser.add_argument(
+        "--fail-on-regression", action="store_true", help="회귀가 있으면 종료 코드 1"
+    )
+    return parser.parse_args()
+
+
+# ---------- 측정 유틸 ----------
+
+
+class StageRecorder:
+    """
+    단계별 소요 시간과 처리 항목 수, 항목별 지연 시간을 기록합니다.
+    """
+
+    def __init__(self):
+        self.runs: Dict[str, List[float]] = {}
+        self.items: Dict[str, int] = {}
+        self.units: Dict[str, str] = {}
+        self.latencies: Dict[str, List[float]] = {}
+
+    def measure(self, name: str, unit: str, fn: Callable[[], int]) -> None:
+        """
+        fn을 실행해 걸린 시간을 기록합니다. fn은 처리한 항목 수를 반환합니다.
+        """
+        start = time.perf_counter()
+        items = fn()
+        self.runs.setdefault(name, []).append(time.perf_counter() - start)
+        self.items[name] = items
+        self.units[name] = unit
+
+    def measure_each(self, name: str, unit: str, fn: Callable, inputs: List) -> List:
+        """
+        입력마다 fn을 실행하여 항목별 지연 시간과 전체 시간을 기록합니다.
+        """
+        outputs, lat = [], []
+        start = time.perf_counter()
+        for x in inputs:
+            t = time.perf_counter()
+            outputs.append(fn(x))
+            lat.append(time.perf_counter() - t)
+        self.runs.setdefault(name, []).append(time.perf_counter() - start)
+        self.items[name] = len(inputs)
+        self.units[name] = unit
+        self.latencies.setdefault(name, []).extend(lat)
+        return outputs
+
+    def report(self) -> Dict[str, Dict]:
+        out = {}
+        for name, runs in self.runs.items():
+            seconds = statistics.median(runs)
+            rec = {
+                "seconds": round(seconds, 6),
+                "runs": [round(r, 6) for r in runs],
+                "items": self.items[name],
+                "unit": self.units[name],
+                "throughput": round(self.items[name] / seconds, 2) if seconds > 0 else None,
+            }
+            lat = self.latencies.get(name)
+            if lat:
+                ms = np.asarray(lat) * 1000
+                rec["latency_ms_p50"] = round(float(np.percentile(ms, 50)), 3)
+                rec["latency_ms_p95"] = round(float(np.percentile(ms, 95)), 3)
+            out[name] = rec
+        return out
+
+
+# ---------- 벤치마크 ----------
+
+
+def make_questions(n: int) -> List[str]:
+    """
+    합성 RFP 내용에 맞는 질문을 만듭니다.
+    """
+    templates = [
+        "{system} 구축 사업의 예산은 얼마인가요?",
+        "{system}의 사업 기간과 하자보수 기간을 알려주세요.",
+        "{system} 보안 요구사항은 무엇인가요?",
+        "제안서 기술능력 평가 배점은?",
+        "REQ-{n:03d} 요구사항의 구분은?",
+    ]
+    systems = ["통합 민원 포털", "차세대 회계 시스템", "빅데이터 분석 플랫폼", "전자문서 관리 시스템"]
+    return [
+        templates[i % len(templates)].format(system=systems[i % len(systems)], n=i % 7 + 1)
+        for i in range(n)
+    ]
+
+
+def configure(tmp: Path, args) -> None:
+    """
+    모든 출력 경로를 임시 디렉토리로 돌리고, 외부 호출/영구 캐시를 끕니다.
+    """
+    cfg = get_app_config()
+    cfg.vectorstore.persist_dir = str(tmp / "db")
+    cfg.vectorstore.backend = args.backend
+    cfg.vectorstore.collection_name = "benchmark"
+    cfg.loader_config.image_processing.image_output_dir = str(tmp / "images")
+    cfg.loader_config.image_processing.caption.cache.enabled = False
+    cfg.embeddings.cache.enabled = False
+    cfg.answer_cache.enabled = False
+
+
+def run_once(files: List[Path], args, rec: StageRecorder, tmp: Path) -> None:
+    """
+    합성 코퍼스에 대해 모든 단계를 한 번 실행합니다.
+    """
+    configure(tmp, args)
+    cfg = get_app_config()
+    n_pages = sum(fitz.open(fp).page_count for fp in files)
+
+    caption_model = FakeListChatModel(responses=["합성 도표 이미지입니다. 추진 체계를 보여줍니다."])
+    loader = MultiModalLoader(image_to_docs=ImageToDocs(chat_model=caption_model))
+
+    # 1) 전체 로드 (텍스트 + 표 + 이미지 + 가짜 캡션)
+    docs = []
+
+    def _load():
+        for _, file_docs in loader.iter_files(files, num_workers=args.workers):
+            docs.extend(file_docs)
+        return n_pages
+
+    rec.measure("load", "pages", _load)
+
+    # 2) 표 추출만
+    def _tables():
+        for fp in files:
+            with fitz.open(fp) as doc:
+                for i, page in enumerate(doc):
+                    if loader._page_may_have_tables(page):
+                        loader._extract_table_docs(page, fp, i)
+        return n_pages
+
+    rec.measure("table_extraction", "pages", _tables)
+
+    # 3) 이미지 추출/필터만 (캡션 제외)
+    def _images():
+        for fp in files:
+            loader.image_filter.reset()
+            with fitz.open(fp) as doc:
+                for i, page in enumerate(doc):
+                    loader._extract_image_items(doc, page, fp, i)
+        return n_pages
+
+    rec.measure("image_extraction", "pages", _images)
+
+    # 4) 분할
+    chunks = []
+
+    def _split():
+        chunks.extend(split_documents(docs))
+        return len(chunks)
+
+    rec.measure("split", "chunks", _split)
+
+    # 4-1) 근사 중복 제거 (MinHash/LSH, 측정만 하고 이후 단계는 전체 청크로 진행)
+    def _near_dedup():
+        index = NearDuplicateIndex.from_config(cfg.ingest.near_dedup)
+        by_source: Dict[str, List] = {}
+        for i, c in enumerate(chunks):
+            by_source.setdefault(c.metadata.get("source"), []).append((make_chunk_id(c, i), c))
+        kept = 0
+        for source, items in by_source.items():
+            keep_ids, _ = index.collapse(source, [x[0] for x in items], [x[1] for x in items])
+            kept += len(keep_ids)
+        print(f"[BENCH] near_dedup: {len(chunks)} chunks → {kept} kept")
+        return len(chunks)
+
+    rec.measure("near_dedup", "chunks", _near_dedup)
+
+    # 5) 임베딩 (가짜 임베딩 + 배치 실행 래퍼)
+    embeddings = BatchedEmbeddings(
+        DeterministicFakeEmbedding(size=args.dim),
+        batch_size=cfg.embeddings.batch_size,
+        max_concurrency=1,
+    )
+    vectors = []
+
+    def _embed():
+        vectors.extend(embeddings.embed_documents([c.page_content for c in chunks]))
+        return len(vectors)
+
+    rec.measure("embed", "chunks", _embed)
+
+    # 6) 저장 (벡터저장소 + BM25 색인)
+    ids = [make_chunk_id(c, i) for i, c in enumerate(chunks)]
+    vectordb = get_vectorstore(embeddings)
+
+    def _write():
+        lexical = LexicalIndex()
+        batch = cfg.ingest.embed_batch_size
+        for s in range(0, len(chunks), batch):
+            upsert_embeddings(
+                vectordb,
+                docs=chunks[s : s + batch],
+                ids=ids[s : s + batch],
+                embeddings=vectors[s : s + batch],
+            )
+            lexical.add(ids[s : s + batch], chunks[s : s + batch])
+        flush_vectorstore(vectordb)
+        lexical.save(get_lexical_index_path())
+        return len(chunks)
+
+    rec.measure("write", "chunks", _write)
+    reset_lexical_index()
+
+    # 7) 검색 (질문 임베딩 + 벡터 검색 + BM25 + RRF)
+    questions = make_questions(args.queries)
+    engine = RetrievalEngine(embeddings=embeddings, vectordb=vectordb)
+    r = cfg.retrieval
+    results = rec.measure_each(
+        "retrieve",
+        "queries",
+        lambda q: engine.retrieve(q, k_text=r.k_text, k_table=r.k_table, k_image=r.k_image),
+        questions,
+    )
+
+    # 8) 컨텍스트 포맷팅 (전체 / 토큰 예산 packing)
+    rec.measure_each("format", "queries", _format_docs, results)
+    packer = ContextPacker.from_config(cfg.context, embeddings, vector_lookup=engine.stored_vectors)
+    packed = rec.measure_each(
+        "pack", "queries", lambda qd: packer.pack(*qd), list(zip(questions, results))
+    )
+    saved = sum(stats["context_tokens_saved"] for _, stats in packed) / max(1, len(packed))
+    print(f"[BENCH] context packing saved {saved:.0f} tokens/query on average")
+
+    # 9) 전체 질의 (가짜 LLM)
+    chain = build_rag_chain(
+        k_text=r.k_text,
+        k_table=r.k_table,
+        k_image=r.k_image,
+        use_cache=False,
+        llm=FakeListLLM(responses=["문서에 따르면 사업 예산은 10억원입니다."]),
+        engine=engine,
+    )
+    rec.measure_each("query", "queries", chain.invoke, questions)
+
+
+# ---------- 기준 비교 ----------
+
+
+def _per_item(stage: Dict) -> float:
+    """
+    항목 하나당 소요 시간(초). 코퍼스 크기가 달라도 비교할 수 있도록 사용합니다.
+    """
+    return stage["seconds"] / max(1, stage["items"])
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    단계별 항목당 소요 시간을 기준 결과와 비교하여 출력하고, 회귀한 단계 이름을 반환합니다.
+    """
+    regressions = []
+    print(f"\n=== 기준 비교 (항목당 ms, 허용 오차 {tolerance:.0%}) ===")
+    print(f"{'stage':<18}{'baseline':>12}{'current':>12}{'change':>10}  status")
+    for name, cur in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        cur_ms = _per_item(cur) * 1000
+        if not base or not base["seconds"]:
+            print(f"{name:<18}{'-':>12}{cur_ms:>12.4f}{'-':>10}  new")
+            continue
+        base_ms = _per_item(base) * 1000
+        ratio = cur_ms / base_ms
+        status = "ok"
+        if max(cur["seconds"], base["seconds"]) < NOISE_FLOOR_SECONDS:
+            # 전체가 수 ms 이하인 단계는 측정 잡음이 커서 판정하지 않음
+            status = "ok (noise)"
+        elif ratio > 1 + tolerance:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            status = "improved"
+        print(f"{name:<18}{base_ms:>12.4f}{cur_ms:>12.4f}{(ratio - 1) * 100:>+9.1f}%  {status}")
+    if current["meta"]["params"] != baseline.get("meta", {}).get("params"):
+        print("(주의: 기준 결과와 벤치마크 파라미터가 다릅니다)")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    rec = StageRecorder()
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        files = generate_corpus(corpus_dir, n_docs=args.docs, pages_per_doc=args.pages)
+        for i in range(args.repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                print(f"[BENCH] run {i + 1}/{args.repeat} ...")
+                run_once(files, args, rec, Path(tmp))
+
+    param_names = ("docs", "pages", "queries", "workers", "dim", "backend")
+    params = {k: v for k, v in vars(args).items() if k in param_names}
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "pymupdf": fitz.VersionBind,
+            "numpy": np.__version__,
+            "repeat": args.repeat,
+            "params": params,
+        },
+        "stages": rec.report(),
+    }
+
+    print(f"\n=== 단계별 결과 (중앙값, {args.repeat}회) ===")
+    print(f"{'stage':<18}{'seconds':>10}{'items':>8}  {'throughput':<20}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, s in result["stages"].items():
+        tput = f"{s['throughput']} {s['unit']}/s"
+        print(
+            f"{name:<18}{s['seconds']:>10.4f}{s['items']:>8}  {tput:<20}"
+            f"{s.get('latency_ms_p50', ''):>9}{s.get('latency_ms_p95', ''):>9}"
+        )
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n결과 저장: {args.output}")
+
+    regressions = []
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"기준 결과 저장: {args.baseline}")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(result, baseline, args.tolerance)
+    else:
+        print(f"기준 결과가 없습니다 ({args.baseline}). --save-baseline으로 만들 수 있습니다.")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
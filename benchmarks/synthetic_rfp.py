@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+from typing import List
+
+import fitz  # PyMuPDF
+
+
+_AGENCIES = ["한국정보화진흥원", "국립중앙도서관", "서울특별시", "한국전력공사", "국민건강보험공단"]
+_SYSTEMS = ["통합 민원 포털", "차세대 회계 시스템", "빅데이터 분석 플랫폼", "전자문서 관리 시스템"]
+_PHRASES = [
+    "본 사업은 {agency}의 {system} 구축을 목적으로 한다.",
+    "사업 예산은 {budget:,}원(부가세 포함)이며 사업 기간은 계약일로부터 {months}개월이다.",
+    "제안사는 요구사항 정의서에 명시된 기능 요구사항을 모두 충족하여야 한다.",
+    "보안 요구사항으로 개인정보 암호화 및 접근 통제 기능을 제공하여야 한다.",
+    "{system}은 웹 표준과 웹 접근성 지침을 준수하여 개발한다.",
+    "하자보수 기간은 검수 완료일로부터 {warranty}개월로 한다.",
+    "데이터 이관 시 기존 시스템의 자료를 누락 없이 전환하여야 한다.",
+    "제안서 평가는 기술능력 평가 {tech}점과 가격 평가 {price}점으로 구성된다.",
+]
+
+
+def _paragraph(rng: random.Random, n_sentences: int) -> str:
+    """
+    RFP 문체의 임의 문단을 만듭니다.
+    """
+    values = {
+        "agency": rng.choice(_AGENCIES),
+        "system": rng.choice(_SYSTEMS),
+        "budget": rng.randrange(100, 5000) * 1_000_000,
+        "months": rng.randrange(6, 25),
+        "warranty": rng.choice([6, 12, 24]),
+        "tech": 80,
+        "price": 20,
+    }
+    return " ".join(rng.choice(_PHRASES).format(**values) for _ in range(n_sentences))
+
+
+def make_passages(n: int, seed: int = 0) -> List[str]:
+    """
+    청크 크기의 RFP 문체 문단을 만듭니다. (PDF 없이 임베딩만 측정할 때 사용)
+    Args:
+        n: 문단 수
+        seed: 난수 시드
+    Returns:
+        길이가 다양한 문단 목록
+    """
+    rng = random.Random(seed)
+    return [_paragraph(rng, rng.randrange(1, 9)) for _ in range(n)]
+
+
+def _draw_table(page: fitz.Page, rng: random.Random, top: float) -> float:
+    """
+    선으로 그린 표(요구사항 목록)를 페이지에 넣습니다. find_tables가 찾을 수 있는 형태입니다.
+    Returns:
+        표 아래쪽 y 좌표
+    """
+    cols = [60, 150, 400, 530]
+    n_rows = rng.randrange(4, 8)
+    row_h = 18
+    header = ["번호", "요구사항", "구분"]
+    for r in range(n_rows + 1):
+        y = top + r * row_h
+        cells = header if r == 0 else [f"REQ-{r:03d}", rng.choice(_SYSTEMS) + " 기능", "필수"]
+        for c, text in enumerate(cells):
+            page.insert_text((cols[c] + 3, y + 13), text, fontname="korea", fontsize=9)
+    bottom = top + (n_rows + 1) * row_h
+    for r in range(n_rows + 2):
+        y = top + r * row_h
+        page.draw_line((cols[0], y), (cols[-1], y))
+    for x in cols:
+        page.draw_line((x, top), (x, bottom))
+    return bottom
+
+
+def _make_image(rng: random.Random, width: int = 240, height: int = 160) -> fitz.Pixmap:
+    """
+    색 블록으로 이루어진 임의의 도표 이미지를 만듭니다.
+    """
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pix.clear_with(255)
+    for _ in range(rng.randrange(3, 8)):
+        x0, y0 = rng.randrange(0, width - 20), rng.randrange(0, height - 20)
+        w, h = rng.randrange(10, 80), rng.randrange(10, 60)
+        color = tuple(rng.randrange(0, 256) for _ in range(3))
+        pix.set_rect(fitz.IRect(x0, y0, min(width, x0 + w), min(height, y0 + h)), color)
+    return pix
+
+
+def generate_corpus(
+    out_dir: str | Path, n_docs: int = 4, pages_per_doc: int = 10, seed: int = 0
+) -> List[Path]:
+    """
+    텍스트, 선으로 그린 표, 이미지가 포함된 합성 RFP PDF를 만듭니다.
+    - 모든 페이지: 본문 문단
+    - 짝수 페이지: 요구사항 표
+    - 3페이지마다: 고유한 도표 이미지
+    - 모든 페이지: 같은 로고 이미지(같은 xref, 반복 이미지 필터 대상)
+    같은 seed로 만들면 항상 같은 파일이 만들어집니다.
+    Args:
+        out_dir: PDF를 저장할 디렉토리
+        n_docs: 문서 수
+        pages_per_doc: 문서당 페이지 수
+        seed: 난수 시드
+    Returns:
+        만든 PDF 경로 목록
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for d in range(n_docs):
+        doc = fitz.open()
+        logo_xref = 0
+        for p in range(pages_per_doc):
+            page = doc.new_page(width=595, height=842)
+            page.insert_text(
+                (60, 60), f"제안요청서 {d + 1} - {p + 1}쪽", fontname="korea", fontsize=14
+            )
+            logo_rect = fitz.Rect(480, 30, 540, 70)
+            if logo_xref:
+                page.insert_image(logo_rect, xref=logo_xref)
+            else:
+                logo_xref = page.insert_image(
+                    logo_rect, pixmap=_make_image(random.Random(seed), 120, 80)
+                )
+            y = 90.0
+            page.insert_textbox(
+                fitz.Rect(60, y, 535, y + 300),
+                _paragraph(rng, 10),
+                fontname="korea",
+                fontsize=10,
+            )
+            y += 310
+            if p % 2 == 0:
+                y = _draw_table(page, rng, y) + 20
+            if p % 3 == 0:
+                page.insert_image(fitz.Rect(60, y, 300, y + 160), pixmap=_make_image(rng))
+                y += 170
+            page.insert_textbox(
+                fitz.Rect(60, y, 535, 800), _paragraph(rng, 5), fontname="korea", fontsize=10
+            )
+        path = out_dir / f"synthetic_rfp_{d + 1:03d}.pdf"
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
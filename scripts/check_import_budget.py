@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# 질문만 하는 실행(run_qa_cli --skip-ingest, run_api)에서 시작 시 import하는 모듈
+QUERY_MODULES = [
+    "src.rag_service.config",
+    "src.rag_service.tracing",
+    "src.rag_service.metrics",
+    "src.rag_service.pipelines.qa_chain",
+    "src.rag_service.pipelines.batch_qa",
+    "src.rag_service.api",
+]
+
+# openai_api 모드로 질문만 할 때 시작 시점에 로드되면 안 되는 모듈
+# (로컬 모델, chroma, PDF/이미지 처리, 실제 LLM/임베딩 client는 처음 사용할 때 import)
+FORBIDDEN = [
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "langchain_huggingface",
+    "langchain_openai",
+    "openai",
+    "langchain_chroma",
+    "chromadb",
+    "fitz",
+    "PIL",
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "ms": elapsed * 1000,
+    "loaded": sorted(m for m in {forbidden!r} if m in sys.modules),
+}}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="openai_api 모드의 질문 전용 시작 import 시간과 불필요한 backend import를 확인합니다."
+    )
+    parser.add_argument(
+        "--budget-ms", type=float, default=1500.0, help="허용하는 import 시간(ms, 중앙값 기준)"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="새 프로세스로 측정할 횟수")
+    return parser.parse_args()
+
+
+def probe() -> dict:
+    """
+    새 인터프리터에서 QUERY_MODULES를 import하고 걸린 시간과 로드된 금지 모듈을 반환합니다.
+    """
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    code = _PROBE.format(modules=QUERY_MODULES, forbidden=FORBIDDEN)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    args = parse_args()
+    results = [probe() for _ in range(max(1, args.runs))]
+    median_ms = statistics.median(r["ms"] for r in results)
+    loaded = sorted({m for r in results for m in r["loaded"]})
+
+    print(f"[IMPORT] query-only startup: median {median_ms:.0f} ms over {len(results)} runs")
+    failed = False
+    if loaded:
+        print(f"[IMPORT] FAIL: backend modules imported at startup: {loaded}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"[IMPORT] FAIL: {median_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
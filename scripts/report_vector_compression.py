@@ -0,0 +1,185 @@
+from src.rag_service.config import get_app_config
+from src.rag_service.embeddings import get_embeddings
+from src.rag_service.vectorstores import get_vectorstore
+from src.rag_service.vectorstores.numpy_store import (
+    NumpyVectorStore,
+    approx_scores,
+    fit_pca,
+    project,
+    quantize,
+)
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="현재 컬렉션에서 벡터 압축 설정별 recall@k와 메모리 사용량을 비교합니다."
+    )
+    parser.add_argument(
+        "--dims", default="0,512,256,128", help="비교할 차원 목록 (0은 원래 차원)"
+    )
+    parser.add_argument(
+        "--quantization", default="none,float16,int8", help="비교할 저장 형식 목록"
+    )
+    parser.add_argument("--k", type=int, default=10, help="recall@k의 k")
+    parser.add_argument("--rescore-multiplier", type=int, default=4, help="재계산 후보 배수")
+    parser.add_argument(
+        "--num-queries", type=int, default=200, help="질문으로 사용할 저장 벡터 수"
+    )
+    parser.add_argument(
+        "--questions", type=Path, default=None, help="질문 목록 파일 (한 줄에 하나, 임베딩 필요)"
+    )
+    parser.add_argument("--output", type=Path, default=None, help="결과를 저장할 JSON 경로")
+    return parser.parse_args()
+
+
+def load_collection_vectors() -> np.ndarray:
+    """
+    현재 설정의 벡터저장소에서 원래 정밀도의 벡터를 모두 읽습니다.
+    Returns:
+        (N, D) 정규화된 float32 벡터
+    """
+    cfg = get_app_config()
+    vectordb = get_vectorstore(None, read_only=True)
+    if isinstance(vectordb, NumpyVectorStore):
+        if vectordb.full is not None:
+            vectors = vectordb.full
+        elif vectordb.quantization == "none" and vectordb.pca_components is None:
+            vectors = vectordb.vectors
+        else:
+            raise SystemExit(
+                "원래 벡터가 저장되어 있지 않습니다. (rescore: true로 인덱싱한 저장소가 필요)"
+            )
+        return project(np.asarray(vectors), None, None)
+
+    collection = vectordb._collection
+    chunks = []
+    batch = 5000
+    for offset in range(0, collection.count(), batch):
+        got = collection.get(include=["embeddings"], limit=batch, offset=offset)
+        chunks.append(np.asarray(got["embeddings"], dtype=np.float32))
+    if not chunks:
+        raise SystemExit(f"컬렉션 {cfg.vectorstore.collection_name}이 비어 있습니다.")
+    return project(np.concatenate(chunks), None, None)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    점수 상위 k개의 행 번호를 점수 순으로 반환합니다.
+    """
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def evaluate(
+    base: np.ndarray,
+    queries: np.ndarray,
+    exclude: np.ndarray | None,
+    dims: int,
+    mode: str,
+    k: int,
+    multiplier: int,
+    reduce: str,
+) -> dict:
+    """
+    하나의 압축 설정에 대해 recall@k(재계산 전/후)와 벡터당 메모리를 구합니다.
+    Args:
+        base: 원래 벡터 (N, D)
+        queries: 질문 벡터 (Q, D)
+        exclude: 질문별로 결과에서 제외할 행 번호 (저장 벡터를 질문으로 쓸 때 자기 자신)
+        dims: 줄일 차원 (0이면 그대로)
+        mode: 저장 형식
+        k: recall@k의 k
+        multiplier: 재계산 후보 배수
+        reduce: 차원 축소 방법 (pca 또는 truncate)
+    Returns:
+        결과 dict
+    """
+    native = base.shape[1]
+    mean = components = None
+    if dims and dims < native:
+        if reduce == "pca":
+            mean, components = fit_pca(base, dims)
+        else:
+            # OpenAI text-embedding-3의 dimensions는 앞쪽 차원을 잘라 정규화한 것과 같음
+            components = np.eye(native, dtype=np.float32)[:dims]
+            mean = np.zeros(native, dtype=np.float32)
+    stored, scales = quantize(project(base, mean, components), mode)
+
+    hits = hits_rescored = 0
+    for i, q in enumerate(queries):
+        exact = base @ q
+        approx = approx_scores(stored, scales, project(q, mean, components)[0])
+        if exclude is not None:
+            exact[exclude[i]] = approx[exclude[i]] = -np.inf
+        truth = set(top_k(exact, k).tolist())
+        cand = top_k(approx, k * multiplier)
+        hits += len(truth & set(cand[:k].tolist()))
+        rescored = cand[np.argsort(-exact[cand])][:k]
+        hits_rescored += len(truth & set(rescored.tolist()))
+
+    n_total = len(queries) * min(k, len(base))
+    bytes_per_vector = stored.nbytes // len(stored) + (4 if scales is not None else 0)
+    return {
+        "dims": int(stored.shape[1]),
+        "quantization": mode,
+        "bytes_per_vector": int(bytes_per_vector),
+        "search_mb": round(bytes_per_vector * len(base) / 2**20, 2),
+        "compression": round(native * 4 / bytes_per_vector, 1),
+        "recall": round(hits / n_total, 4),
+        "recall_rescored": round(hits_rescored / n_total, 4),
+    }
+
+
+def main():
+    args = parse_args()
+    cfg = get_app_config()
+    base = load_collection_vectors()
+    print(f"컬렉션 벡터: {base.shape[0]}개, {base.shape[1]}차원")
+
+    rng = np.random.default_rng(0)
+    if args.questions:
+        lines = args.questions.read_text(encoding="utf-8").splitlines()
+        questions = [q.strip() for q in lines if q.strip()]
+        queries = project(np.asarray(get_embeddings().embed_documents(questions)), None, None)
+        exclude = None
+    else:
+        exclude = rng.choice(len(base), min(args.num_queries, len(base)), replace=False)
+        queries = base[exclude]
+
+    # 로컬 모델은 PCA, OpenAI는 dimensions 파라미터(앞쪽 차원 절단과 동일)로 차원을 줄임
+    reduce = "truncate" if cfg.rag_mode == "openai_api" else "pca"
+    results = []
+    for dims in (int(x) for x in args.dims.split(",")):
+        if dims > base.shape[1]:
+            continue
+        for mode in args.quantization.split(","):
+            results.append(
+                evaluate(
+                    base, queries, exclude, dims, mode, args.k, args.rescore_multiplier, reduce
+                )
+            )
+
+    print(f"\n=== recall@{args.k} vs 메모리 (차원 축소: {reduce}) ===")
+    print(
+        f"{'dims':>6} {'format':>8} {'B/vec':>7} {'MB':>9} {'x':>6} {'recall':>8} {'rescored':>9}"
+    )
+    for r in results:
+        print(
+            f"{r['dims']:>6} {r['quantization']:>8} {r['bytes_per_vector']:>7} "
+            f"{r['search_mb']:>9} {r['compression']:>6} {r['recall']:>8} {r['recall_rescored']:>9}"
+        )
+    print("(rescored: 상위 k * multiplier 후보를 float32 원본으로 재계산한 recall, 원본은 디스크에 둠)")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+from src.rag_service.tracing import setup_tracing
+from src.rag_service.metrics import setup_metrics
+from src.rag_service.api import create_app
+from src.rag_service.config import get_app_config
+import argparse
+
+import uvicorn
+
+
+def parse_args():
+    cfg = get_app_config()
+    parser = argparse.ArgumentParser(description="RFP RAG HTTP API 서버")
+    parser.add_argument("--host", default=cfg.api.host, help="바인드할 주소")
+    parser.add_argument("--port", type=int, default=cfg.api.port, help="바인드할 포트")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    setup_tracing()
+    setup_metrics()
+    # 모델/벡터저장소 핸들은 프로세스당 한 번 로드하여 모든 요청이 공유 (단일 워커 프로세스)
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
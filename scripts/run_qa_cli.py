@@ -1,29 +1,70 @@
 from src.rag_service.tracing import setup_tracing
-from src.rag_service.pipelines.ingest import ingest_documents
+from src.rag_service.metrics import setup_metrics
 from src.rag_service.pipelines.qa_chain import build_rag_chain
+from src.rag_service.pipelines.batch_qa import load_questions, run_batch_qa
 from src.rag_service.config import get_app_config
-import os
+import argparse
+import asyncio
 from pathlib import Path
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="RFP RAG CLI")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="매니페스트를 무시하고 전체 문서를 다시 인덱싱"
+    )
+    parser.add_argument(
+        "--skip-ingest", action="store_true", help="인덱싱(변경 파일 확인)을 건너뜀"
+    )
+    parser.add_argument(
+        "--questions", type=Path, default=None, help="배치 모드: 질문 파일 (.txt 한 줄에 하나, .jsonl)"
+    )
+    parser.add_argument(
+        "--output", type=Path, default=None, help="배치 모드: 결과 JSONL 경로 (기존 결과는 건너뜀)"
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="배치 모드: 동시 질문 수")
+    return parser.parse_args()
+
+
+def print_sources(event: dict):
+    """
+    검색된 출처 목록을 출력합니다.
+    Args:
+        event: RagChain.stream의 sources 이벤트
+    """
+    if event.get("cached"):
+        # 의미 유사도로 찾은 경우 다른 질문의 답변일 수 있으므로 원래 질문을 함께 표시
+        print(f"\n(캐시된 답변: \"{event['cached_question']}\"에 대한 답변)")
+    print("\n=== 참조 문서 ===")
+    for src in event["sources"]:
+        print(f"- {src['source']} | 페이지: {src['page']} | 데이터 타입: {src['type']}")
+        if src.get("duplicates"):
+            print(f"  (같은 내용 {len(src['duplicates'])}곳에 더 있음)")
+    ctx = event.get("context")
+    if ctx:
+        print(
+            f"(참조 문서 {ctx['context_tokens']} 토큰, "
+            f"{ctx['context_tokens_saved']} 토큰 절약, 중복 제외 {ctx['duplicates_dropped']}건)"
+        )
+
+
 def main():
+    args = parse_args()
     cfg = get_app_config()
     # 원본 데이터 폴더 경로 지정
     data_dir = Path("/home/public/data")
     raw_data_path = data_dir / "raw_data"
-    # 폴더 내 파일 목록 가져오기
-    chroma_db_path = Path(cfg.vectorstore.persist_dir)
-    os.makedirs(chroma_db_path, exist_ok=True)
+    # 단계별 메트릭/span 수집 (metrics.enabled일 때만, 인덱싱 단계도 포함)
+    setup_metrics()
 
-    # 벡터 DB 폴더에 DB 파일이 있는지 확인
-    file_exists = any(chroma_db_path.iterdir())
+    # 매니페스트와 비교하여 새로 추가/변경/삭제된 파일만 반영 (변경이 없으면 바로 끝남)
+    if not args.skip_ingest:
+        # 로더(fitz, PIL, 캡션 모델)는 인덱싱할 때만 import (--skip-ingest 시작 시간 단축)
+        from src.rag_service.pipelines.ingest import ingest_documents
 
-    if not file_exists:
-        print("벡터 DB가 존재하지 않습니다. 문서 임베딩을 생성합니다...")
-        ingest_documents(raw_data_path)
-        print("문서 임베딩이 완료되었습니다.")
-    else:
-        print("벡터 DB가 이미 존재합니다. 임베딩 생성을 건너뜁니다.")
+        print("문서 변경 사항을 확인하고 벡터 DB를 갱신합니다...")
+        ingest_documents(raw_data_path, full_rebuild=args.rebuild)
+        print("벡터 DB 갱신이 완료되었습니다.")
 
     setup_tracing()
     chain = build_rag_chain(
@@ -32,14 +73,26 @@ def main():
         k_image=cfg.retrieval.k_image,
     )
 
+    # 배치 모드: 파일의 질문을 모두 실행하고 종료 (중단 후 다시 실행하면 남은 질문만 처리)
+    if args.questions:
+        output = args.output or args.questions.with_name(args.questions.stem + "_answers.jsonl")
+        questions = load_questions(args.questions)
+        asyncio.run(run_batch_qa(chain, questions, output, max_concurrency=args.concurrency))
+        return
+
     print("RFP RAG CLI. 종료하려면 'exit' 입력.")
     while True:
         q = input("\n질문> ")
         if q.strip().lower() in {"exit", "quit"}:
             break
-        answer = chain.invoke(q)
-        print("\n=== 답변 ===")
-        print(answer)
+        # 검색 결과(출처)를 먼저 출력하고, 답변은 생성되는 대로 출력
+        for event in chain.stream(q):
+            if event["type"] == "sources":
+                print_sources(event)
+                print("\n=== 답변 ===")
+            elif event["type"] == "token":
+                print(event["text"], end="", flush=True)
+        print()
 
 
 if __name__ == "__main__":
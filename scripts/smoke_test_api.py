@@ -0,0 +1,204 @@
+from src.rag_service import metrics
+from src.rag_service.api import create_app
+from src.rag_service.config import get_app_config
+from src.rag_service.pipelines.retrieval import RetrievalEngine
+from src.rag_service.vectorstores.numpy_store import NumpyVectorStore
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.runnables import RunnableGenerator
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="가짜 LLM/임베딩으로 HTTP API를 끝까지 실행해 보는 스모크 테스트"
+    )
+    parser.add_argument("--requests", type=int, default=32, help="동시에 보낼 /query 요청 수")
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="가짜 LLM 응답 지연(초)")
+    return parser.parse_args()
+
+
+class FakeLLM:
+    """
+    고정된 답변을 토큰 단위로 지연시켜 내보내는 가짜 LLM입니다. 동시에 진행된 최대 호출 수를 기록합니다.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    def stream(self, prompt):
+        for token in ["가짜", " ", "답변"]:
+            time.sleep(self.delay / 3)
+            yield token
+
+    async def astream(self, prompt):
+        self.in_flight += 1
+        self.calls += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            for token in ["가짜", " ", "답변"]:
+                await asyncio.sleep(self.delay / 3)
+                yield token
+        finally:
+            self.in_flight -= 1
+
+    def as_runnable(self):
+        return RunnableGenerator(self._transform, self._atransform)
+
+    def _transform(self, inputs):
+        for prompt in inputs:
+            yield from self.stream(prompt)
+
+    async def _atransform(self, inputs):
+        async for prompt in inputs:
+            async for token in self.astream(prompt):
+                yield token
+
+
+def build_fake_engine(path: str) -> RetrievalEngine:
+    """
+    가짜 임베딩과 임시 NumpyVectorStore로 검색 엔진을 만듭니다.
+    """
+    embeddings = DeterministicFakeEmbedding(size=64)
+    store = NumpyVectorStore(path, embedding=embeddings)
+    texts = [f"사업 {i}의 예산은 {i * 1000}만원이며 기간은 {i}개월입니다." for i in range(30)]
+    metadatas = [
+        {"type": ["text", "table", "image"][i % 3], "source": f"rfp_{i % 4}.pdf", "page": i}
+        for i in range(30)
+    ]
+    store.upsert(
+        [f"chunk-{i}" for i in range(30)],
+        embeddings.embed_documents(texts),
+        [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)],
+    )
+    store.flush()
+    return RetrievalEngine(embeddings=embeddings, vectordb=store)
+
+
+async def run_concurrent(app, n: int) -> float:
+    """
+    /query 요청 n개를 동시에 보내고 걸린 시간을 반환합니다.
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(
+                *(client.post("/query", json={"question": f"질문 {i}"}) for i in range(n))
+            )
+            elapsed = time.perf_counter() - start
+    assert all(r.status_code == 200 for r in responses), [r.text for r in responses]
+    return elapsed
+
+
+def check_metrics(engine: RetrievalEngine, tmp: str, llm_delay: float) -> None:
+    """
+    메트릭을 켜고 /metrics 출력과 JSONL span(부모/자식 관계)을 확인합니다.
+    """
+    cfg = get_app_config()
+    cfg.metrics.enabled = True
+    cfg.metrics.spans_path = os.path.join(tmp, "spans_{pid}.jsonl")
+    metrics.setup_metrics()
+
+    app = create_app(llm=FakeLLM(llm_delay).as_runnable(), engine=engine, use_cache=False)
+    with TestClient(app) as client:
+        assert client.post("/query", json={"question": "사업 3의 예산은?"}).status_code == 200
+        with client.stream("POST", "/query/stream", json={"question": "사업 4의 예산은?"}) as r:
+            list(r.iter_lines())
+        text = client.get("/metrics").text
+    for name in [
+        "rag_retrieval_seconds_count",
+        'rag_retrieval_stage_seconds_count{stage="embed_query"}',
+        'rag_llm_generate_seconds_count{mode="invoke"}',
+        'rag_llm_generate_seconds_count{mode="stream"}',
+        "rag_llm_first_token_seconds_count",
+        "rag_context_format_seconds_count",
+    ]:
+        assert name in text, name
+
+    metrics.flush()
+    with open(os.path.join(tmp, f"spans_{os.getpid()}.jsonl"), encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f]
+    names = {sp["name"] for sp in spans}
+    assert {"rag_query", "retrieval", "llm_generate"} <= names, names
+    # /query의 검색/생성 span은 질문 단위 span의 자식이어야 함
+    root = next(sp for sp in spans if sp["name"] == "rag_query")
+    children = {sp["name"] for sp in spans if sp["parent_id"] == root["span_id"]}
+    assert children == {"retrieval", "llm_generate"}, children
+    print(f"/metrics: {len(text.splitlines())} lines, spans: {sorted(names)}")
+
+    # 꺼져 있을 때의 계측 비용
+    cfg.metrics.enabled = False
+    metrics.setup_metrics()
+    n = 200_000
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.timer("noop"):
+            pass
+    per_call = (time.perf_counter() - start) / n * 1e9
+    print(f"disabled timer overhead: {per_call:.0f} ns/call")
+
+
+def main():
+    args = parse_args()
+    cfg = get_app_config()
+    cfg.retrieval.hybrid = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_fake_engine(tmp)
+
+        fake = FakeLLM(args.llm_delay)
+        app = create_app(llm=fake.as_runnable(), engine=engine, use_cache=False)
+        with TestClient(app) as client:
+            assert client.get("/healthz").json() == {"status": "ok"}
+            assert client.get("/readyz").status_code == 200
+            r = client.post("/retrieve", json={"question": "사업 3의 예산", "k_text": 2})
+            assert r.status_code == 200, r.text
+            print(f"/retrieve: {len(r.json()['documents'])} documents")
+            r = client.post("/query", json={"question": "사업 3의 예산은?"})
+            assert r.status_code == 200 and r.json()["answer"] == "가짜 답변", r.text
+            assert client.post("/query", json={"question": ""}).status_code == 422
+            r = client.post("/retrieve", json={"question": "q", "k_text": 999})
+            assert r.status_code == 422
+
+            # 스트리밍: sources 이벤트가 첫 토큰보다 먼저 와야 함
+            with client.stream("POST", "/query/stream", json={"question": "사업 3의 예산은?"}) as r:
+                events = [
+                    line.split(": ", 1)[1] for line in r.iter_lines() if line.startswith("event:")
+                ]
+            assert events[0] == "sources" and events[-1] == "done", events
+            assert events.count("token") == 3, events
+            print(f"/query/stream: {events}")
+            chain_events = list(app.state.service.chain.stream("사업 3의 예산은?"))
+            assert chain_events[0]["type"] == "sources"
+            assert "".join(e["text"] for e in chain_events[1:]) == "가짜 답변"
+
+        fake = FakeLLM(args.llm_delay)
+        app = create_app(llm=fake.as_runnable(), engine=engine, use_cache=False)
+        elapsed = asyncio.run(run_concurrent(app, args.requests))
+        limit = cfg.api.max_concurrent_llm
+        print(
+            f"/query x{args.requests}: {elapsed:.2f}s, "
+            f"max in-flight LLM calls {fake.max_in_flight} (limit {limit})"
+        )
+        assert fake.calls == args.requests
+        assert fake.max_in_flight <= limit
+
+        check_metrics(engine, tmp, args.llm_delay)
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
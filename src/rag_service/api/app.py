@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from langchain_core.runnables import Runnable, RunnableConfig
+from pydantic import BaseModel, Field
+
+from .. import metrics
+from ..config import get_app_config
+from ..llms import get_llm
+from ..model_registry import release_models
+from ..pipelines.qa_chain import build_rag_chain
+from ..pipelines.retrieval import RetrievalEngine, get_retrieval_engine
+
+
+# ---------- 요청/응답 모델 ----------
+
+
+class QueryRequest(BaseModel):
+    question: str = Field(min_length=1)
+
+
+class QueryResponse(BaseModel):
+    answer: str
+    latency_ms: float
+    sources: List[Dict[str, Any]] = []
+    # 답변 캐시 적중 여부와, 적중 시 캐시된 답변의 원래 질문 (sources는 그 질문의 출처)
+    cached: bool = False
+    cached_question: Optional[str] = None
+
+
+class RetrieveRequest(BaseModel):
+    question: str = Field(min_length=1)
+    k_text: Optional[int] = Field(default=None, ge=0)
+    k_table: Optional[int] = Field(default=None, ge=0)
+    k_image: Optional[int] = Field(default=None, ge=0)
+
+
+class RetrievedDocument(BaseModel):
+    id: Optional[str] = None
+    content: str
+    metadata: Dict[str, Any]
+
+
+class RetrieveResponse(BaseModel):
+    documents: List[RetrievedDocument]
+    latency_ms: float
+
+
+# ---------- 공유 자원 ----------
+
+
+class ConcurrencyLimitedLLM(Runnable):
+    """
+    LLM 호출을 semaphore로 감싸 동시에 진행되는 호출 수를 제한합니다.
+    캐시 적중이나 검색 단계는 제한을 받지 않고, 실제 LLM 호출만 대기합니다.
+    스트리밍(astream) 시에는 마지막 토큰까지 semaphore를 잡고 있습니다.
+    """
+
+    def __init__(self, llm: Runnable, semaphore: asyncio.Semaphore):
+        self.llm = llm
+        self.semaphore = semaphore
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        return self.llm.invoke(input, config, **kwargs)
+
+    def stream(self, input, config: Optional[RunnableConfig] = None, **kwargs) -> Iterator:
+        yield from self.llm.stream(input, config, **kwargs)
+
+    async def ainvoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        async with self.semaphore:
+            return await self.llm.ainvoke(input, config, **kwargs)
+
+    async def astream(
+        self, input, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> AsyncIterator:
+        async with self.semaphore:
+            async for chunk in self.llm.astream(input, config, **kwargs):
+                yield chunk
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """
+    Server-Sent Events 형식의 메시지 하나를 만듭니다.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class ServiceState:
+    """
+    서비스 시작 시 한 번만 만든 LLM/임베딩/벡터저장소 핸들과 체인을 담습니다.
+    """
+
+    def __init__(self):
+        self.engine: Optional[RetrievalEngine] = None
+        self.chain = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.ready = False
+
+
+def create_app(llm=None, engine: Optional[RetrievalEngine] = None, use_cache=None) -> FastAPI:
+    """
+    RAG 질의 HTTP 서비스를 만듭니다.
+    시작할 때 LLM, 임베딩 모델, 벡터저장소를 한 번만 로드하고 모든 요청이 공유합니다.
+    테스트 시에는 가짜 LLM과 가짜 임베딩을 쓰는 검색 엔진을 넘겨 외부 호출 없이 실행할 수 있습니다.
+    Args:
+        llm: 사용할 LLM (None이면 설정에 따라 생성)
+        engine: 사용할 검색 엔진 (None이면 프로세스 공유 엔진)
+        use_cache: 답변 캐시 사용 여부 (None이면 설정값 사용)
+    Returns:
+        FastAPI 앱
+    """
+    cfg = get_app_config()
+    state = ServiceState()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # 모델 로드는 블로킹 작업이므로 스레드에서 실행
+        state.engine = engine or await run_in_threadpool(get_retrieval_engine)
+        base_llm = llm if llm is not None else await run_in_threadpool(get_llm)
+        state.semaphore = asyncio.Semaphore(max(1, cfg.api.max_concurrent_llm))
+        state.chain = await run_in_threadpool(
+            build_rag_chain,
+            k_text=cfg.retrieval.k_text,
+            k_table=cfg.retrieval.k_table,
+            k_image=cfg.retrieval.k_image,
+            use_cache=use_cache,
+            llm=ConcurrencyLimitedLLM(base_llm, state.semaphore),
+            engine=state.engine,
+        )
+        state.ready = True
+        print(f"[API] Ready. (max_concurrent_llm={cfg.api.max_concurrent_llm})")
+        yield
+        state.ready = False
+        # 이 프로세스에서 로드한 로컬 모델을 해제
+        release_models()
+
+    app = FastAPI(title="RFP RAG API", lifespan=lifespan)
+    app.state.service = state
+
+    def _require_ready() -> ServiceState:
+        if not state.ready:
+            raise HTTPException(status_code=503, detail="service is starting")
+        return state
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    @app.get("/readyz")
+    async def readyz():
+        if not state.ready:
+            raise HTTPException(status_code=503, detail="not ready")
+        return {"status": "ready"}
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        """
+        Prometheus text format 메트릭 (metrics.enabled가 꺼져 있으면 404)
+        """
+        if not metrics.is_enabled():
+            raise HTTPException(status_code=404, detail="metrics disabled")
+        return PlainTextResponse(
+            metrics.render_prometheus(), media_type="text/plain; version=0.0.4"
+        )
+
+    @app.post("/query", response_model=QueryResponse)
+    async def query(req: QueryRequest):
+        s = _require_ready()
+        start = time.perf_counter()
+        details = await s.chain.ainvoke_with_details(req.question)
+        return QueryResponse(
+            answer=details["answer"],
+            latency_ms=(time.perf_counter() - start) * 1000,
+            sources=details["sources"],
+            cached=details["cached"],
+            cached_question=details.get("cached_question"),
+        )
+
+    @app.post("/query/stream")
+    async def query_stream(req: QueryRequest):
+        """
+        Server-Sent Events로 답변을 스트리밍합니다.
+        event: sources (검색 결과, 생성 시작 전) → event: token (답변 조각) ... → event: done
+        """
+        s = _require_ready()
+
+        async def _events():
+            start = time.perf_counter()
+            first_token_ms = None
+            try:
+                async for event in s.chain.astream(req.question):
+                    if event["type"] == "token" and first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - start) * 1000
+                    yield _sse(event["type"], event)
+            except Exception as e:
+                print(f"[API] /query/stream failed: {e!r}")
+                yield _sse("error", {"detail": "internal error"})
+                return
+            done = {
+                "latency_ms": (time.perf_counter() - start) * 1000,
+                "first_token_ms": first_token_ms,
+            }
+            yield _sse("done", done)
+
+        return StreamingResponse(_events(), media_type="text/event-stream")
+
+    @app.post("/retrieve", response_model=RetrieveResponse)
+    async def retrieve(req: RetrieveRequest):
+        s = _require_ready()
+        ks = {
+            "k_text": cfg.retrieval.k_text if req.k_text is None else req.k_text,
+            "k_table": cfg.retrieval.k_table if req.k_table is None else req.k_table,
+            "k_image": cfg.retrieval.k_image if req.k_image is None else req.k_image,
+        }
+        if max(ks.values()) > cfg.api.max_k:
+            raise HTTPException(status_code=422, detail=f"k must be <= {cfg.api.max_k}")
+        start = time.perf_counter()
+        # 검색(질문 임베딩 + 벡터 검색)은 동기 함수이므로 스레드에서 실행
+        docs = await run_in_threadpool(s.engine.retrieve, req.question, **ks)
+        return RetrieveResponse(
+            documents=[
+                RetrievedDocument(id=d.id, content=d.page_content or "", metadata=d.metadata or {})
+                for d in docs
+            ],
+            latency_ms=(time.perf_counter() - start) * 1000,
+        )
+
+    @app.exception_handler(Exception)
+    async def _unhandled(request: Request, exc: Exception):
+        print(f"[API] {request.url.path} failed: {exc!r}")
+        return JSONResponse(status_code=500, content={"detail": "internal error"})
+
+    return app
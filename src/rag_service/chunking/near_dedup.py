@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import pickle
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from ..config import NearDedupConfig, get_app_config
+
+
+NEAR_DUP_INDEX_FILENAME = "near_dup_index.pkl.gz"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SPACE_RE = re.compile(r"\s+")
+# 숫자 토큰 (천 단위 구분 쉼표/소수점 포함)
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def lsh_bands(threshold: float, num_perm: int, recall: float = 0.99) -> Tuple[int, int]:
+    """
+    LSH (bands, rows)를 고릅니다.
+    임계값 유사도의 쌍이 후보가 될 확률 1 - (1 - t^rows)^bands가 recall 이상인 구성 중
+    rows가 가장 큰 것(관련 없는 후보가 가장 적은 것)을 사용합니다.
+    후보는 서명 일치율로 다시 검증하므로 후보가 조금 많은 것은 괜찮습니다.
+    Args:
+        threshold: Jaccard 유사도 임계값
+        num_perm: MinHash 서명 길이
+        recall: 임계값 유사도의 쌍을 후보로 찾을 최소 확률
+    Returns:
+        (bands, rows)
+    """
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold**rows) ** bands >= recall:
+            return bands, rows
+    return num_perm, 1
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH로 거의 같은 청크를 찾는 색인입니다.
+    대표(canonical) 청크만 벡터저장소에 저장하고, 거의 같은 청크는 임베딩/저장하지 않고
+    대표 청크의 참조 목록(source/page)에만 추가합니다.
+    - 서명: 정규화한 텍스트의 글자 shingle에 num_perm개의 해시 순열을 적용한 최솟값
+    - 후보: 서명을 bands개로 나눈 구간 중 하나라도 같은 대표 청크 (같은 type끼리만)
+    - 판정: 서명 일치율(추정 Jaccard)이 threshold 이상인 후보 중 가장 높은 것
+      match_numbers면 숫자 토큰(금액, 기간, 날짜 등)이 모두 같은 후보만 인정
+      (사업비/기간만 다른 공고문은 합치지 않고 각각 저장)
+    - 참조의 exact: 정규화한 본문까지 같은지 여부 (다르면 "유사 내용"으로만 표시)
+    증분 인덱싱을 위해 원본 파일별로 소유한 대표 청크와 참조를 함께 기록합니다.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        seed: int = 1,
+        types: Iterable[str] = ("text", "table"),
+        match_numbers: bool = True,
+    ):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.types = tuple(types)
+        self.match_numbers = match_numbers
+        # 대표 청크 ID → {"source", "type", "sig", "numbers", "text",
+        #                 "refs": [{"source", "page", "exact"}, ...]}
+        self.entries: Dict[str, Dict] = {}
+        self._init_derived()
+
+    def _init_derived(self) -> None:
+        """
+        저장하지 않고 설정/entries로부터 다시 만드는 상태를 초기화합니다.
+        """
+        rng = np.random.RandomState(self.seed)
+        prime = int(_MERSENNE_PRIME)
+        self._a = rng.randint(1, prime, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, prime, size=self.num_perm, dtype=np.uint64)
+        self.bands, self.rows = lsh_bands(self.threshold, self.num_perm)
+        # (type, band 번호, band 값) → 대표 청크 ID 집합
+        self._buckets: Dict[Tuple[str, int, bytes], Set[str]] = {}
+        # 원본 파일 → 소유한 대표 청크 ID / 참조를 남긴 대표 청크 ID
+        self._owned: Dict[str, Set[str]] = {}
+        self._referenced: Dict[str, Set[str]] = {}
+        for cid, e in self.entries.items():
+            self._index(cid, e)
+
+    @classmethod
+    def from_config(cls, cfg: NearDedupConfig) -> "NearDuplicateIndex":
+        return cls(
+            threshold=cfg.threshold,
+            num_perm=cfg.num_perm,
+            shingle_size=cfg.shingle_size,
+            seed=cfg.seed,
+            types=cfg.types,
+            match_numbers=cfg.match_numbers,
+        )
+
+    @property
+    def params(self) -> Dict:
+        """
+        서명/판정에 영향을 주는 설정값 (바뀌면 저장된 색인을 재사용할 수 없음)
+        """
+        return {
+            "threshold": self.threshold,
+            "num_perm": self.num_perm,
+            "shingle_size": self.shingle_size,
+            "seed": self.seed,
+            "types": list(self.types),
+            "match_numbers": self.match_numbers,
+        }
+
+    # ---------- 서명 ----------
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        공백/대소문자/전각 문자 차이를 없앤 비교용 텍스트를 반환합니다.
+        """
+        return _SPACE_RE.sub(" ", unicodedata.normalize("NFKC", text).lower()).strip()
+
+    @staticmethod
+    def _digest(value: str) -> bytes:
+        return hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+
+    def number_key(self, norm: str) -> bytes:
+        """
+        정규화한 텍스트의 숫자 토큰 순서열 해시를 반환합니다. (1,200,000 → 1200000)
+        Args:
+            norm: normalize()의 결과
+        Returns:
+            8바이트 해시
+        """
+        return self._digest(" ".join(m.replace(",", "") for m in _NUMBER_RE.findall(norm)))
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        텍스트의 MinHash 서명을 계산합니다.
+        공백/대소문자/전각 문자 차이는 무시하고, 글자 shingle을 numpy로 한 번에 해시합니다.
+        Args:
+            text: 청크 본문 (또는 normalize()의 결과)
+        Returns:
+            (num_perm,) uint32 배열
+        """
+        norm = self.normalize(text)
+        codes = np.frombuffer(norm.encode("utf-32-le") or b"\0" * 4, dtype=np.uint32)
+        codes = codes.astype(np.uint64)
+        # shingle_size보다 짧은 텍스트는 전체를 하나의 shingle로 사용
+        n = min(self.shingle_size, len(codes))
+        # shingle 해시: 다항식 rolling hash (uint64 overflow는 mod 2^64로 동작)
+        shingles = np.zeros(len(codes) - n + 1, dtype=np.uint64)
+        for j in range(n):
+            shingles = shingles * np.uint64(1_000_003) + codes[j : len(codes) - n + 1 + j]
+        shingles = np.unique((shingles ^ (shingles >> np.uint64(29))) & _MAX_HASH)
+        perm = (shingles[:, None] * self._a + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return perm.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, doc_type: str, sig: np.ndarray) -> List[Tuple[str, int, bytes]]:
+        r = self.rows
+        return [(doc_type, i, sig[i * r : (i + 1) * r].tobytes()) for i in range(self.bands)]
+
+    # ---------- 조회/추가 ----------
+
+    def find(
+        self, sig: np.ndarray, doc_type: str, numbers: Optional[bytes] = None
+    ) -> Optional[str]:
+        """
+        서명과 거의 같은 대표 청크를 찾습니다.
+        Args:
+            sig: signature()의 결과
+            doc_type: 청크 type
+            numbers: number_key()의 결과 (match_numbers면 같은 대표 청크만 후보)
+        Returns:
+            가장 유사한 대표 청크 ID, 없으면 None
+        """
+        candidates: Set[str] = set()
+        for key in self._band_keys(doc_type, sig):
+            candidates |= self._buckets.get(key, set())
+        if self.match_numbers:
+            candidates = {c for c in candidates if self.entries[c]["numbers"] == numbers}
+        if not candidates:
+            return None
+        cids = list(candidates)
+        sigs = np.stack([self.entries[c]["sig"] for c in cids])
+        scores = (sigs == sig).mean(axis=1)
+        best = int(np.argmax(scores))
+        return cids[best] if scores[best] >= self.threshold else None
+
+    def _index(self, cid: str, entry: Dict) -> None:
+        for key in self._band_keys(entry["type"], entry["sig"]):
+            self._buckets.setdefault(key, set()).add(cid)
+        self._owned.setdefault(entry["source"], set()).add(cid)
+        for ref in entry["refs"]:
+            self._referenced.setdefault(ref["source"], set()).add(cid)
+
+    def collapse(
+        self, source: str, ids: List[str], chunks: List[Document]
+    ) -> Tuple[List[str], List[Document]]:
+        """
+        한 파일의 청크 중 이미 있는 대표 청크와 거의 같은 것을 참조로 합치고,
+        나머지는 새 대표 청크로 등록합니다. (같은 파일 안의 반복 문단도 합침)
+        Args:
+            source: 원본 파일 경로 (매니페스트와 같은 키)
+            ids: 청크 ID 목록
+            chunks: 청크 Document 목록
+        Returns:
+            (저장할 청크 ID 목록, 저장할 청크 목록)
+        """
+        keep_ids: List[str] = []
+        keep: List[Document] = []
+        for cid, chunk in zip(ids, chunks):
+            doc_type = (chunk.metadata or {}).get("type", "text")
+            if doc_type not in self.types or cid in self.entries:
+                keep_ids.append(cid)
+                keep.append(chunk)
+                continue
+            norm = self.normalize(chunk.page_content or "")
+            sig = self.signature(norm)
+            numbers = self.number_key(norm)
+            text_key = self._digest(norm)
+            match = self.find(sig, doc_type, numbers)
+            if match is not None:
+                page = (chunk.metadata or {}).get("page")
+                exact = self.entries[match]["text"] == text_key
+                self.entries[match]["refs"].append({"source": source, "page": page, "exact": exact})
+                self._referenced.setdefault(source, set()).add(match)
+                continue
+            entry = {
+                "source": source,
+                "type": doc_type,
+                "sig": sig,
+                "numbers": numbers,
+                "text": text_key,
+                "refs": [],
+            }
+            self.entries[cid] = entry
+            self._index(cid, entry)
+            keep_ids.append(cid)
+            keep.append(chunk)
+        return keep_ids, keep
+
+    def refs_for(self, cid: Optional[str]) -> List[Dict]:
+        """
+        대표 청크에 합쳐진 다른 청크들의 출처 목록을 반환합니다.
+        """
+        entry = self.entries.get(cid) if cid else None
+        return list(entry["refs"]) if entry else []
+
+    def remove_source(self, source: str) -> Set[str]:
+        """
+        원본 파일의 대표 청크와 참조를 모두 색인에서 지웁니다. (파일 삭제/변경 시)
+        지운 대표 청크에 참조로만 들어 있던 다른 파일은 그 내용이 더 이상 저장되어 있지 않으므로
+        다시 인덱싱해야 합니다.
+        Args:
+            source: 원본 파일 경로
+        Returns:
+            다시 인덱싱해야 하는 다른 원본 파일 경로 집합
+        """
+        for cid in self._referenced.pop(source, set()):
+            entry = self.entries.get(cid)
+            if entry:
+                entry["refs"] = [r for r in entry["refs"] if r["source"] != source]
+
+        dependents: Set[str] = set()
+        for cid in self._owned.pop(source, set()):
+            entry = self.entries.pop(cid, None)
+            if entry is None:
+                continue
+            for key in self._band_keys(entry["type"], entry["sig"]):
+                bucket = self._buckets.get(key)
+                if bucket:
+                    bucket.discard(cid)
+                    if not bucket:
+                        del self._buckets[key]
+            for ref in entry["refs"]:
+                dependents.add(ref["source"])
+                self._referenced.get(ref["source"], set()).discard(cid)
+        dependents.discard(source)
+        return dependents
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # ---------- 저장/로드 ----------
+
+    def save(self, path: str | Path) -> None:
+        """
+        색인을 gzip pickle 파일로 저장합니다. (임시 파일에 쓴 뒤 교체)
+        LSH 버킷 등 파생 상태는 저장하지 않고 로드할 때 다시 만듭니다.
+        Args:
+            path: 저장 경로
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with gzip.open(tmp, "wb", compresslevel=3) as f:
+            pickle.dump(
+                {"params": self.params, "entries": self.entries},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Optional["NearDuplicateIndex"]:
+        """
+        저장된 색인을 로드합니다.
+        Args:
+            path: 저장 경로
+        Returns:
+            NearDuplicateIndex 객체, 파일이 없으면 None
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        with gzip.open(path, "rb") as f:
+            data = pickle.load(f)
+        index = cls(**data["params"])
+        index.entries = data["entries"]
+        index._init_derived()
+        return index
+
+
+def get_near_dup_index_path() -> Path:
+    """
+    현재 설정의 벡터스토어에 대응하는 근사 중복 색인 파일 경로를 반환합니다.
+    (매니페스트와 마찬가지로 chroma 이외의 backend는 별도 파일 사용)
+    Returns:
+        Path: 색인 파일 경로
+    """
+    cfg = get_app_config()
+    name = NEAR_DUP_INDEX_FILENAME
+    if cfg.vectorstore.backend != "chroma":
+        name = name.replace(".pkl.gz", f"_{cfg.vectorstore.backend}.pkl.gz")
+    return Path(cfg.vectorstore.persist_dir) / name
+
+
+_index_cache: Optional[NearDuplicateIndex] = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def get_near_dup_index() -> Optional[NearDuplicateIndex]:
+    """
+    검색 결과에 참조 목록을 붙일 때 쓰는 색인을 처음 필요할 때 로드하여 반환합니다. (이후 캐시)
+    Returns:
+        NearDuplicateIndex 객체, 인덱싱 때 근사 중복 제거를 쓰지 않았으면 None
+    """
+    global _index_cache, _index_loaded
+    if _index_loaded:
+        return _index_cache
+    with _index_lock:
+        if not _index_loaded:
+            _index_cache = NearDuplicateIndex.load(get_near_dup_index_path())
+            _index_loaded = True
+    return _index_cache
+
+
+def reset_near_dup_index() -> None:
+    """
+    캐시된 색인을 버립니다. (재인덱싱 후 다시 로드할 때 사용)
+    """
+    global _index_cache, _index_loaded
+    with _index_lock:
+        _index_cache = None
+        _index_loaded = False
+
+
+def attach_duplicate_refs(docs: List[Document]) -> List[Document]:
+    """
+    검색된 대표 청크에 합쳐진 청크들의 출처를 metadata["duplicate_refs"]로 붙입니다.
+    Args:
+        docs: 검색된 Document 목록 (Document.id에 청크 ID)
+    Returns:
+        참조 목록이 붙은 Document 목록
+    """
+    index = get_near_dup_index()
+    if index is None or not index.entries:
+        return docs
+    out = []
+    for d in docs:
+        refs = index.refs_for(d.id)
+        if refs:
+            metadata = {**(d.metadata or {}), "duplicate_refs": refs}
+            d = Document(id=d.id, page_content=d.page_content, metadata=metadata)
+        out.append(d)
+    return out
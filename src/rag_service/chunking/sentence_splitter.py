@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from ..config import get_app_config
+from ..embeddings.batching import approx_token_count
+
+# 줄 맨 앞의 목록 기호: -, •, ※, 1., 1), 가., (1), (가), ① 등
+_LIST_MARKER = r"(?:[-•·▪■□○●◦※*]\s|\d{1,2}[.)]\s|[가-하][.)]\s|\(\d{1,2}\)|\([가-하]\)|[①-⑳])"
+
+# 문장/항목 경계 (매치 구간은 버리고, 매치 앞에서 단위가 끝나고 매치 뒤에서 새 단위가 시작)
+# PDF 추출 텍스트는 문장 중간에서도 줄이 바뀌므로, 줄바꿈만으로는 경계로 보지 않음
+# 모든 분기가 문장부호/줄바꿈으로 시작해야 정규식 엔진이 후보 위치만 빠르게 탐색함
+_BOUNDARY_RE = re.compile(
+    r"[.!?。](?:"
+    # 한글 종결 (…다. …함. …음. …요?), 단 "가. " 같은 한 글자 목록 기호는 제외
+    r"(?<=[가-힣][.!?])(?<!^[가-하]\.)(?<![\s(][가-하]\.)"
+    # 영문/괄호/% 뒤 마침표 (숫자 뒤 마침표는 소수점/번호일 수 있어 제외)
+    r"|(?<=[A-Za-z%)\]][.!?])"
+    r"|(?<=[!?。])"
+    r")[\"'”’)\]]*\s+"
+    r"|\n(?:"
+    # 마침표 없는 개조식 종결(…함, …음, …됨, …임, …다)로 끝나는 줄
+    r"(?<=[다함음됨임]\n)\s*"
+    # 빈 줄(문단 경계)
+    r"|(?:[ \t]*\n)+\s*"
+    # 다음 줄이 목록 기호로 시작
+    rf"|\s*(?={_LIST_MARKER})"
+    r")"
+)
+_WORD_RE = re.compile(r"\S+")
+
+
+class _Unit(NamedTuple):
+    doc: int  # 입력 Document 번호
+    start: int  # 문서 내 시작 위치
+    end: int  # 문서 내 끝 위치 (미포함)
+    length: int  # chunk_size 단위의 길이
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    텍스트를 한 번의 정규식 탐색으로 문장/목록 항목 단위의 (시작, 끝) 위치로 나눕니다.
+    Args:
+        text: 텍스트
+    Returns:
+        (시작, 끝) 목록 (앞뒤 공백 제외)
+    """
+    spans: List[Tuple[int, int]] = []
+    start = len(text) - len(text.lstrip())
+    for m in _BOUNDARY_RE.finditer(text, start):
+        end = m.start()
+        # 문장부호 뒤 닫는 따옴표/괄호는 앞 단위에 포함, 줄 끝 공백은 제외
+        if text[end] in ".!?。":
+            end += 1
+            while end < m.end() and not text[end].isspace():
+                end += 1
+        else:
+            while end > start and text[end - 1] in " \t":
+                end -= 1
+        if end > start:
+            spans.append((start, end))
+        start = m.end()
+    end = len(text.rstrip())
+    if end > start:
+        spans.append((start, end))
+    return spans
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    텍스트를 문장/목록 항목 단위 문자열로 나눕니다. (sentence_spans 참고)
+    """
+    return [text[s:e] for s, e in sentence_spans(text)]
+
+
+def make_length_function(length_unit: str = "chars") -> Callable[[str], int]:
+    """
+    chunk_size/chunk_overlap을 셀 길이 함수를 만듭니다.
+    - chars: 글자 수
+    - tokens: 임베딩 모델의 토크나이저 기준 토큰 수
+      (로컬 HF: 모델 토크나이저, OpenAI: tiktoken, 쓸 수 없으면 대략적인 추정치)
+    Args:
+        length_unit: chars 또는 tokens
+    Returns:
+        텍스트 → 길이 함수
+    """
+    if length_unit == "chars":
+        return len
+    if length_unit != "tokens":
+        raise ValueError(f"지원하지 않는 chunking.length_unit: {length_unit}")
+    cfg = get_app_config()
+    return _token_length_function(cfg.rag_mode, cfg.embeddings.model_name or "")
+
+
+@lru_cache(maxsize=4)
+def _token_length_function(rag_mode: str, model_name: str) -> Callable[[str], int]:
+    # 파일마다 split_documents를 호출하므로 토크나이저는 모델별로 한 번만 로드
+    try:
+        if rag_mode == "local_hf":
+            from transformers import AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(
+                model_name, token=get_app_config().model_api_key
+            )
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+        import tiktoken
+
+        try:
+            enc = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            enc = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(enc.encode(text, disallowed_special=()))
+    except Exception as e:
+        # 토크나이저 미설치, 다운로드 실패(오프라인) 등
+        print(f"[CHUNK] Tokenizer unavailable ({type(e).__name__}), using approximate counts.")
+        return approx_token_count
+
+
+class SentenceSplitter:
+    """
+    한국어 RFP 문서용 문장 단위 splitter입니다.
+    페이지마다 정규식 한 번으로 문장/목록 항목 경계를 찾고, 경계를 넘지 않는 범위에서
+    chunk_size까지 단위를 채워 청크를 만듭니다. (chunk_size보다 긴 문장만 단어 경계에서 자름)
+    - 청크 내용은 원문을 그대로 잘라낸 것이며, metadata에 start_index/end_index(원문 위치)를 기록
+    - merge_pages: 같은 파일의 연속된 페이지를 이어서 채우고, 여러 페이지에 걸친 청크는
+      page(시작)~page_end(끝)를 기록 (end_index는 마지막 페이지 기준)
+    - chunk_overlap: 이전 청크의 마지막 문장들을 이 길이 안에서 다음 청크 앞에 반복
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 150,
+        length_function: Callable[[str], int] = len,
+        merge_pages: bool = False,
+    ):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap은 chunk_size보다 작아야 합니다.")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_function = length_function
+        self.merge_pages = merge_pages
+        # 단위 사이 공백/줄바꿈 몫
+        self._gap = length_function(" ")
+
+    def split_documents(self, docs: List[Document]) -> List[Document]:
+        """
+        text Document들을 청크로 나눕니다.
+        Args:
+            docs: text Document 목록 (merge_pages면 파일/페이지 순서대로)
+        Returns:
+            청크 Document 목록
+        """
+        out: List[Document] = []
+        group: List[Document] = []
+        for d in docs:
+            if group and not (
+                self.merge_pages
+                and (d.metadata or {}).get("source") == (group[-1].metadata or {}).get("source")
+            ):
+                out.extend(self._split_group(group))
+                group = []
+            group.append(d)
+        if group:
+            out.extend(self._split_group(group))
+        return out
+
+    def _units(self, docs: List[Document]) -> List[_Unit]:
+        units: List[_Unit] = []
+        length = self.length_function
+        for i, d in enumerate(docs):
+            text = d.page_content or ""
+            for s, e in sentence_spans(text):
+                n = length(text[s:e])
+                if n <= self.chunk_size:
+                    units.append(_Unit(i, s, e, n))
+                else:
+                    units.extend(self._split_long(i, text, s, e))
+        return units
+
+    def _split_long(self, i: int, text: str, start: int, end: int) -> List[_Unit]:
+        """
+        chunk_size보다 긴 문장을 단어 경계에서 나눕니다. (단어 하나가 넘치면 글자 단위로 자름)
+        """
+        out: List[_Unit] = []
+        length = self.length_function
+        cur_start, cur_end, cur_len = None, None, 0
+        for m in _WORD_RE.finditer(text, start, end):
+            ws, we = m.span()
+            n = length(text[ws:we])
+            if n > self.chunk_size:
+                if cur_start is not None:
+                    out.append(_Unit(i, cur_start, cur_end, cur_len))
+                    cur_start, cur_len = None, 0
+                step = max(1, self.chunk_size * (we - ws) // n)
+                for s in range(ws, we, step):
+                    e = min(s + step, we)
+                    out.append(_Unit(i, s, e, length(text[s:e])))
+                continue
+            if cur_start is not None and cur_len + self._gap + n > self.chunk_size:
+                out.append(_Unit(i, cur_start, cur_end, cur_len))
+                cur_start, cur_len = None, 0
+            if cur_start is None:
+                cur_start, cur_len = ws, n
+            else:
+                cur_len += self._gap + n
+            cur_end = we
+        if cur_start is not None:
+            out.append(_Unit(i, cur_start, cur_end, cur_len))
+        return out
+
+    def _split_group(self, docs: List[Document]) -> List[Document]:
+        if len(docs) == 1:
+            # 페이지 전체가 chunk_size 안에 들어가면 문장 경계를 찾지 않고 그대로 사용
+            text = docs[0].page_content or ""
+            body = text.strip()
+            if body and self.length_function(body) <= self.chunk_size:
+                start = len(text) - len(text.lstrip())
+                unit = _Unit(0, start, start + len(body), 0)
+                return [self._to_document(docs, [unit])]
+        chunks: List[List[_Unit]] = []
+        cur: List[_Unit] = []
+        cur_len = 0
+        for u in self._units(docs):
+            if cur and cur_len + self._gap + u.length > self.chunk_size:
+                chunks.append(cur)
+                # 마지막 문장들을 overlap 길이 안에서 다음 청크로 넘김 (이전 청크 전체는 제외)
+                tail: List[_Unit] = []
+                tail_len = 0
+                for v in reversed(cur[1:]):
+                    add = v.length + (self._gap if tail else 0)
+                    if tail_len + add > self.chunk_overlap:
+                        break
+                    tail.insert(0, v)
+                    tail_len += add
+                cur, cur_len = tail, tail_len
+                if cur and cur_len + self._gap + u.length > self.chunk_size:
+                    cur, cur_len = [], 0
+            cur_len += u.length + (self._gap if cur else 0)
+            cur.append(u)
+        if cur:
+            chunks.append(cur)
+        return [self._to_document(docs, c) for c in chunks]
+
+    @staticmethod
+    def _to_document(docs: List[Document], units: List[_Unit]) -> Document:
+        first, last = units[0], units[-1]
+        parts: List[str] = []
+        i = 0
+        while i < len(units):
+            # 같은 페이지의 연속된 단위는 원문 구간을 그대로 잘라 씀 (페이지 사이는 줄바꿈)
+            j = i
+            while j + 1 < len(units) and units[j + 1].doc == units[i].doc:
+                j += 1
+            parts.append((docs[units[i].doc].page_content or "")[units[i].start : units[j].end])
+            i = j + 1
+        metadata = dict(docs[first.doc].metadata or {})
+        metadata["start_index"] = first.start
+        metadata["end_index"] = last.end
+        if last.doc != first.doc:
+            metadata["page_end"] = (docs[last.doc].metadata or {}).get("page")
+        return Document(page_content="\n".join(parts), metadata=metadata)
+
+
+def build_sentence_splitter(length_function: Optional[Callable[[str], int]] = None):
+    """
+    ChunkingConfig로 SentenceSplitter를 만듭니다.
+    Args:
+        length_function: 길이 함수 (None이면 chunking.length_unit에 맞게 생성)
+    Returns:
+        SentenceSplitter
+    """
+    chunk_cfg = get_app_config().chunking
+    return SentenceSplitter(
+        chunk_size=chunk_cfg.chunk_size,
+        chunk_overlap=chunk_cfg.chunk_overlap,
+        length_function=length_function or make_length_function(chunk_cfg.length_unit),
+        merge_pages=chunk_cfg.merge_pages,
+    )
@@ -3,7 +3,9 @@ from __future__ import annotations
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from typing import List
+from .. import metrics
 from ..config import get_app_config
+from .sentence_splitter import build_sentence_splitter, make_length_function
 
 
 def split_documents(docs: List[Document]) -> List[Document]:
@@ -14,26 +16,45 @@ def split_documents(docs: List[Document]) -> List[Document]:
     - table: Markdown 테이블 구조 깨지므로 chunking 제외
     그 외 loader를 사용하는 경우:
     - text: chunking 적용
+    text 청킹 방식은 ChunkingConfig.splitter로 선택합니다.
+    - recursive: RecursiveCharacterTextSplitter (페이지별)
+    - sentence: 한국어 문장/목록 경계 기준 SentenceSplitter (merge_pages면 페이지를 이어서 청킹)
     Args:
         docs: Document의 list
     Returns:
         out: chunking이 적용된 Document의 list
     """
-    cfg = get_app_config()
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=cfg.chunking.chunk_size,
-        chunk_overlap=cfg.chunking.chunk_overlap,
-    )
+    chunk_cfg = get_app_config().chunking
+    length_function = make_length_function(chunk_cfg.length_unit)
+    if chunk_cfg.splitter == "sentence":
+        splitter = build_sentence_splitter(length_function)
+    elif chunk_cfg.splitter == "recursive":
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_cfg.chunk_size,
+            chunk_overlap=chunk_cfg.chunk_overlap,
+            length_function=length_function,
+        )
+    else:
+        raise ValueError(f"지원하지 않는 chunking.splitter: {chunk_cfg.splitter}")
+
+    # 페이지 병합 시에는 표/이미지 문서를 먼저 내보내고 이어진 text 청크는 뒤에 붙임
+    merge_pages = chunk_cfg.splitter == "sentence" and chunk_cfg.merge_pages
 
     out: List[Document] = []
-    for d in docs:
-        dtype = (d.metadata or {}).get("type", "text")
-        if dtype in ["table", "table_error"]:
-            out.append(d)
-        elif dtype == "image":
-            # 이미지 문서는 캡션이 이미 구조화되어 있으므로 그대로 유지
-            out.append(d)
-        else:
-            out.extend(splitter.split_documents([d]))
+    texts: List[Document] = []
+    with metrics.span("chunking", splitter=chunk_cfg.splitter) as span:
+        for d in docs:
+            dtype = (d.metadata or {}).get("type", "text")
+            if dtype in ["table", "table_error", "image"]:
+                if not merge_pages:
+                    out.extend(splitter.split_documents(texts))
+                    texts = []
+                # 표는 Markdown 구조가 깨지고, 이미지 캡션은 이미 구조화되어 있으므로 그대로 유지
+                out.append(d)
+            else:
+                texts.append(d)
+        out.extend(splitter.split_documents(texts))
+        span.set(documents=len(docs), chunks=len(out))
 
+    metrics.inc("chunks", len(out))
     return out
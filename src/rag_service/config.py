@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 import yaml
 from dotenv import load_dotenv
@@ -42,6 +42,16 @@ def load_yaml_if_exists(path: Path) -> Dict[str, Any]:
 # ----------------------------
 
 
+class CaptionCacheConfig(BaseModel):
+    """
+    이미지 캡션 캐시(SQLite) 설정
+    """
+
+    enabled: bool = True
+    path: str = "/home/public/data/processed/caption_cache.sqlite"
+    max_entries: Optional[int] = 100_000
+
+
 class CaptionConfig(BaseModel):
     """
     이미지에서 캡션을 추출하여 Document로 변환할 때 사용하는 설정입니다.
@@ -55,6 +65,30 @@ class CaptionConfig(BaseModel):
         "RFP 문서 분석에 도움이 되도록 핵심 정보만 정리해 주세요."
         "RFP 문서와 관련이 없는 그림이라면 설명하지 마세요."
     )
+    # 동시에 보낼 캡션 요청 수와 rate limit 재시도 설정
+    max_concurrency: int = 8
+    max_retries: int = 5
+    retry_base_delay: float = 1.0
+    cache: CaptionCacheConfig = Field(default_factory=CaptionCacheConfig)
+
+
+class ImageFilterConfig(BaseModel):
+    """
+    캡션 요청 전 이미지 필터링/축소 설정
+    """
+
+    enabled: bool = True
+    min_width: int = 32
+    min_height: int = 32
+    min_area: int = 64 * 64
+    # 같은 문서에서 반복되는 xref(로고 등) 제외
+    skip_repeated_xrefs: bool = True
+    # perceptual hash 해밍 거리가 이 값 이하이면 중복으로 제외 (None이면 비활성화)
+    phash_max_distance: Optional[int] = 4
+    # 긴 변 기준 최대 픽셀, JPEG 재압축 품질
+    max_side: Optional[int] = 1024
+    recompress: bool = True
+    jpeg_quality: int = 85
 
 
 class ImageProcessingConfig(BaseModel):
@@ -64,6 +98,7 @@ class ImageProcessingConfig(BaseModel):
 
     extract_images: bool = True
     image_output_dir: str = "/home/public/data/processed/images"
+    filter: ImageFilterConfig = Field(default_factory=ImageFilterConfig)
     caption: CaptionConfig = Field(default_factory=CaptionConfig)
 
 
@@ -73,7 +108,11 @@ class MultiModalLoaderConfig(BaseModel):
     """
 
     extract_tables: bool = True
+    # 페이지의 선/사각형 드로잉 수가 이 값 이상일 때만 find_tables를 실행합니다.
+    table_min_drawings: int = 4
     max_pages: Optional[int] = None
+    # 디렉토리 로드 시 사용할 프로세스 수 (1이면 단일 프로세스로 순차 처리)
+    num_workers: int = 1
     image_processing: ImageProcessingConfig = Field(
         default_factory=ImageProcessingConfig
     )
@@ -86,6 +125,43 @@ class ChunkingConfig(BaseModel):
 
     chunk_size: int = 1000
     chunk_overlap: int = 150
+    # recursive: RecursiveCharacterTextSplitter, sentence: 한국어 문장/목록 경계 기준 splitter
+    splitter: str = "recursive"
+    # chunk_size/chunk_overlap 단위: chars(글자 수) 또는 tokens(임베딩 모델 토크나이저 기준)
+    length_unit: str = "chars"
+    # sentence splitter: 같은 파일의 연속된 페이지를 이어서 청킹 (page~page_end)
+    merge_pages: bool = False
+
+
+class NearDedupConfig(BaseModel):
+    """
+    인덱싱 시 거의 같은 청크(공통 계약 조건, 보안 조항 등)를 하나로 합치는 MinHash/LSH 설정
+    """
+
+    enabled: bool = True
+    # 추정 Jaccard 유사도(글자 shingle 기준)가 이 값 이상이면 같은 청크로 봄
+    threshold: float = 0.95
+    # MinHash 서명 길이 (클수록 정확하지만 서명 계산/저장 비용 증가)
+    num_perm: int = 128
+    # shingle 글자 수
+    shingle_size: int = 5
+    seed: int = 1
+    # 합치는 청크 type (image 캡션은 제외)
+    types: List[str] = Field(default_factory=lambda: ["text", "table"])
+    # 숫자 토큰(금액, 기간, 날짜 등)까지 모두 같아야 합침
+    match_numbers: bool = True
+
+
+class IngestConfig(BaseModel):
+    """
+    스트리밍 인덱싱 파이프라인 설정
+    """
+
+    # 한 번에 임베딩/저장할 청크 수
+    embed_batch_size: int = 256
+    # 단계 사이 큐에 쌓아 둘 수 있는 최대 항목 수 (메모리 상한)
+    queue_size: int = 8
+    near_dedup: NearDedupConfig = Field(default_factory=NearDedupConfig)
 
 
 class RetrievalConfig(BaseModel):
@@ -96,6 +172,53 @@ class RetrievalConfig(BaseModel):
     k_text: int = 3
     k_table: int = 2
     k_image: int = 2
+    # BM25(글자 n-gram) 검색 결과를 벡터 검색 결과와 RRF로 합칠지 여부
+    hybrid: bool = True
+    rrf_k: int = 60
+    # 합치기 전에 각 검색기에서 가져올 후보 수 = k * candidate_multiplier
+    candidate_multiplier: int = 2
+
+
+class ContextConfig(BaseModel):
+    """
+    LLM에 넣는 참조 문서(context) 구성 설정
+    """
+
+    # 참조 문서 전체 토큰 예산 (None이면 검색된 문서를 그대로 모두 사용)
+    max_tokens: Optional[int] = 3000
+    # 문서 하나가 이 토큰 수를 넘으면 질문과 관련 높은 문장(표는 행)만 남김
+    max_tokens_per_doc: int = 600
+    # 문서 임베딩 코사인 유사도가 이 값 이상이면 거의 같은 문서로 보고 뒤의 것을 제외
+    dedup_threshold: float = 0.95
+    # 남은 예산이 이보다 적으면 넘치는 문서를 잘라 넣지 않고 제외
+    min_fill_tokens: int = 64
+
+
+class AnswerCacheConfig(BaseModel):
+    """
+    답변 캐시 설정
+    """
+
+    enabled: bool = True
+    # 영구 저장 경로 (None이면 메모리에만 저장)
+    path: Optional[str] = "/home/public/data/processed/answer_cache.sqlite"
+    max_entries: int = 1000
+    ttl_seconds: Optional[float] = 7 * 24 * 3600
+    # 질문 임베딩 코사인 유사도가 이 값 이상이면 같은 질문으로 간주
+    similarity_threshold: float = 0.95
+
+
+class ApiConfig(BaseModel):
+    """
+    HTTP 질의 서비스 설정
+    """
+
+    host: str = "0.0.0.0"
+    port: int = 8000
+    # 동시에 진행할 수 있는 LLM 호출 수 (초과 요청은 대기)
+    max_concurrent_llm: int = 8
+    # /retrieve 요청에서 허용하는 type별 최대 검색 개수
+    max_k: int = 20
 
 
 class VectorStoreConfig(BaseModel):
@@ -105,6 +228,15 @@ class VectorStoreConfig(BaseModel):
 
     persist_dir: str = "/home/public/data/chroma_db"
     collection_name: str = "rfp_rag"
+    # chroma 또는 numpy (메모리 맵 기반 flat 인덱스)
+    backend: str = "chroma"
+    # 저장 벡터 차원 (OpenAI: dimensions 파라미터, 로컬 모델: numpy backend에서 PCA 투영)
+    dimensions: Optional[int] = None
+    # numpy backend 저장 형식: none(float32), float16, int8 (벡터별 scale)
+    quantization: str = "none"
+    # numpy backend: 원래 float32 벡터를 함께 저장하고 상위 후보를 다시 계산
+    rescore: bool = False
+    rescore_multiplier: int = 4
 
 
 class LLMConfig(BaseModel):
@@ -117,12 +249,63 @@ class LLMConfig(BaseModel):
     max_new_tokens: int = 512
 
 
+class LocalInferenceConfig(BaseModel):
+    """
+    로컬(local_hf) LLM/임베딩 모델 추론 설정 (GPU가 없는 CPU 서버 기준)
+    """
+
+    # torch intra-op 스레드 수 (None이면 torch 기본값)
+    num_threads: Optional[int] = None
+    # 가중치 dtype: auto(체크포인트 그대로), float32, bfloat16 (CPU가 지원하지 않으면 float32)
+    dtype: str = "auto"
+    # CPU에서 Linear 층을 int8로 동적 양자화 (메모리 감소, CPU 추론 속도 향상)
+    quantize_int8: bool = False
+
+
+class EmbeddingCacheConfig(BaseModel):
+    """
+    임베딩 캐시(SQLite) 설정
+    """
+
+    enabled: bool = True
+    path: str = "/home/public/data/processed/embedding_cache.sqlite"
+    max_entries: Optional[int] = 1_000_000
+    # 저장 시 float 형식 (float16 또는 float32)
+    dtype: str = "float16"
+
+
 class EmbeddingsConfig(BaseModel):
     """
     임베딩 모델 설정
     """
 
     model_name: str = None
+    # 한 번의 요청/encode에 넣을 텍스트 수
+    batch_size: int = 64
+    # OpenAI: 동시에 보낼 임베딩 요청 수
+    max_concurrency: int = 4
+    # OpenAI: 길이순 정렬로 비슷한 길이끼리 배치 구성 (동시 요청 크기를 고르게)
+    sort_by_length: bool = True
+    # 로컬 HF 실행 backend: torch(PyTorch) 또는 onnx(ONNX Runtime, CPU)
+    local_backend: str = "torch"
+    # onnx backend: ONNX로 내보낸 모델을 캐시할 디렉토리
+    onnx_dir: str = "/home/public/data/processed/onnx_models"
+    # onnx backend: int8 동적 양자화 설정 (arm64, avx2, avx512, avx512_vnni, None이면 float32)
+    onnx_quantization: Optional[str] = None
+    cache: EmbeddingCacheConfig = Field(default_factory=EmbeddingCacheConfig)
+
+
+class MetricsConfig(BaseModel):
+    """
+    LangSmith와 별개로 로컬에서 수집하는 단계별 메트릭/트레이스 설정
+    """
+
+    # 꺼져 있으면 계측 코드는 bool 확인만 하고 바로 반환
+    enabled: bool = False
+    # 끝난 span을 JSONL로 기록할 경로 ({pid}는 프로세스 id로 치환, None이면 기록 안 함)
+    spans_path: Optional[str] = None
+    # 종료 시 Prometheus text format으로 메트릭을 쓸 경로 (None이면 쓰지 않음)
+    prometheus_path: Optional[str] = None
 
 
 class LangSmithConfig(BaseModel):
@@ -146,14 +329,20 @@ class AppConfig(BaseModel):
     device: Optional[str] = None  # "cuda" 또는 "cpu"
 
     chunking: ChunkingConfig = Field(default_factory=ChunkingConfig)
+    ingest: IngestConfig = Field(default_factory=IngestConfig)
     retrieval: RetrievalConfig = Field(default_factory=RetrievalConfig)
+    context: ContextConfig = Field(default_factory=ContextConfig)
+    answer_cache: AnswerCacheConfig = Field(default_factory=AnswerCacheConfig)
+    api: ApiConfig = Field(default_factory=ApiConfig)
     vectorstore: VectorStoreConfig = Field(default_factory=VectorStoreConfig)
     loader_config: MultiModalLoaderConfig = Field(
         default_factory=MultiModalLoaderConfig
     )
     llm: LLMConfig = Field(default_factory=LLMConfig)
     embeddings: EmbeddingsConfig = Field(default_factory=EmbeddingsConfig)
+    local_inference: LocalInferenceConfig = Field(default_factory=LocalInferenceConfig)
 
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
     langsmith: LangSmithConfig = Field(default_factory=LangSmithConfig)
 
 
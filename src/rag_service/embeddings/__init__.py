@@ -1,18 +1,58 @@
+from typing import Dict, Optional
+
 from ..config import get_app_config
-from .local_hf_embeddings import get_local_hf_embeddings
-from .openai_embeddings import get_openai_embeddings
+from .batching import BatchedEmbeddings
+from .cache import CachedEmbeddings, EmbeddingCacheStore
 
 
 def get_embeddings():
     """
     RAG_MODE에 따라 적절한 임베딩 모델을 반환합니다.
+    임베딩 캐시가 켜져 있으면 캐시가 적용된 래퍼로 감싸서 반환합니다.
+    backend 모듈은 선택된 것만 이 시점에 import합니다.
     Returns:
         임베딩 모델 인스턴스
     """
     cfg = get_app_config()
     if cfg.rag_mode == "local_hf":
-        return get_local_hf_embeddings()
+        from .local_hf_embeddings import get_local_hf_embeddings
+
+        embeddings = get_local_hf_embeddings()
     elif cfg.rag_mode == "openai_api":
-        return get_openai_embeddings()
+        from .openai_embeddings import get_openai_embeddings
+
+        embeddings = get_openai_embeddings()
     else:
         raise ValueError(f"지원하지 않는 RAG_MODE: {cfg.rag_mode}")
+
+    cache_cfg = cfg.embeddings.cache
+    if not cache_cfg.enabled:
+        return embeddings
+    store = EmbeddingCacheStore(
+        cache_cfg.path, max_entries=cache_cfg.max_entries, dtype=cache_cfg.dtype
+    )
+    model_name = f"{cfg.rag_mode}:{cfg.embeddings.model_name}"
+    if cfg.rag_mode == "openai_api" and cfg.vectorstore.dimensions:
+        # 차원을 줄여 받은 벡터는 다른 모델의 벡터로 취급
+        model_name += f":d{cfg.vectorstore.dimensions}"
+    if cfg.rag_mode == "local_hf" and cfg.embeddings.local_backend == "onnx":
+        # int8 양자화 모델의 벡터는 float32 모델과 조금 다르므로 따로 캐시
+        if cfg.embeddings.onnx_quantization:
+            model_name += f":onnx-{cfg.embeddings.onnx_quantization}"
+    return CachedEmbeddings(embeddings, store, model_name=model_name)
+
+
+def get_embedding_throughput(embeddings) -> Optional[Dict[str, float]]:
+    """
+    임베딩 래퍼 체인에서 BatchedEmbeddings를 찾아 처리량 통계를 반환합니다.
+    Args:
+        embeddings: get_embeddings()가 반환한 임베딩 모델
+    Returns:
+        처리량 통계 dict, BatchedEmbeddings가 없으면 None
+    """
+    current = embeddings
+    while current is not None:
+        if isinstance(current, BatchedEmbeddings):
+            return current.stats.report()
+        current = getattr(current, "underlying", None)
+    return None
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from .. import metrics
+
+
+def approx_token_count(text: str) -> int:
+    """
+    토크나이저가 없을 때 사용하는 대략적인 토큰 수 추정치입니다.
+    (한국어는 대략 2글자당 1토큰)
+    Args:
+        text: 텍스트
+    Returns:
+        int: 추정 토큰 수
+    """
+    return max(1, len(text) // 2)
+
+
+class EmbeddingThroughput:
+    """
+    임베딩 처리량(청크/초, 토큰/초) 통계를 누적합니다.
+    """
+
+    def __init__(self):
+        self.chunks = 0
+        self.tokens = 0
+        self.batches = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, chunks: int, tokens: int, batches: int, seconds: float) -> None:
+        """
+        한 번의 embed_documents 호출 결과를 누적합니다.
+        Args:
+            chunks: 임베딩한 청크 수
+            tokens: 임베딩한 토큰 수
+            batches: 요청(배치) 수
+            seconds: 걸린 시간(초)
+        """
+        with self._lock:
+            self.chunks += chunks
+            self.tokens += tokens
+            self.batches += batches
+            self.seconds += seconds
+
+    def report(self) -> Dict[str, float]:
+        """
+        누적 통계를 반환합니다.
+        Returns:
+            chunks, tokens, batches, seconds, chunks_per_sec, tokens_per_sec를 담은 dict
+        """
+        with self._lock:
+            secs = self.seconds or 1e-9
+            return {
+                "chunks": self.chunks,
+                "tokens": self.tokens,
+                "batches": self.batches,
+                "seconds": round(self.seconds, 3),
+                "chunks_per_sec": round(self.chunks / secs, 2),
+                "tokens_per_sec": round(self.tokens / secs, 2),
+            }
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    임베딩 요청을 배치 단위로 실행하는 래퍼입니다.
+    - batch_size: 한 번의 요청/encode에 넣을 텍스트 수
+    - max_concurrency: 동시에 보낼 배치 요청 수 (OpenAI 같은 원격 API용)
+    - sort_by_length: 길이순으로 정렬해 비슷한 길이끼리 배치를 만들어 동시 요청의 크기를 고르게 함
+      (OpenAI 같은 원격 API용, 결과는 원래 순서로 복원. SentenceTransformer.encode는
+      내부에서 이미 길이순으로 정렬하므로 로컬 encoder에는 효과가 없음)
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        batch_size: int = 64,
+        max_concurrency: int = 1,
+        sort_by_length: bool = False,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ):
+        self.underlying = underlying
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.sort_by_length = sort_by_length
+        self.token_counter = token_counter or approx_token_count
+        self.stats = EmbeddingThroughput()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        텍스트 목록을 배치로 나눠 임베딩하고, 입력 순서대로 결과를 반환합니다.
+        Args:
+            texts: 텍스트 목록
+        Returns:
+            텍스트별 임베딩 벡터
+        """
+        if not texts:
+            return []
+        with metrics.span("embedding") as span:
+            out, n_batches = self._embed_batched(texts)
+            span.set(texts=len(texts), batches=n_batches)
+        return out
+
+    def _embed_batched(self, texts: List[str]):
+        start = time.perf_counter()
+
+        order = list(range(len(texts)))
+        if self.sort_by_length:
+            order.sort(key=lambda i: len(texts[i]))
+        batches = [
+            order[i : i + self.batch_size] for i in range(0, len(order), self.batch_size)
+        ]
+
+        def _run(batch: List[int]) -> List[List[float]]:
+            with metrics.timer("embedding_batch"):
+                return self.underlying.embed_documents([texts[i] for i in batch])
+
+        if self.max_concurrency > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+                results = list(pool.map(_run, batches))
+        else:
+            results = [_run(b) for b in batches]
+
+        out: List[Optional[List[float]]] = [None] * len(texts)
+        for batch, vectors in zip(batches, results):
+            for i, vec in zip(batch, vectors):
+                out[i] = vec
+
+        tokens = sum(self.token_counter(t) for t in texts)
+        self.stats.add(
+            chunks=len(texts),
+            tokens=tokens,
+            batches=len(batches),
+            seconds=time.perf_counter() - start,
+        )
+        metrics.inc("embedding_texts", len(texts))
+        metrics.inc("embedding_tokens", tokens)
+        return out, len(batches)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        질문 텍스트를 임베딩합니다.
+        Args:
+            text: 질문 텍스트
+        Returns:
+            임베딩 벡터
+        """
+        return self.underlying.embed_query(text)
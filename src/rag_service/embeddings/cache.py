@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingCacheStore:
+    """
+    (모델 이름, 텍스트 해시) → 벡터를 저장하는 SQLite 캐시입니다.
+    벡터는 float16 바이트로 압축 저장하고, 최대 개수를 넘으면 오래 쓰이지 않은 항목부터 지웁니다.
+    """
+
+    def __init__(
+        self, path: str | Path, max_entries: Optional[int] = None, dtype: str = "float16"
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """
+        모델 이름과 텍스트로 캐시 키를 만듭니다.
+        Args:
+            model: 임베딩 모델 이름
+            text: 임베딩할 텍스트
+        Returns:
+            str: 캐시 키
+        """
+        return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def get_many(self, keys: List[str], batch_size: int = 500) -> Dict[str, List[float]]:
+        """
+        여러 키를 한 번에 조회합니다.
+        Args:
+            keys: 캐시 키 목록
+            batch_size: 한 번의 SQL 조회에 넣을 키 수
+        Returns:
+            찾은 키 → 벡터 dict
+        """
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), batch_size):
+                part = keys[start : start + batch_size]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=self.dtype).astype(np.float32).tolist()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                        [(now, key) for key, _ in rows],
+                    )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        """
+        여러 벡터를 한 번에 저장합니다.
+        Args:
+            items: 캐시 키 → 벡터 dict
+        """
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (key, np.asarray(vec, dtype=self.dtype).tobytes(), now) for key, vec in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """
+        max_entries를 넘는 항목을 last_access 기준으로 제거합니다. (LRU)
+        """
+        if not self.max_entries:
+            return
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def stats(self) -> Dict[str, float]:
+        """
+        캐시 적중/실패 통계를 반환합니다.
+        Returns:
+            hits, misses, hit_rate, entries를 담은 dict
+        """
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": entries,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    get_embeddings()가 반환하는 임베딩 모델을 감싸 영구 캐시를 적용합니다.
+    캐시에 없는 텍스트만 실제 모델로 임베딩합니다.
+    """
+
+    def __init__(self, underlying: Embeddings, store: EmbeddingCacheStore, model_name: str):
+        self.underlying = underlying
+        self.store = store
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        문서 텍스트 목록을 임베딩합니다. (캐시에 있으면 캐시 값 사용)
+        Args:
+            texts: 텍스트 목록
+        Returns:
+            텍스트별 임베딩 벡터
+        """
+        keys = [EmbeddingCacheStore.make_key(self.model_name, t) for t in texts]
+        found = self.store.get_many(keys)
+
+        # 캐시에 없는 텍스트는 중복을 제거하여 한 번만 임베딩
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            self.store.put_many(new_items)
+            found.update(new_items)
+
+        return [list(found[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        질문 텍스트를 임베딩합니다. (캐시에 있으면 캐시 값 사용)
+        Args:
+            text: 질문 텍스트
+        Returns:
+            임베딩 벡터
+        """
+        key = EmbeddingCacheStore.make_key(f"{self.model_name}:query", text)
+        found = self.store.get_many([key])
+        if key in found:
+            return found[key]
+        vector = self.underlying.embed_query(text)
+        self.store.put_many({key: vector})
+        return vector
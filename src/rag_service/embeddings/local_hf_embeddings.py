@@ -1,21 +1,116 @@
+from typing import Optional
+
 from langchain_huggingface import HuggingFaceEmbeddings
 from ..config import get_app_config
+from ..model_registry import (
+    config_key,
+    configure_torch_threads,
+    get_model_registry,
+    maybe_quantize_int8,
+    resolve_torch_dtype,
+)
+from .batching import BatchedEmbeddings, approx_token_count
 
 
 def get_local_hf_embeddings():
     """
     HuggingFace 임베딩 모델을 로드하여 반환합니다.
+    EmbeddingsConfig.local_backend가 onnx이면 ONNX Runtime으로 실행합니다.
+    Returns:
+        BatchedEmbeddings: 배치 실행 래퍼로 감싼 로컬 HuggingFace 임베딩 모델 객체
+    """
+    cfg = get_app_config()
+    emb_cfg = cfg.embeddings
+    backend = emb_cfg.local_backend
+    key = config_key(
+        model_name=emb_cfg.model_name,
+        device=cfg.device,
+        batch_size=emb_cfg.batch_size,
+        backend=backend,
+        onnx_quantization=emb_cfg.onnx_quantization if backend == "onnx" else None,
+        local_inference=cfg.local_inference.model_dump(),
+    )
+    # encoder는 설정별로 프로세스당 한 번만 로드하고, 배치 래퍼(처리량 통계)만 호출마다 새로 만듦
+    embeddings = get_model_registry().get(
+        "embeddings", key, lambda: load_local_hf_embeddings(backend, emb_cfg.onnx_quantization)
+    )
+    return wrap_batched(embeddings)
+
+
+def wrap_batched(embeddings: HuggingFaceEmbeddings) -> BatchedEmbeddings:
+    """
+    로컬 임베딩 모델을 배치 래퍼로 감쌉니다.
+    SentenceTransformer.encode가 내부에서 길이순으로 정렬하므로 래퍼에서는 정렬하지 않습니다.
+    Args:
+        embeddings: load_local_hf_embeddings()가 반환한 모델
+    Returns:
+        BatchedEmbeddings
+    """
+    emb_cfg = get_app_config().embeddings
+    tokenizer = getattr(getattr(embeddings, "_client", None), "tokenizer", None)
+    token_counter = (
+        (lambda text: len(tokenizer.encode(text, add_special_tokens=False)))
+        if tokenizer is not None
+        else approx_token_count
+    )
+    # 로컬 encoder는 한 프로세스에서 순차 실행 (동시 실행 시 CPU/GPU 경합)
+    return BatchedEmbeddings(
+        embeddings,
+        batch_size=emb_cfg.batch_size,
+        max_concurrency=1,
+        sort_by_length=False,
+        token_counter=token_counter,
+    )
+
+
+def load_local_hf_embeddings(
+    backend: str = "torch", onnx_quantization: Optional[str] = None
+) -> HuggingFaceEmbeddings:
+    """
+    SentenceTransformer 기반 임베딩 모델을 로드합니다.
+    - torch: PyTorch eager 실행, CPU 추론 옵션(스레드 수, dtype, int8 동적 양자화) 적용
+    - onnx: 모델을 ONNX로 내보내 onnx_dir에 캐시하고(선택적으로 int8 양자화) ONNX Runtime으로 실행
+    Args:
+        backend: torch 또는 onnx
+        onnx_quantization: onnx int8 동적 양자화 설정 (None이면 float32)
     Returns:
         HuggingFaceEmbeddings: 로컬 HuggingFace 임베딩 모델 객체
     """
     cfg = get_app_config()
-    return HuggingFaceEmbeddings(
-        model_name=cfg.embeddings.model_name,
-        model_kwargs={
-            "device": cfg.device,
-            # jinaai
-            "trust_remote_code": True,
-            "token": cfg.model_api_key,
-        },
-        encode_kwargs={"normalize_embeddings": True},
+    emb_cfg = cfg.embeddings
+    local_cfg = cfg.local_inference
+
+    if backend == "onnx":
+        from .onnx_backend import ensure_onnx_export, onnx_model_kwargs
+
+        if cfg.device not in (None, "cpu"):
+            print(f"[EMBED] onnx backend runs on CPU (device={cfg.device} ignored).")
+        model_dir, file_name = ensure_onnx_export(
+            emb_cfg.model_name, emb_cfg.onnx_dir, onnx_quantization, token=cfg.model_api_key
+        )
+        return HuggingFaceEmbeddings(
+            model_name=str(model_dir),
+            model_kwargs=onnx_model_kwargs(file_name, local_cfg.num_threads),
+            encode_kwargs={"normalize_embeddings": True, "batch_size": emb_cfg.batch_size},
+        )
+    if backend != "torch":
+        raise ValueError(f"지원하지 않는 embeddings.local_backend: {backend}")
+
+    configure_torch_threads(local_cfg)
+    model_kwargs = {
+        "device": cfg.device,
+        # jinaai
+        "trust_remote_code": True,
+        "token": cfg.model_api_key,
+    }
+    dtype = resolve_torch_dtype(local_cfg, cfg.device)
+    if dtype != "auto":
+        # SentenceTransformer가 transformers from_pretrained에 그대로 넘기는 인자
+        model_kwargs["model_kwargs"] = {"torch_dtype": dtype}
+    embeddings = HuggingFaceEmbeddings(
+        model_name=emb_cfg.model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs={"normalize_embeddings": True, "batch_size": emb_cfg.batch_size},
     )
+    maybe_quantize_int8(embeddings._client, local_cfg, cfg.device)
+    return embeddings
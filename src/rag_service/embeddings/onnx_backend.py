@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# optimum/onnxruntime은 onnx backend를 선택했을 때만 필요 (pip install optimum[onnxruntime])
+ONNX_QUANTIZATIONS = ("arm64", "avx2", "avx512", "avx512_vnni")
+
+
+def onnx_file_name(quantization: Optional[str]) -> str:
+    """
+    내보낸 모델 디렉토리 안에서 불러올 ONNX 파일 이름을 반환합니다.
+    Args:
+        quantization: int8 동적 양자화 설정 이름 (None이면 float32)
+    Returns:
+        모델 디렉토리 기준 상대 경로
+    """
+    if quantization is None:
+        return "onnx/model.onnx"
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+def export_dir_for(base_dir: str | Path, model_name: str) -> Path:
+    """
+    모델별 ONNX 내보내기 디렉토리 경로를 만듭니다.
+    """
+    return Path(base_dir) / model_name.replace("/", "__")
+
+
+def ensure_onnx_export(
+    model_name: str,
+    base_dir: str | Path,
+    quantization: Optional[str] = None,
+    token: Optional[str] = None,
+) -> Tuple[Path, str]:
+    """
+    SentenceTransformer 모델을 ONNX로 내보내 디스크에 캐시합니다. (이미 있으면 그대로 사용)
+    pooling/normalize 모듈 설정도 함께 저장되므로 PyTorch backend와 같은 방식으로 벡터를 만듭니다.
+    Args:
+        model_name: HuggingFace 모델 이름 또는 경로
+        base_dir: 내보낸 모델을 저장할 상위 디렉토리
+        quantization: int8 동적 양자화 설정 (arm64, avx2, avx512, avx512_vnni 또는 None)
+        token: HuggingFace 토큰
+    Returns:
+        (내보낸 모델 디렉토리, 불러올 ONNX 파일 이름)
+    """
+    if quantization is not None and quantization not in ONNX_QUANTIZATIONS:
+        raise ValueError(f"지원하지 않는 onnx_quantization: {quantization}")
+    out_dir = export_dir_for(base_dir, model_name)
+    file_name = onnx_file_name(quantization)
+    if (out_dir / file_name).exists():
+        return out_dir, file_name
+
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    if not (out_dir / onnx_file_name(None)).exists():
+        print(f"[EMBED] Exporting {model_name} to ONNX: {out_dir}")
+        model = SentenceTransformer(
+            model_name, backend="onnx", device="cpu", trust_remote_code=True, token=token
+        )
+        model.save_pretrained(str(out_dir))
+    if quantization is not None:
+        print(f"[EMBED] Quantizing ONNX model to int8 ({quantization}) ...")
+        model = SentenceTransformer(
+            str(out_dir),
+            backend="onnx",
+            device="cpu",
+            trust_remote_code=True,
+            model_kwargs={"file_name": onnx_file_name(None)},
+        )
+        export_dynamic_quantized_onnx_model(model, quantization, str(out_dir))
+    return out_dir, file_name
+
+
+def onnx_model_kwargs(file_name: str, num_threads: Optional[int] = None) -> Dict[str, Any]:
+    """
+    HuggingFaceEmbeddings(model_kwargs=...)로 넘길 ONNX Runtime 로드 인자를 만듭니다.
+    Args:
+        file_name: 불러올 ONNX 파일 이름
+        num_threads: intra-op 스레드 수 (None이면 ONNX Runtime 기본값)
+    Returns:
+        SentenceTransformer 생성 인자 dict
+    """
+    import onnxruntime as ort
+
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        session_options.intra_op_num_threads = num_threads
+    return {
+        "device": "cpu",
+        "backend": "onnx",
+        "trust_remote_code": True,
+        "model_kwargs": {
+            "file_name": file_name,
+            "provider": "CPUExecutionProvider",
+            "session_options": session_options,
+        },
+    }
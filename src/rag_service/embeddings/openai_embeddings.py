@@ -1,15 +1,48 @@
 from langchain_openai import OpenAIEmbeddings
 from ..config import get_app_config
+from .batching import BatchedEmbeddings, approx_token_count
+
+
+def _make_token_counter(model_name: str):
+    """
+    OpenAI 임베딩 모델의 토큰 수를 세는 함수를 만듭니다.
+    Args:
+        model_name: 임베딩 모델 이름
+    Returns:
+        텍스트 → 토큰 수 함수 (tiktoken이 없으면 추정치)
+    """
+    try:
+        import tiktoken
+
+        try:
+            enc = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            enc = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(enc.encode(text, disallowed_special=()))
+    except ImportError:
+        return approx_token_count
 
 
 def get_openai_embeddings():
     """
     OpenAI 임베딩 모델의 인스턴스를 가져옵니다.
+    배치 크기와 동시 요청 수는 EmbeddingsConfig를, 벡터 차원은 VectorStoreConfig.dimensions를 따릅니다.
     Returns:
-        OpenAIEmbeddings: OpenAI 임베딩 모델 객체
+        BatchedEmbeddings: 배치 실행 래퍼로 감싼 OpenAI 임베딩 모델 객체
     """
     cfg = get_app_config()
-    return OpenAIEmbeddings(
-        model=cfg.embeddings.model_name,
+    emb_cfg = cfg.embeddings
+    embeddings = OpenAIEmbeddings(
+        model=emb_cfg.model_name,
         api_key=cfg.model_api_key,
+        chunk_size=emb_cfg.batch_size,
+        # text-embedding-3 계열은 서버에서 차원을 줄여서 반환
+        dimensions=cfg.vectorstore.dimensions,
+    )
+    return BatchedEmbeddings(
+        embeddings,
+        batch_size=emb_cfg.batch_size,
+        max_concurrency=emb_cfg.max_concurrency,
+        sort_by_length=emb_cfg.sort_by_length,
+        token_counter=_make_token_counter(emb_cfg.model_name or ""),
     )
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class CaptionCache:
+    """
+    이미지 캡션을 SQLite 파일에 저장하는 영구 캐시입니다.
+    키는 (이미지 내용 해시, 캡션 모델, 프롬프트 해시)이므로
+    같은 이미지가 다른 파일/페이지에 다시 나와도 비전 모델을 다시 호출하지 않습니다.
+    """
+
+    def __init__(self, path: str | Path, max_entries: Optional[int] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # 여러 프로세스(병렬 로드)가 같은 파일을 쓰므로 WAL 모드 + busy timeout 사용
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS captions (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                caption TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_captions_last_access ON captions(last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(image_bytes: bytes, model: str, prompt: str) -> str:
+        """
+        이미지 내용, 모델, 프롬프트로 캐시 키를 만듭니다.
+        Args:
+            image_bytes: 이미지 원본 바이트
+            model: 캡션 모델 이름
+            prompt: 캡션 프롬프트
+        Returns:
+            str: 캐시 키
+        """
+        img_hash = hashlib.sha256(image_bytes).hexdigest()
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+        return f"{img_hash}:{model}:{prompt_hash}"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        캐시에서 캡션을 조회합니다.
+        Args:
+            key: 캐시 키
+        Returns:
+            캐시된 캡션, 없으면 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT caption FROM captions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE captions SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, model: str, caption: str) -> None:
+        """
+        캡션을 캐시에 저장하고, 최대 개수를 넘으면 오래 쓰이지 않은 항목부터 제거합니다.
+        Args:
+            key: 캐시 키
+            model: 캡션 모델 이름
+            caption: 저장할 캡션
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO captions (key, model, caption, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, caption, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """
+        max_entries를 넘는 항목을 last_access 기준으로 제거합니다. (LRU)
+        """
+        if not self.max_entries:
+            return
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM captions").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM captions WHERE key IN "
+                "(SELECT key FROM captions ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def stats(self) -> Dict[str, float]:
+        """
+        캐시 적중/실패 통계를 반환합니다.
+        Returns:
+            hits, misses, hit_rate, entries를 담은 dict
+        """
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM captions").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": entries,
+        }
+
+    def close(self) -> None:
+        """
+        SQLite 연결을 닫습니다.
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+import io
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+from ..config import ImageFilterConfig
+
+# PNG로 그대로 저장할 수 있는 PIL 이미지 모드
+_PNG_MODES = ("1", "L", "LA", "I", "P", "RGB", "RGBA")
+
+
+def dhash(img: Image.Image, hash_size: int = 8) -> int:
+    """
+    이미지의 difference hash(perceptual hash)를 계산합니다.
+    Args:
+        img: PIL 이미지
+        hash_size: 해시 한 변의 크기 (hash_size**2 비트)
+    Returns:
+        int: 해시 값
+    """
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    px = list(small.getdata())
+    bits = 0
+    for row in range(hash_size):
+        base = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (px[base + col] > px[base + col + 1])
+    return bits
+
+
+class ImageFilter:
+    """
+    캡션 요청 전에 이미지를 거르고 줄이는 전처리 단계입니다.
+    - 너무 작은 이미지(아이콘, 테두리 등) 제외
+    - 같은 문서 안에서 반복되는 xref 제외
+    - perceptual hash가 거의 같은 이미지(near-duplicate) 제외
+    - 통과한 이미지는 max_side 이하로 줄이고 JPEG로 재압축
+    중복 판단은 문서 단위이므로, 문서마다 reset()을 호출해야 합니다.
+    """
+
+    def __init__(self, cfg: ImageFilterConfig):
+        self.cfg = cfg
+        # 통과/제외 사유별 개수 (문서 단위)
+        self.stats: Counter = Counter()
+        self._seen_xrefs: set = set()
+        self._seen_hashes: List[int] = []
+
+    def reset(self) -> None:
+        """
+        문서 단위 중복 판단 상태와 통계를 초기화합니다.
+        """
+        self.stats = Counter()
+        self._seen_xrefs = set()
+        self._seen_hashes = []
+
+    def precheck(self, xref: int, width: int, height: int) -> bool:
+        """
+        이미지를 추출(디코딩)하기 전에 xref와 크기 정보만으로 검사합니다.
+        Args:
+            xref: PDF 내 이미지 xref
+            width: 이미지 가로 픽셀
+            height: 이미지 세로 픽셀
+        Returns:
+            bool: 다음 단계로 진행할지 여부 (False면 제외)
+        """
+        if not self.cfg.enabled:
+            return True
+
+        # 1) 반복 xref
+        if self.cfg.skip_repeated_xrefs:
+            if xref in self._seen_xrefs:
+                self.stats["repeated_xref"] += 1
+                return False
+            self._seen_xrefs.add(xref)
+
+        # 2) 크기/면적
+        if width < self.cfg.min_width or height < self.cfg.min_height:
+            self.stats["too_small"] += 1
+            return False
+        if width * height < self.cfg.min_area:
+            self.stats["too_small_area"] += 1
+            return False
+        return True
+
+    def file_tag(self) -> str:
+        """
+        이미지 처리 설정을 나타내는 파일 이름 접미사를 반환합니다.
+        (설정이 바뀌면 다른 파일에 저장하여 이전 설정으로 처리한 파일을 재사용하지 않도록 함)
+        Returns:
+            str: 예) "_s1024rq85" (긴 변 최대 픽셀, 재압축 여부, JPEG 품질), 필터를 끄면 ""
+        """
+        if not self.cfg.enabled:
+            return ""
+        recompress = "r" if self.cfg.recompress else ""
+        return f"_s{self.cfg.max_side or 0}{recompress}q{self.cfg.jpeg_quality}"
+
+    def process(self, img_bytes: bytes, ext: str) -> Tuple[Optional[bytes], str]:
+        """
+        precheck를 통과한 이미지의 near-duplicate 여부를 검사하고,
+        통과하면 축소/재압축한 바이트를 반환합니다.
+        Args:
+            img_bytes: 이미지 원본 바이트
+            ext: 이미지 확장자
+        Returns:
+            (처리된 이미지 바이트 또는 None(제외), 확장자)
+        """
+        if not self.cfg.enabled:
+            self.stats["kept"] += 1
+            return img_bytes, ext
+
+        try:
+            img = Image.open(io.BytesIO(img_bytes))
+            img.load()
+        except Exception:
+            # PIL이 읽지 못하는 형식(JBIG2 등)은 원본 그대로 통과
+            self.stats["kept"] += 1
+            return img_bytes, ext
+
+        # 3) near-duplicate: perceptual hash 해밍 거리
+        if self.cfg.phash_max_distance is not None and self.cfg.phash_max_distance >= 0:
+            h = dhash(img)
+            for seen in self._seen_hashes:
+                if bin(h ^ seen).count("1") <= self.cfg.phash_max_distance:
+                    self.stats["near_duplicate"] += 1
+                    return None, ext
+            self._seen_hashes.append(h)
+
+        self.stats["kept"] += 1
+        return self._downscale(img, img_bytes, ext)
+
+    def _downscale(self, img: Image.Image, img_bytes: bytes, ext: str) -> Tuple[bytes, str]:
+        """
+        이미지를 max_side 이하로 줄이고 JPEG로 재압축합니다.
+        재압축 결과가 원본보다 크면, 줄이지 않은 이미지는 원본을 그대로 사용하고
+        줄인 이미지는 PNG와 비교하여 더 작은 쪽을 사용합니다. (원본 해상도로 되돌리지 않음)
+        Args:
+            img: 디코딩된 PIL 이미지
+            img_bytes: 이미지 원본 바이트
+            ext: 이미지 확장자
+        Returns:
+            (이미지 바이트, 확장자)
+        """
+        resized = None
+        if self.cfg.max_side and max(img.size) > self.cfg.max_side:
+            resized = img.copy()
+            resized.thumbnail((self.cfg.max_side, self.cfg.max_side), Image.Resampling.LANCZOS)
+            img = resized
+            self.stats["downscaled"] += 1
+        elif not self.cfg.recompress:
+            return img_bytes, ext
+
+        if img.mode in ("RGBA", "LA", "P"):
+            rgba = img.convert("RGBA")
+            canvas = Image.new("RGB", rgba.size, (255, 255, 255))
+            canvas.paste(rgba, mask=rgba.split()[-1])
+            img = canvas
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=self.cfg.jpeg_quality, optimize=True)
+        out = buf.getvalue()
+        if len(out) < len(img_bytes) or ext.lower() not in ("jpg", "jpeg", "png"):
+            return out, "jpg"
+        if resized is None:
+            return img_bytes, ext
+
+        # 도식/스크린샷처럼 JPEG가 불리한 이미지는 줄인 이미지를 PNG로 저장
+        if resized.mode not in _PNG_MODES:
+            resized = resized.convert("RGB")
+        buf = io.BytesIO()
+        resized.save(buf, format="PNG", optimize=True)
+        png = buf.getvalue()
+        if len(png) < len(out):
+            return png, "png"
+        return out, "jpg"
+
+    def summary(self) -> str:
+        """
+        통과/제외 통계를 한 줄 문자열로 반환합니다.
+        Returns:
+            str: 통계 문자열
+        """
+        skipped = {k: v for k, v in self.stats.items() if k not in ("kept", "downscaled")}
+        return (
+            f"kept={self.stats['kept']} downscaled={self.stats['downscaled']} "
+            f"skipped={sum(skipped.values())} {dict(skipped)}"
+        )
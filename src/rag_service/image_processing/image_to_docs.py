@@ -1,14 +1,32 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+import asyncio
 import base64
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.documents import Document
 
-# OpenAI (LangChain)
-from langchain_openai import ChatOpenAI
+from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import HumanMessage
 
+from .. import metrics
 from ..config import get_app_config
+from .caption_cache import CaptionCache
+
+
+def _is_rate_limit_error(e: Exception) -> bool:
+    """
+    예외가 rate limit(HTTP 429) 에러인지 판단합니다.
+    Args:
+        e: 발생한 예외
+    Returns:
+        rate limit 에러 여부
+    """
+    if type(e).__name__ == "RateLimitError":
+        return True
+    return getattr(e, "status_code", None) == 429
 
 
 class ImageToDocs:
@@ -16,13 +34,27 @@ class ImageToDocs:
     이미지에서 OCR 텍스트와 캡션을 추출하여 Document로 변환합니다.
     """
 
-    def __init__(self):
+    def __init__(self, chat_model: Optional[BaseChatModel] = None):
         app_cfg = get_app_config()
         self.caption_cfg = app_cfg.loader_config.image_processing.caption
-        self._openai = ChatOpenAI(
-            model=app_cfg.loader_config.image_processing.caption.model,
-            api_key=app_cfg.model_api_key,  # OPENAI_API_KEY
-            temperature=0.0,
+        # 테스트 시 로컬 fake chat model을 주입할 수 있도록 chat_model 인자를 받음
+        if chat_model is None:
+            # OpenAI (LangChain), 주입받은 모델을 쓰면 import하지 않음
+            from langchain_openai import ChatOpenAI
+
+            chat_model = ChatOpenAI(
+                model=app_cfg.loader_config.image_processing.caption.model,
+                api_key=app_cfg.model_api_key,  # OPENAI_API_KEY
+                temperature=0.0,
+                # 429 재시도는 아래 caption.max_retries 백오프로만 처리 (클라이언트 재시도와 중첩 방지)
+                max_retries=0,
+            )
+        self._openai = chat_model
+        cache_cfg = self.caption_cfg.cache
+        self.cache = (
+            CaptionCache(cache_cfg.path, max_entries=cache_cfg.max_entries)
+            if cache_cfg.enabled
+            else None
         )
 
     def make_docs_from_image(
@@ -43,46 +75,140 @@ class ImageToDocs:
             List[Document]: Document 목록
         """
         image_path = Path(image_path)
+        caption_text = (
+            self._run_openai_caption_ko(image_path) if self.caption_cfg.enabled else ""
+        )
+        return self._build_docs(image_path, source, page, extra_meta, caption_text)
+
+    def make_docs_from_images(self, items: List[Dict[str, Any]]) -> List[Document]:
+        """
+        여러 이미지를 동시에 캡션하여 Document로 변환합니다. (amake_docs_from_images의 동기 버전)
+        이미 이벤트 루프가 돌고 있는 스레드(노트북, 비동기 서버 등)에서 호출되면
+        asyncio.run을 쓸 수 없으므로 별도 스레드의 새 이벤트 루프에서 실행합니다.
+        Args:
+            items: make_docs_from_image의 인자(image_path, source, page, extra_meta)를 담은 dict 목록
+        Returns:
+            List[Document]: 입력 순서와 같은 순서의 Document 목록
+        """
+        if not items:
+            return []
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.amake_docs_from_images(items))
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self.amake_docs_from_images(items)).result()
+
+    async def amake_docs_from_images(self, items: List[Dict[str, Any]]) -> List[Document]:
+        """
+        여러 이미지의 캡션을 최대 caption.max_concurrency개까지 동시에 요청하고,
+        결과를 입력(페이지/이미지) 순서대로 다시 모아 Document로 변환합니다.
+        Args:
+            items: make_docs_from_image의 인자(image_path, source, page, extra_meta)를 담은 dict 목록
+        Returns:
+            List[Document]: 입력 순서와 같은 순서의 Document 목록
+        """
+        semaphore = asyncio.Semaphore(max(1, self.caption_cfg.max_concurrency))
+
+        async def _one(item: Dict[str, Any]) -> List[Document]:
+            image_path = Path(item["image_path"])
+            caption_text = ""
+            if self.caption_cfg.enabled:
+                async with semaphore:
+                    caption_text = await self._arun_openai_caption_ko(image_path)
+            return self._build_docs(
+                image_path,
+                item["source"],
+                item.get("page"),
+                item.get("extra_meta"),
+                caption_text,
+            )
+
+        # gather는 입력 순서대로 결과를 반환함
+        with metrics.span("caption_batch") as span:
+            span.set(images=len(items))
+            results = await asyncio.gather(*(_one(item) for item in items))
+        return [d for docs in results for d in docs]
+
+    def _build_docs(
+        self,
+        image_path: Path,
+        source: str,
+        page: Optional[int],
+        extra_meta: Optional[Dict[str, Any]],
+        caption_text: str,
+    ) -> List[Document]:
+        """
+        이미지 경로와 캡션으로 Document를 만듭니다.
+        Args:
+            image_path: 이미지 파일 경로
+            source: 원본 문서의 소스 정보
+            page: 원본 문서의 페이지 번호
+            extra_meta: 추가 메타데이터
+            caption_text: 생성된 캡션
+        Returns:
+            List[Document]: Document 목록
+        """
         meta = {"source": source, "type": "image", "image_path": str(image_path)}
         if page is not None:
             meta["page"] = page
         if extra_meta:
             meta.update(extra_meta)
 
-        caption_text = (
-            self._run_openai_caption_ko(image_path) if self.caption_cfg.enabled else ""
-        )
-
         parts = [f"[IMAGE] {image_path.name}"]
         if caption_text:
             parts.append("[CAPTION_KO]\n" + caption_text)
         return [Document(page_content="\n\n".join(parts).strip(), metadata=meta)]
 
-    def _image_to_data_url(self, image_path: Path) -> str:
+    def _image_to_data_url(self, image_path: Path, image_bytes: Optional[bytes] = None) -> str:
         """
         이미지를 base64 인코딩된 data URL로 변환합니다.
         Args:
             image_path: 이미지 파일 경로
+            image_bytes: 이미 읽어 둔 이미지 바이트 (없으면 파일에서 읽음)
         Returns:
             str: data URL 문자열
         """
         ext = image_path.suffix.lower().lstrip(".") or "png"
         mime = "image/png" if ext in ["png"] else "image/jpeg"
-        b64 = base64.b64encode(image_path.read_bytes()).decode("utf-8")
+        if image_bytes is None:
+            image_bytes = image_path.read_bytes()
+        b64 = base64.b64encode(image_bytes).decode("utf-8")
         return f"data:{mime};base64,{b64}"
 
-    def _run_openai_caption_ko(self, image_path: Path) -> str:
+    def _prepare_caption(self, image_path: Path) -> Tuple[Optional[str], Optional[str], bytes]:
         """
-        OpenAI를 사용하여 이미지에 대한 한국어 캡션을 생성합니다.
+        이미지를 읽고 캐시를 조회합니다.
         Args:
             image_path: 이미지 파일 경로
         Returns:
-            str: 생성된 캡션
+            (캐시 키, 캐시된 캡션 또는 None, 이미지 바이트)
+        """
+        image_bytes = image_path.read_bytes()
+
+        # 같은 이미지/모델/프롬프트로 만든 캡션이 있으면 API를 호출하지 않음
+        if self.cache is None:
+            return None, None, image_bytes
+        cache_key = CaptionCache.make_key(
+            image_bytes, self.caption_cfg.model, self.caption_cfg.prompt_ko
+        )
+        cached = self.cache.get(cache_key)
+        metrics.inc("caption_cache_lookups", result="miss" if cached is None else "hit")
+        return cache_key, cached, image_bytes
+
+    def _build_caption_message(self, image_path: Path, image_bytes: bytes) -> HumanMessage:
+        """
+        캡션 요청용 비전 입력 메시지를 만듭니다.
+        Args:
+            image_path: 이미지 파일 경로
+            image_bytes: 이미지 바이트
+        Returns:
+            HumanMessage: 프롬프트와 이미지를 담은 메시지
         """
-        data_url = self._image_to_data_url(image_path)
+        data_url = self._image_to_data_url(image_path, image_bytes)
 
         # OpenAI 비전 입력: content blocks (text + image_url) :contentReference[oaicite:2]{index=2}
-        msg = HumanMessage(
+        return HumanMessage(
             content=[
                 {
                     "type": "text",
@@ -92,5 +218,89 @@ class ImageToDocs:
             ]
         )
 
-        resp = self._openai.invoke([msg])
-        return (resp.content or "").strip()
+    def _store_caption(self, cache_key: Optional[str], caption: str) -> None:
+        """
+        생성된 캡션을 캐시에 저장합니다.
+        Args:
+            cache_key: 캐시 키 (캐시 비활성화 시 None)
+            caption: 생성된 캡션
+        """
+        if cache_key is not None and caption:
+            self.cache.put(cache_key, self.caption_cfg.model, caption)
+
+    def _retry_delay(self, e: Exception, attempt: int) -> Optional[float]:
+        """
+        rate limit 에러면 다음 재시도까지 기다릴 시간(지수 백오프 + jitter)을, 아니면 None을 반환합니다.
+        Args:
+            e: 발생한 예외
+            attempt: 지금까지의 재시도 횟수
+        Returns:
+            대기 시간(초) 또는 None (재시도하지 않음)
+        """
+        if not _is_rate_limit_error(e) or attempt >= self.caption_cfg.max_retries:
+            return None
+        metrics.inc("caption_rate_limit_retries")
+        delay = self.caption_cfg.retry_base_delay * (2**attempt)
+        return delay + random.uniform(0, delay)
+
+    def _run_openai_caption_ko(self, image_path: Path) -> str:
+        """
+        OpenAI를 사용하여 이미지에 대한 한국어 캡션을 생성합니다.
+        rate limit 에러가 나면 지수 백오프(+jitter)로 caption.max_retries번까지 재시도합니다.
+        Args:
+            image_path: 이미지 파일 경로
+        Returns:
+            str: 생성된 캡션
+        """
+        cache_key, cached, image_bytes = self._prepare_caption(image_path)
+        if cached is not None:
+            return cached
+
+        msg = self._build_caption_message(image_path, image_bytes)
+        attempt = 0
+        while True:
+            try:
+                with metrics.timer("caption_request"):
+                    resp = self._openai.invoke([msg])
+                break
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+        caption = (resp.content or "").strip()
+        self._store_caption(cache_key, caption)
+        return caption
+
+    async def _arun_openai_caption_ko(self, image_path: Path) -> str:
+        """
+        OpenAI를 비동기로 호출하여 이미지에 대한 한국어 캡션을 생성합니다.
+        rate limit 에러가 나면 지수 백오프(+jitter)로 caption.max_retries번까지 재시도합니다.
+        이미지 읽기와 캐시(SQLite) 조회/저장은 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+        Args:
+            image_path: 이미지 파일 경로
+        Returns:
+            str: 생성된 캡션
+        """
+        cache_key, cached, image_bytes = await asyncio.to_thread(self._prepare_caption, image_path)
+        if cached is not None:
+            return cached
+
+        msg = self._build_caption_message(image_path, image_bytes)
+        attempt = 0
+        while True:
+            try:
+                with metrics.timer("caption_request"):
+                    resp = await self._openai.ainvoke([msg])
+                break
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+        caption = (resp.content or "").strip()
+        await asyncio.to_thread(self._store_caption, cache_key, caption)
+        return caption
@@ -1,28 +1,57 @@
 from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
 from langchain_huggingface import HuggingFacePipeline
 from ..config import get_app_config
+from ..model_registry import (
+    config_key,
+    configure_torch_threads,
+    get_model_registry,
+    maybe_quantize_int8,
+    resolve_torch_dtype,
+)
 from dotenv import load_dotenv
 
 
 def get_local_hf_llm():
     """
     HuggingFacePipeline을 사용하여 로컬 LLM을 가져옵니다.
+    stream/astream 시에는 TextIteratorStreamer로 생성되는 토큰을 바로 전달합니다.
+    모델은 설정별로 프로세스당 한 번만 로드하여 모든 체인/스레드가 공유합니다. (release_models로 해제)
     Returns:
         HuggingFacePipeline: 로컬 HuggingFace LLM 객체
     """
     load_dotenv()  # 루트 .env 로드
     cfg = get_app_config()
+    key = config_key(
+        model_name=cfg.llm.model_name,
+        device=cfg.device,
+        temperature=cfg.llm.temperature,
+        max_new_tokens=cfg.llm.max_new_tokens,
+        local_inference=cfg.local_inference.model_dump(),
+    )
+    return get_model_registry().get("llm", key, _load_local_hf_llm)
+
+
+def _load_local_hf_llm():
+    """
+    토크나이저와 모델을 로드하고 CPU 추론 옵션(스레드 수, dtype, int8 동적 양자화)을 적용합니다.
+    Returns:
+        HuggingFacePipeline: 로컬 HuggingFace LLM 객체
+    """
+    cfg = get_app_config()
+    local_cfg = cfg.local_inference
     model_name = cfg.llm.model_name
+    configure_torch_threads(local_cfg)
 
     tokenizer = AutoTokenizer.from_pretrained(model_name, token=cfg.model_api_key)
     model = AutoModelForCausalLM.from_pretrained(
         model_name,
         device_map=cfg.device,
-        dtype="auto",
+        dtype=resolve_torch_dtype(local_cfg, cfg.device),
         # LGAI-EXAONE
         token=cfg.model_api_key,
         trust_remote_code=True,
     )
+    model = maybe_quantize_int8(model, local_cfg, cfg.device)
     gen_pipeline = pipeline(
         "text-generation",
         model=model,
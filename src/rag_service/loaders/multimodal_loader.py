@@ -1,23 +1,29 @@
 from __future__ import annotations
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import fitz  # PyMuPDF
-import re
 from langchain_core.documents import Document
-from langchain_community.document_loaders import PyMuPDFLoader
 
 from .base import BaseRFPDocumentLoader
+from .. import metrics
 from ..config import get_app_config
+from ..image_processing.image_filter import ImageFilter
 from ..image_processing.image_to_docs import ImageToDocs
 
 
 class MultiModalLoader(BaseRFPDocumentLoader):
     """
     PDF 파일에서 텍스트, 테이블, 이미지를 추출하여 Document로 변환합니다.
+    문서는 한 번만 열고, 페이지를 한 번 순회하면서 세 종류의 Document를 함께 만듭니다.
     """
 
-    def __init__(self):
+    def __init__(self, image_to_docs: Optional[ImageToDocs] = None):
         app_cfg = get_app_config()
         self.cfg = app_cfg.loader_config
 
@@ -25,161 +31,356 @@ class MultiModalLoader(BaseRFPDocumentLoader):
         self.ip = app_cfg.loader_config.image_processing
         Path(self.ip.image_output_dir).mkdir(parents=True, exist_ok=True)
 
-        # 이미지 -> 텍스트 요약 모듈 초기화
-        self.image_to_docs = ImageToDocs()
+        # 이미지 -> 텍스트 요약 모듈 초기화 (벤치마크/테스트 시 fake chat model을 쓰는 객체 주입)
+        self.image_to_docs = image_to_docs or ImageToDocs()
+        # 캡션 전 이미지 필터/축소 단계
+        self.image_filter = ImageFilter(self.ip.filter)
 
-        self.TABLE_BLOCK_RE = re.compile(
-            r"""
-            (                               # table block start
-            ^\|.*\|\s*$\n                 # header row
-            ^\|(?:\s*:?-+:?\s*\|)+\s*$\n  # separator row: |---| or |:---:|
-            (?:^\|.*\|\s*$\n?)+           # body rows (1+)
-            )                               # table block end
-            """,
-            re.MULTILINE | re.VERBOSE,
-        )
+        # 로드에 실패한 파일 목록 (path, 에러 메시지)
+        self.failed_files: List[Tuple[str, str]] = []
 
     def load(self, pdf_path: str | Path) -> List[Document]:
         pdf_path = Path(pdf_path)
-        docs: List[Document] = []
+        text_docs: List[Document] = []
+        table_docs: List[Document] = []
+        image_items: List[dict] = []
 
-        # ✅ 텍스트 추출
-        docs.extend(self._extract_text_docs(pdf_path))
+        self.image_filter.reset()
+        with metrics.span("loader_file") as span, fitz.open(pdf_path) as doc:
+            end = min(doc.page_count, self.cfg.max_pages) if self.cfg.max_pages else doc.page_count
+            for i in range(end):
+                page = doc.load_page(i)
 
-        # ✅ 테이블 추출
-        if self.cfg.extract_tables:
-            docs.extend(self._extract_table_docs(pdf_path))
+                # ✅ 텍스트 추출
+                with metrics.timer("loader_stage", stage="text"):
+                    text_docs.extend(self._extract_text_docs(page, pdf_path, i))
 
-        # ✅ 이미지 추출
-        if self.ip.extract_images:
-            docs.extend(self._extract_image_docs(pdf_path))
+                # ✅ 테이블 추출 (표가 있을 법한 페이지만)
+                if self.cfg.extract_tables:
+                    with metrics.timer("loader_stage", stage="table"):
+                        if self._page_may_have_tables(page):
+                            table_docs.extend(self._extract_table_docs(page, pdf_path, i))
 
-        return docs
+                # ✅ 이미지 추출 (캡션은 문서 단위로 모아서 동시에 요청)
+                if self.ip.extract_images:
+                    with metrics.timer("loader_stage", stage="image"):
+                        image_items.extend(self._extract_image_items(doc, page, pdf_path, i))
+            span.set(source=pdf_path.name, pages=end)
 
-    def load_directory(self, dir_path: str | Path) -> List[Document]:
-        dir_path = Path(dir_path)
+            if self.ip.extract_images:
+                print(f"[LOADER] Images in {pdf_path.name}: {self.image_filter.summary()}")
+
+            # ✅ 핵심: 이미지 파일 → 캡션(한국어) Document 생성 (페이지/이미지 순서 유지)
+            image_docs = self.image_to_docs.make_docs_from_images(image_items)
+
+        metrics.inc("loader_pages", end)
+        metrics.inc("loader_documents", len(text_docs), type="text")
+        metrics.inc("loader_documents", len(table_docs), type="table")
+        metrics.inc("loader_documents", len(image_docs), type="image")
+        # 기존과 같은 순서(텍스트 → 테이블 → 이미지)로 반환
+        return text_docs + table_docs + image_docs
+
+    def load_directory(
+        self, dir_path: str | Path, num_workers: Optional[int] = None
+    ) -> List[Document]:
         all_docs: List[Document] = []
-        for fp in dir_path.glob("**/*"):
-            if fp.suffix.lower() in [".pdf"]:
-                all_docs.extend(self.load(fp))
+        for _, docs in self.iter_directory(dir_path, num_workers=num_workers):
+            all_docs.extend(docs)
         return all_docs
 
-    def _extract_text_docs(self, pdf_path: Path) -> List[Document]:
+    def iter_directory(
+        self, dir_path: str | Path, num_workers: Optional[int] = None
+    ) -> Iterator[Tuple[Path, List[Document]]]:
+        """
+        디렉토리 내 PDF를 파일 경로 순서대로 로드하여 (파일 경로, Document 목록)을 하나씩 반환합니다.
+        num_workers가 2 이상이면 프로세스 풀에 파일을 나눠 병렬로 파싱하되,
+        결과는 항상 정렬된 파일 순서대로 반환합니다.
+        로드에 실패한 파일은 건너뛰고 self.failed_files에 기록합니다.
+        Args:
+            dir_path: 디렉토리 경로
+            num_workers: 사용할 프로세스 수 (None이면 설정값 사용)
+        Returns:
+            (파일 경로, Document 목록)의 iterator
+        """
+        yield from self.iter_files(self.list_pdf_files(dir_path), num_workers=num_workers)
+
+    def iter_files(
+        self, files: List[Path], num_workers: Optional[int] = None
+    ) -> Iterator[Tuple[Path, List[Document]]]:
+        """
+        주어진 파일들을 순서대로 로드하여 (파일 경로, Document 목록)을 하나씩 반환합니다.
+        Args:
+            files: 로드할 파일 경로 목록
+            num_workers: 사용할 프로세스 수 (None이면 설정값 사용)
+        Returns:
+            (파일 경로, Document 목록)의 iterator
+        """
+        files = [Path(fp) for fp in files]
+        workers = num_workers if num_workers is not None else self.cfg.num_workers
+        workers = max(1, min(workers, len(files)))
+        self.failed_files = []
+
+        if workers == 1:
+            results = (self._safe_load(fp) for fp in files)
+            yield from self._collect(results)
+            return
+
+        print(f"[LOADER] Loading {len(files)} files with {workers} processes ...")
+        yield from self._collect(self._ordered_results(files, workers, window=workers * 2))
+
+    def _ordered_results(self, files: List[Path], workers: int, window: int):
         """
-        PDF 파일에서 fitz로 텍스트를 추출하여 Document로 변환합니다.
+        최대 window개의 파일만 미리 제출하고, 결과는 입력 순서대로 반환합니다.
+        (pool.map은 모든 작업을 한꺼번에 제출해 결과가 메모리에 쌓이므로 사용하지 않음)
+        워커가 비정상 종료(PyMuPDF segfault, OOM kill 등)하면 풀 전체가 깨지므로, 풀을 다시 만들고
+        맨 앞 파일을 혼자 다시 실행합니다. 혼자 실행해도 워커가 죽으면 그 파일을 실패로 기록하고,
+        아직 끝나지 않았던 나머지 파일은 새 풀에 다시 제출합니다.
         Args:
+            files: 파일 경로 목록
+            workers: 프로세스 수
+            window: 동시에 제출해 둘 최대 작업 수
+        Returns:
+            (파일 경로, Document 목록, 에러 메시지)의 iterator
+        """
+        pool = _new_worker_pool(workers)
+        pending: deque = deque()
+        it = iter(files)
+        # 풀이 깨졌을 때 맨 앞에 있던 파일 (혼자 다시 실행하는 중)
+        suspect: Optional[Path] = None
+        try:
+            while True:
+                limit = 1 if suspect is not None else window
+                for fp in itertools.islice(it, max(0, limit - len(pending))):
+                    pending.append((fp, pool.submit(_load_file_in_worker, fp)))
+                if not pending:
+                    return
+                fp, future = pending.popleft()
+                try:
+                    *result, worker_metrics = future.result()
+                except BrokenProcessPool as e:
+                    retry = [f for f, _ in pending]
+                    pending.clear()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = _new_worker_pool(workers)
+                    if fp == suspect:
+                        suspect = None
+                        yield fp, [], f"{type(e).__name__}: worker process crashed"
+                    else:
+                        print(f"[LOADER] Worker process crashed, retrying {fp.name} alone ...")
+                        suspect = fp
+                        retry.insert(0, fp)
+                    it = itertools.chain(retry, it)
+                    continue
+                suspect = None
+                # 워커의 loader_stage/loader_pages 등은 부모의 메트릭 파일에 함께 기록
+                metrics.merge_worker_metrics(worker_metrics)
+                yield tuple(result)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def list_pdf_files(self, dir_path: str | Path) -> List[Path]:
+        """
+        디렉토리 내 PDF 파일 목록을 정렬하여 반환합니다.
+        Args:
+            dir_path: 디렉토리 경로
+        Returns:
+            PDF 파일 경로 목록
+        """
+        dir_path = Path(dir_path)
+        return sorted(fp for fp in dir_path.glob("**/*") if fp.suffix.lower() in [".pdf"])
+
+    def _safe_load(self, fp: Path) -> Tuple[Path, List[Document], Optional[str]]:
+        """
+        단일 파일을 로드하고, 실패하더라도 예외 대신 에러 메시지를 반환합니다.
+        Args:
+            fp: 파일 경로
+        Returns:
+            (파일 경로, Document 목록, 에러 메시지 또는 None)
+        """
+        try:
+            return fp, self.load(fp), None
+        except Exception as e:
+            return fp, [], f"{type(e).__name__}: {e}"
+
+    def _collect(self, results) -> Iterator[Tuple[Path, List[Document]]]:
+        """
+        로드 결과에서 실패한 파일을 기록하고 성공한 파일만 반환합니다.
+        Args:
+            results: (파일 경로, Document 목록, 에러 메시지) iterator
+        Returns:
+            (파일 경로, Document 목록)의 iterator
+        """
+        for fp, docs, err in results:
+            if err is not None:
+                print(f"[LOADER] Failed to load {fp}: {err}")
+                self.failed_files.append((str(fp), err))
+                continue
+            yield fp, docs
+
+    def _extract_text_docs(self, page: fitz.Page, pdf_path: Path, i: int) -> List[Document]:
+        """
+        페이지에서 fitz로 텍스트를 추출하여 Document로 변환합니다.
+        Args:
+            page: fitz 페이지 객체
             pdf_path: PDF 파일 경로
+            i: 0부터 시작하는 페이지 인덱스
         Returns:
             out: Document의 목록
         """
-        out: List[Document] = []
-        with fitz.open(pdf_path) as doc:
-            end = (
-                min(doc.page_count, self.cfg.max_pages)
-                if self.cfg.max_pages
-                else doc.page_count
+        text = page.get_text("text").strip()
+        if not text:
+            return []
+        return [
+            Document(
+                page_content=text,
+                metadata={
+                    "source": str(pdf_path),
+                    "page": i + 1,
+                    "type": "text",
+                },
             )
-            for i in range(end):
-                page = doc.load_page(i)
-                text = page.get_text("text").strip()
-                if not text:
-                    continue
-                out.append(
-                    Document(
-                        page_content=text,
-                        metadata={
-                            "source": str(pdf_path),
-                            "page": i + 1,
-                            "type": "text",
-                        },
-                    )
-                )
-        return out
+        ]
 
-    def _split_md_tables(self, doc: Document):
+    def _page_may_have_tables(self, page: fitz.Page) -> bool:
         """
-        Document에서 마크다운 형식의 테이블을 추출합니다.
+        페이지에 표가 있을 가능성이 있는지 가볍게 판단합니다.
+        find_tables는 선(ruling line)을 기준으로 표를 찾으므로,
+        선/사각형 드로잉이 충분히 많은 페이지만 후보로 봅니다.
         Args:
-            doc: Document 객체
+            page: fitz 페이지 객체
         Returns:
-            tables: 마크다운 형식으로 추출된 테이블
+            표 탐지를 실행할지 여부
         """
-        content = doc.page_content
-        tables: list[str] = self.TABLE_BLOCK_RE.findall(content)  # list[str]
-
-        return [t.strip() for t in tables]
+        get_drawings = getattr(page, "get_cdrawings", None) or page.get_drawings
+        count = 0
+        for drawing in get_drawings():
+            for item in drawing.get("items", ()):
+                if item[0] in ("l", "re"):
+                    count += 1
+                    if count >= self.cfg.table_min_drawings:
+                        return True
+        return False
 
-    def _extract_table_docs(self, pdf_path: Path) -> List[Document]:
+    def _extract_table_docs(self, page: fitz.Page, pdf_path: Path, i: int) -> List[Document]:
         """
-        PDF 파일에서 PyMuPDFLoader로 테이블을 추출하여 Document로 변환합니다.
+        페이지에서 page.find_tables로 테이블을 찾아 마크다운 Document로 변환합니다.
         Args:
+            page: fitz 페이지 객체
             pdf_path: PDF 파일 경로
+            i: 0부터 시작하는 페이지 인덱스
         Returns:
             out: Document의 목록
         """
         out: List[Document] = []
-        loader = PyMuPDFLoader(pdf_path, extract_tables="markdown")
-        documents = loader.load()
-
-        for idx, doc in enumerate(documents):
-            table = self._split_md_tables(doc)
-            if len(table) != 0:
-                out.append(
-                    Document(
-                        page_content=table[0],
-                        metadata={
-                            "source": str(pdf_path),
-                            "type": "table",
-                            "page": idx + 1,
-                        },
-                    )
+        try:
+            tables = page.find_tables().tables
+        except Exception as e:
+            print(f"[LOADER] Table detection failed: {pdf_path} p{i + 1} ({e})")
+            return out
+
+        for t_idx, table in enumerate(tables):
+            md = (table.to_markdown() or "").strip()
+            if not md:
+                continue
+            out.append(
+                Document(
+                    page_content=md,
+                    metadata={
+                        "source": str(pdf_path),
+                        "type": "table",
+                        "page": i + 1,
+                        "table_index": t_idx + 1,
+                    },
                 )
+            )
         return out
 
-    def _extract_image_docs(self, pdf_path: Path) -> List[Document]:
+    def _extract_image_items(
+        self, doc: fitz.Document, page: fitz.Page, pdf_path: Path, i: int
+    ) -> List[dict]:
         """
-        PDF 파일에서 fitz로 페이지마다 이미지를 추출하여 Document로 변환합니다.
+        페이지에서 fitz로 이미지를 추출해 파일로 저장하고, 캡션 요청 목록을 만듭니다.
         Args:
+            doc: 열려 있는 fitz 문서 객체
+            page: fitz 페이지 객체
             pdf_path: PDF 파일 경로
+            i: 0부터 시작하는 페이지 인덱스
         Returns:
-            out: Document의 목록
+            out: ImageToDocs.make_docs_from_images에 넘길 dict 목록
         """
-        out: List[Document] = []
+        out: List[dict] = []
+        images = page.get_images(full=True)
+
+        for j, img in enumerate(images):
+            xref, width, height = img[0], img[2], img[3]
+            # 반복 xref/작은 이미지는 extract_image 전에 제외
+            if not self.image_filter.precheck(xref, width, height):
+                continue
 
-        with fitz.open(pdf_path) as doc:
-            end = (
-                min(doc.page_count, self.cfg.max_pages)
-                if self.cfg.max_pages
-                else doc.page_count
+            base = doc.extract_image(xref)
+            img_bytes, ext = self.image_filter.process(base["image"], base.get("ext", "png"))
+            if img_bytes is None:
+                continue
+
+            # 캡션은 이 파일을 읽어 보내므로, 이전 실행(다른 설정)의 파일이 있어도 처리한 바이트로 덮어씀
+            img_file = (
+                Path(self.ip.image_output_dir)
+                / f"{pdf_path.stem}"
+                / f"{pdf_path.stem}_p{i+1}_img{j+1}{self.image_filter.file_tag()}.{ext}"
             )
+            img_file.parent.mkdir(parents=True, exist_ok=True)
+            img_file.write_bytes(img_bytes)
 
-            for i in range(end):
-                page = doc.load_page(i)
-                images = page.get_images(full=True)
-
-                for j, img in enumerate(images):
-                    xref = img[0]
-                    base = doc.extract_image(xref)
-                    img_bytes = base["image"]
-                    ext = base.get("ext", "png")
-
-                    img_file = (
-                        Path(self.ip.image_output_dir)
-                        / f"{pdf_path.stem}"
-                        / f"{pdf_path.stem}_p{i+1}_img{j+1}.{ext}"
-                    )
-                    img_file.parent.mkdir(parents=True, exist_ok=True)
-                    if not img_file.exists():
-                        img_file.write_bytes(img_bytes)
-
-                    # ✅ 핵심: 이미지 파일 → 캡션(한국어) Document 생성
-                    out.extend(
-                        self.image_to_docs.make_docs_from_image(
-                            image_path=img_file,
-                            source=str(pdf_path),
-                            page=i + 1,
-                            extra_meta={"image_index": j + 1},
-                        )
-                    )
+            out.append(
+                {
+                    "image_path": img_file,
+                    "source": str(pdf_path),
+                    "page": i + 1,
+                    "extra_meta": {"image_index": j + 1},
+                }
+            )
 
         return out
+
+
+# ---------- 프로세스 풀 워커 ----------
+
+_worker_loader: Optional[MultiModalLoader] = None
+
+
+def _new_worker_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    파일 로드용 프로세스 풀을 만듭니다. (spawn: fork된 PyMuPDF/스레드 상태를 물려받지 않음)
+    Args:
+        workers: 프로세스 수
+    Returns:
+        ProcessPoolExecutor
+    """
+    ctx = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker_loader)
+
+
+def _init_worker_loader() -> None:
+    """
+    워커 프로세스마다 MultiModalLoader를 한 번만 생성합니다.
+    (spawn된 워커는 계측 설정을 물려받지 않으므로 여기서 다시 설정, span은 워커별 파일에 기록하고
+    counter/histogram은 파일 결과와 함께 부모 프로세스로 보냄)
+    """
+    global _worker_loader
+    metrics.setup_metrics(worker=True)
+    _worker_loader = MultiModalLoader()
+
+
+def _load_file_in_worker(
+    fp: Path,
+) -> Tuple[Path, List[Document], Optional[str], Optional[Dict[str, Any]]]:
+    """
+    워커 프로세스에서 단일 파일을 로드합니다.
+    Args:
+        fp: 파일 경로
+    Returns:
+        (파일 경로, Document 목록, 에러 메시지 또는 None, 이 파일을 처리하며 기록한 메트릭)
+    """
+    if _worker_loader is None:
+        _init_worker_loader()
+    return (*_worker_loader._safe_load(fp), metrics.drain_worker_metrics())
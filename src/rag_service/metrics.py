@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .config import get_app_config
+
+
+# 초 단위 히스토그램 기본 구간
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> _LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Histogram:
+    """
+    누적 구간(bucket) 히스토그램 하나의 값입니다.
+    """
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * (n_buckets + 1)  # 마지막은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    프로세스 내 counter/histogram 값을 모아 두는 저장소입니다.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[_LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[_LabelKey, _Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, Any]] = None) -> None:
+        key = _label_key(labels or {})
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        key = _label_key(labels or {})
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(len(self.buckets))
+            hist.counts[idx] += 1
+            hist.sum += value
+            hist.count += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def drain(self) -> Dict[str, Any]:
+        """
+        현재 값을 pickle 가능한 dict로 꺼내고 비웁니다. (워커 → 부모 프로세스 전달용)
+        """
+        with self._lock:
+            state = {
+                "counters": self.counters,
+                "histograms": {
+                    name: {key: (h.counts, h.sum, h.count) for key, h in s.items()}
+                    for name, s in self.histograms.items()
+                },
+            }
+            self.counters, self.histograms = {}, {}
+        return state
+
+    def merge(self, state: Dict[str, Any]) -> None:
+        """
+        drain()으로 꺼낸 값을 더합니다. (같은 buckets를 쓰는 registry끼리)
+        """
+        with self._lock:
+            for name, s in state["counters"].items():
+                series = self.counters.setdefault(name, {})
+                for key, value in s.items():
+                    series[key] = series.get(key, 0.0) + value
+            for name, s in state["histograms"].items():
+                series = self.histograms.setdefault(name, {})
+                for key, (counts, total, count) in s.items():
+                    hist = series.get(key)
+                    if hist is None:
+                        hist = series[key] = _Histogram(len(self.buckets))
+                    hist.counts = [a + b for a, b in zip(hist.counts, counts)]
+                    hist.sum += total
+                    hist.count += count
+
+    def render_prometheus(self, prefix: str = "rag_") -> str:
+        """
+        Prometheus text exposition format(0.0.4)으로 출력합니다.
+        Returns:
+            str: 메트릭 텍스트
+        """
+
+        def fmt_labels(key: _LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            items = key + extra
+            if not items:
+                return ""
+            body = ",".join(
+                f'{k}="{v}"'.replace("\\", "\\\\").replace("\n", "\\n") for k, v in items
+            )
+            return "{" + body + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                metric = f"{prefix}{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in series.items():
+                    lines.append(f"{metric}{fmt_labels(key)} {value:g}")
+            for name, series in sorted(self.histograms.items()):
+                metric = f"{prefix}{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, hist in series.items():
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + (float("inf"),), hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(
+                            f"{metric}_bucket{fmt_labels(key, (('le', le),))} {cumulative}"
+                        )
+                    lines.append(f"{metric}_sum{fmt_labels(key)} {hist.sum:.6f}")
+                    lines.append(f"{metric}_count{fmt_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        현재 값을 JSON으로 보낼 수 있는 dict로 반환합니다.
+        """
+        with self._lock:
+            return {
+                "counters": {
+                    name: {",".join(f"{k}={v}" for k, v in key): value for key, value in s.items()}
+                    for name, s in self.counters.items()
+                },
+                "histograms": {
+                    name: {
+                        ",".join(f"{k}={v}" for k, v in key): {"count": h.count, "sum": h.sum}
+                        for key, h in s.items()
+                    }
+                    for name, s in self.histograms.items()
+                },
+            }
+
+
+class JsonlSpanExporter:
+    """
+    끝난 span을 JSONL 파일에 한 줄씩 기록합니다. (버퍼가 차거나 flush 시 기록)
+    """
+
+    def __init__(self, path: str | Path, buffer_size: int = 256):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.buffer_size = buffer_size
+        self._buf: list = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self._buf.append(span)
+            if len(self._buf) >= self.buffer_size:
+                self._write_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write_locked()
+
+    def _write_locked(self) -> None:
+        if not self._buf:
+            return
+        with self.path.open("a", encoding="utf-8") as f:
+            for span in self._buf:
+                f.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+        self._buf.clear()
+
+
+# ---------- 전역 상태 ----------
+
+_enabled = False
+_registry = MetricsRegistry()
+_exporter: Optional[JsonlSpanExporter] = None
+_prometheus_path: Optional[Path] = None
+# 현재 span (trace_id, span_id), 하위 span의 parent로 사용
+_current_span: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar(
+    "rag_current_span", default=None
+)
+
+
+def setup_metrics(worker: bool = False) -> None:
+    """
+    MetricsConfig에 따라 계측을 켜고 exporter를 준비합니다.
+    꺼져 있으면 모든 계측 함수는 bool 확인 한 번으로 바로 반환합니다.
+    Args:
+        worker: 프로세스 풀 워커면 True. 워커는 prometheus_path에 쓰지 않고,
+            값을 drain_worker_metrics()로 꺼내 부모 프로세스에 보냄 (merge_worker_metrics)
+    """
+    global _enabled, _exporter, _prometheus_path
+    m_cfg = get_app_config().metrics
+    _enabled = m_cfg.enabled
+    if not _enabled:
+        return
+    if m_cfg.spans_path:
+        # 프로세스별 파일로 나눠 여러 워커가 같은 파일에 쓰지 않도록 함
+        path = Path(m_cfg.spans_path.replace("{pid}", str(os.getpid())))
+        _exporter = JsonlSpanExporter(path)
+    _prometheus_path = Path(m_cfg.prometheus_path) if m_cfg.prometheus_path and not worker else None
+    atexit.register(flush)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def drain_worker_metrics() -> Optional[Dict[str, Any]]:
+    """
+    워커 프로세스에서 지금까지 기록한 값을 꺼냅니다. (계측이 꺼져 있으면 None)
+    """
+    return _registry.drain() if _enabled else None
+
+
+def merge_worker_metrics(state: Optional[Dict[str, Any]]) -> None:
+    """
+    워커 프로세스가 보낸 값을 이 프로세스의 registry에 더합니다.
+    """
+    if _enabled and state:
+        _registry.merge(state)
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    """
+    counter를 증가시킵니다.
+    """
+    if _enabled:
+        _registry.inc(name, value, labels)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """
+    histogram에 값을 기록합니다.
+    """
+    if _enabled:
+        _registry.observe(name, value, labels)
+
+
+class _NoopSpan:
+    """
+    계측이 꺼져 있을 때 쓰는 아무 일도 하지 않는 span입니다.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    """
+    블록의 소요 시간을 {name}_seconds 히스토그램에 기록하고, exporter가 있으면 span으로 내보냅니다.
+    """
+
+    __slots__ = ("name", "labels", "attrs", "start", "wall", "token", "ids", "export")
+
+    def __init__(self, name: str, labels: Dict[str, Any], export: bool):
+        self.name = name
+        self.labels = labels
+        self.attrs: Dict[str, Any] = {}
+        self.export = export and _exporter is not None
+
+    def set(self, **attrs) -> None:
+        """
+        span에 속성을 추가합니다. (예: 처리한 항목 수)
+        """
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        if self.export:
+            parent = _current_span.get()
+            trace_id = parent[0] if parent else uuid.uuid4().hex
+            self.ids = (trace_id, uuid.uuid4().hex[:16], parent[1] if parent else None)
+            self.wall = time.time()
+            self.token = _current_span.set((trace_id, self.ids[1]))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        labels = dict(self.labels)
+        if exc_type is not None:
+            labels["status"] = "error"
+        _registry.observe(f"{self.name}_seconds", elapsed, labels)
+        if self.export:
+            _current_span.reset(self.token)
+            trace_id, span_id, parent_id = self.ids
+            span = {
+                "name": self.name,
+                "trace_id": trace_id,
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "start": self.wall,
+                "duration_ms": round(elapsed * 1000, 3),
+                "labels": self.labels,
+                "attrs": self.attrs,
+                "pid": os.getpid(),
+            }
+            if exc_type is not None:
+                span["error"] = f"{exc_type.__name__}: {exc}"
+            _exporter.export(span)
+        return False
+
+
+def span(name: str, **labels):
+    """
+    블록을 span으로 계측합니다. 소요 시간은 {name}_seconds 히스토그램에 기록되고,
+    spans_path가 설정되어 있으면 부모/자식 관계와 함께 JSONL로 내보냅니다.
+    사용 예: with metrics.span("retrieval", backend="numpy") as s: ...; s.set(docs=len(docs))
+    """
+    if not _enabled:
+        return _NOOP
+    return _Span(name, labels, export=True)
+
+
+def timer(name: str, **labels):
+    """
+    span과 같지만 JSONL로 내보내지 않고 히스토그램에만 기록합니다. (페이지 단위 등 호출이 잦은 곳)
+    """
+    if not _enabled:
+        return _NOOP
+    return _Span(name, labels, export=False)
+
+
+def render_prometheus() -> str:
+    """
+    현재 메트릭을 Prometheus text format으로 반환합니다.
+    """
+    return _registry.render_prometheus()
+
+
+def flush() -> None:
+    """
+    버퍼에 남은 span을 기록하고, prometheus_path가 설정되어 있으면 메트릭 파일을 씁니다.
+    (node_exporter textfile collector 등에서 읽을 수 있도록 임시 파일에 쓴 뒤 교체)
+    """
+    if _exporter is not None:
+        _exporter.flush()
+    if _prometheus_path is not None:
+        _prometheus_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _prometheus_path.with_suffix(_prometheus_path.suffix + ".tmp")
+        tmp.write_text(render_prometheus(), encoding="utf-8")
+        tmp.replace(_prometheus_path)
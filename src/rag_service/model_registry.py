@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import gc
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import LocalInferenceConfig
+
+
+class ModelRegistry:
+    """
+    프로세스 전체에서 공유하는 모델 저장소입니다.
+    (종류, 설정 키)마다 모델을 한 번만 로드하고, 모든 체인/스레드가 같은 객체를 사용합니다.
+    같은 키를 동시에 요청하면 한 스레드만 로드하고 나머지는 기다렸다가 같은 객체를 받습니다.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str], Any] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, key: str, factory: Callable[[], Any]) -> Any:
+        """
+        등록된 모델을 반환하고, 없으면 factory로 로드해 등록합니다.
+        Args:
+            kind: 모델 종류 (예: "llm", "embeddings")
+            key: 모델을 구분하는 설정 키 (config_key()로 생성)
+            factory: 모델을 로드하는 함수
+        Returns:
+            공유 모델 객체
+        """
+        entry = (kind, key)
+        model = self._models.get(entry)
+        if model is not None:
+            return model
+        with self._lock:
+            load_lock = self._locks.setdefault(entry, threading.Lock())
+        with load_lock:
+            model = self._models.get(entry)
+            if model is None:
+                print(f"[MODELS] Loading {kind} ({key}) ...")
+                model = factory()
+                self._models[entry] = model
+        return model
+
+    def release(self, kind: Optional[str] = None) -> int:
+        """
+        등록된 모델을 해제합니다. (다른 곳에서 참조 중인 객체는 참조가 없어질 때 해제됨)
+        Args:
+            kind: 해제할 모델 종류 (None이면 전부)
+        Returns:
+            해제한 모델 수
+        """
+        with self._lock:
+            entries = [e for e in self._models if kind is None or e[0] == kind]
+            for e in entries:
+                del self._models[e]
+                self._locks.pop(e, None)
+        if entries:
+            gc.collect()
+            print(f"[MODELS] Released {len(entries)} model(s).")
+        return len(entries)
+
+    def loaded(self) -> List[Tuple[str, str]]:
+        """
+        현재 등록된 (종류, 설정 키) 목록을 반환합니다.
+        """
+        with self._lock:
+            return list(self._models)
+
+
+_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    return _registry
+
+
+def release_models(kind: Optional[str] = None) -> int:
+    """
+    공유 모델 저장소에서 모델을 해제합니다. (ModelRegistry.release 참고)
+    """
+    return _registry.release(kind)
+
+
+def config_key(**parts) -> str:
+    """
+    모델 로드에 영향을 주는 설정값으로 저장소 키를 만듭니다.
+    Args:
+        parts: 모델 이름, device, dtype 등 설정값
+    Returns:
+        str: 정렬된 JSON 문자열
+    """
+    return json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+
+
+# ---------- CPU 추론 옵션 (torch는 로컬 모델을 로드할 때만 import) ----------
+
+
+def _is_cpu(device: Optional[str]) -> bool:
+    return device in (None, "cpu")
+
+
+def _cpu_supports_bf16(torch) -> bool:
+    """
+    CPU가 bfloat16 연산을 지원하는지 확인합니다. (AVX512-BF16/AMX 등, 판단할 수 없으면 False)
+    """
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        return False
+
+
+def configure_torch_threads(local_cfg: LocalInferenceConfig) -> None:
+    """
+    torch의 intra-op 스레드 수를 설정합니다. (프로세스 전체에 적용)
+    Args:
+        local_cfg: 로컬 추론 설정
+    """
+    if not local_cfg.num_threads:
+        return
+    import torch
+
+    torch.set_num_threads(local_cfg.num_threads)
+
+
+def resolve_torch_dtype(local_cfg: LocalInferenceConfig, device: Optional[str]):
+    """
+    설정과 장치에 맞는 가중치 dtype을 정합니다.
+    - auto: 체크포인트의 dtype을 그대로 사용 ("auto" 반환)
+    - bfloat16: GPU이거나 CPU가 bf16을 지원할 때만, 아니면 float32
+    - int8 동적 양자화를 쓰면 float32 (quantize_dynamic은 float32 가중치에 적용)
+    Args:
+        local_cfg: 로컬 추론 설정
+        device: 모델을 올릴 장치
+    Returns:
+        torch.dtype 또는 "auto"
+    """
+    import torch
+
+    quantize = local_cfg.quantize_int8 and _is_cpu(device)
+    if quantize:
+        if local_cfg.dtype not in ("auto", "float32"):
+            print(f"[MODELS] int8 quantization uses float32 weights ({local_cfg.dtype} ignored).")
+        return torch.float32
+    if local_cfg.dtype == "auto":
+        return "auto"
+    if local_cfg.dtype == "float32":
+        return torch.float32
+    if local_cfg.dtype == "bfloat16":
+        if not _is_cpu(device) or _cpu_supports_bf16(torch):
+            return torch.bfloat16
+        print("[MODELS] CPU does not support bfloat16, falling back to float32.")
+        return torch.float32
+    raise ValueError(f"지원하지 않는 local_inference.dtype: {local_cfg.dtype}")
+
+
+def maybe_quantize_int8(model, local_cfg: LocalInferenceConfig, device: Optional[str]):
+    """
+    설정이 켜져 있고 CPU에서 실행하면 Linear 층을 int8로 동적 양자화합니다. (제자리 변환)
+    Args:
+        model: torch.nn.Module
+        local_cfg: 로컬 추론 설정
+        device: 모델이 올라간 장치
+    Returns:
+        양자화된(또는 그대로인) 모델
+    """
+    if not local_cfg.quantize_int8:
+        return model
+    if not _is_cpu(device):
+        print(f"[MODELS] int8 dynamic quantization is CPU-only, skipped on {device}.")
+        return model
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
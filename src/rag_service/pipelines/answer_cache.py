@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_question(question: str) -> str:
+    """
+    정확 일치 비교를 위해 질문을 정규화합니다. (유니코드 정규화, 소문자, 공백/문장부호 정리)
+    Args:
+        question: 질문
+    Returns:
+        str: 정규화된 질문
+    """
+    q = unicodedata.normalize("NFKC", question).lower()
+    q = re.sub(r"[\s]+", " ", q)
+    q = re.sub(r"[?？!.。,]+$", "", q.strip())
+    return q.strip()
+
+
+class AnswerCache:
+    """
+    RAG 체인 앞에 두는 2단계 답변 캐시입니다.
+    1) 정규화된 질문이 정확히 같으면 바로 반환
+    2) 질문 임베딩의 코사인 유사도가 similarity_threshold 이상인 질문이 있으면 반환
+    답변과 함께 그 답변을 만들 때의 출처(sources)와 참조 문서 통계(context)를 저장하므로,
+    의미 유사도로 다른 질문의 답변이 반환되어도 근거와 원래 질문을 확인할 수 있습니다.
+    LRU/TTL로 항목을 제거하고 SQLite에 영구 저장합니다.
+    항목은 fingerprint_fn이 반환하는 값(벡터스토어 상태, 검색 설정, 임베딩 모델)별로 저장하고
+    현재 fingerprint의 항목만 조회하므로, 설정이 다른 체인이 같은 파일을 함께 써도 됩니다.
+    (영구 저장소의 항목 수는 fingerprint와 관계없이 max_entries개로 제한)
+    """
+
+    # 저장 형식 버전 (다르면 기존 테이블을 지우고 다시 만듦)
+    SCHEMA_VERSION = 3
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        path: Optional[str | Path] = None,
+        max_entries: int = 1000,
+        ttl_seconds: Optional[float] = None,
+        similarity_threshold: float = 0.95,
+        fingerprint_fn: Optional[Callable[[], str]] = None,
+    ):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.fingerprint_fn = fingerprint_fn or (lambda: "")
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 정규화된 질문 → {"answer", "sources", "context", "vector", "created_at"} (LRU 순서)
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._fingerprint = self.fingerprint_fn()
+
+        self._conn = None
+        if path is not None:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != self.SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS answers")
+                self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS answers (
+                    fingerprint TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    sources TEXT NOT NULL,
+                    context TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (fingerprint, question)
+                )
+                """
+            )
+            self._conn.commit()
+            self._load()
+
+    # ---------- 조회/저장 ----------
+
+    def lookup(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        캐시에서 답변을 찾습니다.
+        Args:
+            question: 질문
+        Returns:
+            answer, sources, context, question(캐시에 저장된 원래 질문, 정규화됨)을 담은 dict,
+            없으면 None
+        """
+        self._check_fingerprint()
+        key = normalize_question(question)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits["exact"] += 1
+                return self._hit(key)
+            if not self._entries or self.similarity_threshold > 1.0:
+                self.misses += 1
+                return None
+
+        vec = self._embed(question)
+        with self._lock:
+            # 임베딩 차원이 다른 항목은 비교하지 않음
+            keys = [k for k, e in self._entries.items() if e["vector"].shape == vec.shape]
+            if not keys:
+                self.misses += 1
+                return None
+            matrix = np.stack([self._entries[k]["vector"] for k in keys])
+            scores = matrix @ vec
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold:
+                self._entries.move_to_end(keys[best])
+                self.hits["semantic"] += 1
+                return self._hit(keys[best])
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        question: str,
+        answer: str,
+        sources: Optional[List[Dict[str, Any]]] = None,
+        context: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        질문과 답변을 캐시에 저장합니다.
+        Args:
+            question: 질문
+            answer: 답변
+            sources: 답변을 만들 때 참조한 출처 목록 (format_sources의 결과)
+            context: 참조 문서 통계 (context_tokens 등)
+        """
+        key = normalize_question(question)
+        vec = self._embed(question)
+        now = time.time()
+        sources, context = sources or [], context or {}
+        with self._lock:
+            self._entries[key] = {
+                "answer": answer,
+                "sources": sources,
+                "context": context,
+                "vector": vec,
+                "created_at": now,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._db_delete(old_key)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answers "
+                    "(fingerprint, question, answer, sources, context, vector, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        self._fingerprint,
+                        key,
+                        answer,
+                        json.dumps(sources, ensure_ascii=False),
+                        json.dumps(context),
+                        vec.astype(np.float32).tobytes(),
+                        now,
+                    ),
+                )
+                self._conn.commit()
+
+    def clear(self) -> None:
+        """
+        캐시를 모두 비웁니다.
+        """
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM answers")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        캐시 적중/실패 통계를 반환합니다.
+        Returns:
+            exact_hits, semantic_hits, misses, entries를 담은 dict
+        """
+        with self._lock:
+            return {
+                "exact_hits": self.hits["exact"],
+                "semantic_hits": self.hits["semantic"],
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    # ---------- 내부 함수 ----------
+
+    def _hit(self, key: str) -> Dict[str, Any]:
+        """
+        캐시 적중 결과를 만듭니다. (lock을 잡은 상태에서 호출)
+        """
+        entry = self._entries[key]
+        return {
+            "answer": entry["answer"],
+            "sources": entry["sources"],
+            "context": entry["context"],
+            "question": key,
+        }
+
+    def _embed(self, question: str) -> np.ndarray:
+        """
+        질문을 정규화된(단위 길이) 벡터로 임베딩합니다.
+        """
+        vec = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def _check_fingerprint(self) -> None:
+        """
+        벡터스토어 상태가 바뀌었으면 메모리의 항목을 버리고 새 fingerprint의 항목을 불러옵니다.
+        (다른 fingerprint의 항목은 영구 저장소에 남겨 둠)
+        """
+        fp = self.fingerprint_fn()
+        if fp == self._fingerprint:
+            return
+        with self._lock:
+            if fp == self._fingerprint:
+                return
+            self._entries.clear()
+            self._fingerprint = fp
+            if self._conn is not None:
+                self._load()
+
+    def _expire(self) -> None:
+        """
+        TTL이 지난 항목을 제거합니다. (lock을 잡은 상태에서 호출)
+        """
+        if not self.ttl_seconds:
+            return
+        deadline = time.time() - self.ttl_seconds
+        expired = [k for k, e in self._entries.items() if e["created_at"] < deadline]
+        for k in expired:
+            del self._entries[k]
+            self._db_delete(k)
+
+    def _db_delete(self, key: str) -> None:
+        """
+        영구 저장소에서 항목을 지웁니다. (lock을 잡은 상태에서 호출)
+        """
+        if self._conn is not None:
+            self._conn.execute(
+                "DELETE FROM answers WHERE fingerprint = ? AND question = ?",
+                (self._fingerprint, key),
+            )
+            self._conn.commit()
+
+    def _load(self) -> None:
+        """
+        영구 저장소에서 현재 fingerprint에 해당하는 항목을 불러옵니다.
+        TTL이 지난 항목과 최근 max_entries개를 넘는 오래된 항목은 fingerprint와 관계없이 지웁니다.
+        """
+        if self.ttl_seconds:
+            self._conn.execute(
+                "DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+        self._conn.execute(
+            "DELETE FROM answers WHERE rowid NOT IN "
+            "(SELECT rowid FROM answers ORDER BY created_at DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self._conn.commit()
+        rows = self._conn.execute(
+            "SELECT question, answer, sources, context, vector, created_at FROM answers "
+            "WHERE fingerprint = ? "
+            "ORDER BY created_at DESC LIMIT ?",
+            (self._fingerprint, self.max_entries),
+        ).fetchall()
+        for question, answer, sources, context, blob, created_at in reversed(rows):
+            self._entries[question] = {
+                "answer": answer,
+                "sources": json.loads(sources),
+                "context": json.loads(context),
+                "vector": np.frombuffer(blob, dtype=np.float32),
+                "created_at": created_at,
+            }
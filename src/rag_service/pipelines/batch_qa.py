@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Set
+
+from langchain_core.runnables import RunnableLambda
+
+from .qa_chain import RagChain
+
+
+def load_questions(path: str | Path) -> List[Dict[str, str]]:
+    """
+    질문 파일을 읽습니다.
+    - .jsonl: 한 줄에 {"question": ..., "id": ...(선택)}
+    - 그 외: 한 줄에 질문 하나 (빈 줄, #으로 시작하는 줄은 무시)
+    id가 없으면 질문 내용의 해시를 id로 사용합니다.
+    Args:
+        path: 질문 파일 경로
+    Returns:
+        {"id", "question"} dict의 목록
+    """
+    path = Path(path)
+    questions = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or (path.suffix != ".jsonl" and line.startswith("#")):
+            continue
+        if path.suffix == ".jsonl":
+            rec = json.loads(line)
+            question = rec["question"]
+            qid = rec.get("id")
+        else:
+            question, qid = line, None
+        if qid is None:
+            qid = hashlib.sha1(question.encode("utf-8")).hexdigest()[:12]
+        questions.append({"id": str(qid), "question": question})
+    return questions
+
+
+def completed_ids(output_path: str | Path) -> Set[str]:
+    """
+    결과 파일에서 이미 답변이 끝난 질문 id를 읽습니다. (실패한 질문은 다시 실행)
+    Args:
+        output_path: 결과 JSONL 경로
+    Returns:
+        완료된 질문 id 집합
+    """
+    done: Set[str] = set()
+    path = Path(output_path)
+    if not path.exists():
+        return done
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                # 중단 시 마지막 줄이 쓰다 만 상태일 수 있음
+                continue
+            if "error" not in rec:
+                done.add(rec["id"])
+    return done
+
+
+def _drop_partial_line(path: Path) -> None:
+    """
+    중단으로 파일 끝에 남은 쓰다 만 줄을 잘라냅니다. (이어서 추가할 줄과 섞이지 않도록)
+    """
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    with path.open("r+b") as f:
+        f.seek(-1, 2)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        data = f.read()
+        f.truncate(data.rfind(b"\n") + 1)
+
+
+async def run_batch_qa(
+    chain: RagChain,
+    questions: List[Dict[str, str]],
+    output_path: str | Path,
+    max_concurrency: int = 4,
+) -> Dict[str, int]:
+    """
+    질문 목록을 체인의 abatch_as_completed로 동시에 실행하고, 끝나는 대로 JSONL에 추가합니다.
+    결과 파일에 이미 있는 질문은 건너뛰므로, 중단 후 다시 실행하면 남은 질문만 처리합니다.
+    각 줄: id, question, answer, sources, retrieval_ms, generation_ms, cached (실패 시 error)
+    (캐시 적중 시 답변의 원래 질문 cached_question 포함)
+    Args:
+        chain: build_rag_chain()이 반환한 RagChain
+        questions: load_questions()가 반환한 질문 목록
+        output_path: 결과 JSONL 경로
+        max_concurrency: 동시에 처리할 질문 수
+    Returns:
+        total, skipped, ok, failed 개수를 담은 dict
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    _drop_partial_line(output_path)
+    done = completed_ids(output_path)
+    pending = [q for q in questions if q["id"] not in done]
+    print(
+        f"[BATCH] {len(questions)} questions: {len(questions) - len(pending)} already done, "
+        f"{len(pending)} to run (max_concurrency={max_concurrency})."
+    )
+
+    runner = RunnableLambda(chain.invoke_with_details, afunc=chain.ainvoke_with_details)
+    ok = failed = 0
+    start = time.perf_counter()
+    with output_path.open("a", encoding="utf-8") as out:
+        async for i, result in runner.abatch_as_completed(
+            [q["question"] for q in pending],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        ):
+            rec = dict(pending[i])
+            if isinstance(result, Exception):
+                rec["error"] = repr(result)
+                failed += 1
+            else:
+                rec.update(result)
+                ok += 1
+            # 한 질문이 끝날 때마다 기록하여, 중단되어도 완료된 질문은 다시 실행하지 않음
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            out.flush()
+            if (ok + failed) % 10 == 0 or ok + failed == len(pending):
+                print(f"[BATCH] {ok + failed}/{len(pending)} done ({failed} failed).")
+
+    elapsed = time.perf_counter() - start
+    print(f"[BATCH] Finished in {elapsed:.1f}s. Results: {output_path}")
+    return {
+        "total": len(questions),
+        "skipped": len(questions) - len(pending),
+        "ok": ok,
+        "failed": failed,
+    }
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from .. import metrics
+from ..chunking.sentence_splitter import split_sentences
+from ..config import ContextConfig, get_app_config
+from ..embeddings.batching import approx_token_count
+from ..vectorstores.lexical_index import tokenize
+
+_SEPARATOR = "\n\n"
+_MAX_HEADER_REFS = 3
+
+
+def doc_header(d: Document) -> str:
+    """
+    참조 문서 앞에 붙이는 출처 헤더를 만듭니다.
+    Args:
+        d: Document
+    Returns:
+        헤더 문자열
+    """
+    m = d.metadata or {}
+    header = f"파일 출처: {m.get('source')} | 페이지: {m.get('page')} | 데이터 타입: {m.get('type')}"
+    refs = m.get("duplicate_refs") or []
+    # 인덱싱 때 합쳐진 다른 출처: 본문이 같으면 "동일 내용", 표현만 조금 다르면 "유사 내용"
+    for label, group in (
+        ("동일 내용", [r for r in refs if r.get("exact")]),
+        ("유사 내용", [r for r in refs if not r.get("exact")]),
+    ):
+        if group:
+            # 많으면 앞쪽 일부만
+            shown = ", ".join(f"{r['source']} p.{r['page']}" for r in group[:_MAX_HEADER_REFS])
+            extra = len(group) - _MAX_HEADER_REFS
+            more = f" 외 {extra}건" if extra > 0 else ""
+            header += f" | {label}: {shown}{more}"
+    return header
+
+
+def make_token_counter(llm=None) -> Callable[[str], int]:
+    """
+    사용 중인 LLM의 토크나이저로 토큰 수를 세는 함수를 만듭니다.
+    - 로컬 HuggingFacePipeline: 파이프라인의 토크나이저
+    - 그 외(OpenAI): tiktoken (모델을 모르면 o200k_base)
+    토크나이저를 쓸 수 없으면 대략적인 추정치를 사용합니다.
+    Args:
+        llm: 사용할 LLM (ConcurrencyLimitedLLM 같은 래퍼는 .llm을 따라감)
+    Returns:
+        텍스트 → 토큰 수 함수
+    """
+    while llm is not None and hasattr(llm, "llm") and not hasattr(llm, "pipeline"):
+        llm = llm.llm
+    tokenizer = getattr(getattr(llm, "pipeline", None), "tokenizer", None)
+    if tokenizer is not None:
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+    model_name = getattr(llm, "model_name", None) or get_app_config().llm.model_name or ""
+    try:
+        import tiktoken
+
+        try:
+            enc = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            enc = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(enc.encode(text, disallowed_special=()))
+    except Exception as e:
+        # tiktoken 미설치, 인코딩 파일 다운로드 실패(오프라인) 등
+        print(f"[CONTEXT] Tokenizer unavailable ({type(e).__name__}), using approximate counts.")
+        return approx_token_count
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+class ContextPacker:
+    """
+    검색된 문서를 토큰 예산 안에 들어가도록 골라 LLM 참조 문서(context) 문자열을 만듭니다.
+    1) 문서 임베딩 코사인 유사도가 dedup_threshold 이상인 뒤쪽 문서는 제외
+    2) max_tokens_per_doc를 넘는 문서는 질문과 BM25 점수가 높은 문장(표는 행)만 남김
+    3) 검색 순서대로 max_tokens까지 채우고, 넘치는 문서는 남은 예산만큼 잘라 넣거나 제외
+    문서 벡터는 vector_lookup(검색 엔진의 stored_vectors)으로 벡터저장소에서 가져오므로
+    질문마다 임베딩 모델을 호출하지 않습니다. (저장된 벡터가 없는 문서가 있을 때만 임베딩)
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        token_counter: Callable[[str], int],
+        max_tokens: int,
+        max_tokens_per_doc: int = 600,
+        dedup_threshold: float = 0.95,
+        min_fill_tokens: int = 64,
+        count_cache_size: int = 50_000,
+        vector_lookup: Optional[Callable[[List[str]], Dict[str, np.ndarray]]] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.embeddings = embeddings
+        self.vector_lookup = vector_lookup
+        self.k1 = k1
+        self.b = b
+        self.max_tokens = max_tokens
+        self.max_tokens_per_doc = max_tokens_per_doc
+        self.dedup_threshold = dedup_threshold
+        self.min_fill_tokens = min_fill_tokens
+        # 같은 청크/문장은 질문마다 반복해서 나오므로 토큰 수를 캐시
+        self.count = lru_cache(maxsize=count_cache_size)(token_counter)
+        self._sep_tokens = self.count(_SEPARATOR)
+
+    @classmethod
+    def from_config(
+        cls,
+        cfg: ContextConfig,
+        embeddings: Embeddings,
+        llm=None,
+        vector_lookup: Optional[Callable[[List[str]], Dict[str, np.ndarray]]] = None,
+    ) -> "ContextPacker":
+        """
+        ContextConfig로 packer를 만듭니다.
+        Args:
+            cfg: context 설정 (max_tokens가 있어야 함)
+            embeddings: 저장된 벡터가 없을 때 문서 임베딩에 쓸 모델 (검색 엔진과 같은 모델)
+            llm: 토큰 수를 셀 때 토크나이저를 가져올 LLM
+            vector_lookup: 청크 ID 목록 → 저장된 벡터 dict (RetrievalEngine.stored_vectors)
+        Returns:
+            ContextPacker
+        """
+        return cls(
+            embeddings,
+            make_token_counter(llm),
+            max_tokens=cfg.max_tokens,
+            max_tokens_per_doc=cfg.max_tokens_per_doc,
+            dedup_threshold=cfg.dedup_threshold,
+            min_fill_tokens=cfg.min_fill_tokens,
+            vector_lookup=vector_lookup,
+        )
+
+    def pack(self, question: str, docs: List[Document]) -> Tuple[str, Dict[str, int]]:
+        """
+        문서들을 예산 안에서 포맷팅합니다.
+        Args:
+            question: 질문
+            docs: 검색된 Document 목록 (앞쪽일수록 우선)
+        Returns:
+            (context 문자열, 통계 dict: context_tokens, context_tokens_saved,
+             duplicates_dropped, docs_trimmed, docs_dropped)
+        """
+        stats = {
+            "context_tokens": 0,
+            "context_tokens_saved": 0,
+            "duplicates_dropped": 0,
+            "docs_trimmed": 0,
+            "docs_dropped": 0,
+        }
+        if not docs:
+            return "", stats
+
+        headers = [doc_header(d) for d in docs]
+        contents = [d.page_content or "" for d in docs]
+        block_tokens = [self.count(h) + 1 + self.count(c) for h, c in zip(headers, contents)]
+        original = sum(block_tokens) + self._sep_tokens * (len(docs) - 1)
+
+        doc_vecs = self._doc_vectors(docs, contents)
+        q_terms = set(tokenize(question))
+
+        # 1) 거의 같은 문서 제외 (먼저 나온 문서를 남김)
+        keep: List[int] = []
+        for i in range(len(docs)):
+            if keep and float(np.max(doc_vecs[keep] @ doc_vecs[i])) >= self.dedup_threshold:
+                stats["duplicates_dropped"] += 1
+                continue
+            keep.append(i)
+
+        # 2), 3) 문서별 상한과 전체 예산 적용
+        blocks: List[str] = []
+        remaining = self.max_tokens
+        for i in keep:
+            sep = self._sep_tokens if blocks else 0
+            head_cost = self.count(headers[i]) + 1 + sep
+            content, cost = contents[i], block_tokens[i] + sep
+            oversized = self.count(content) > self.max_tokens_per_doc
+            if oversized or cost > remaining:
+                limit = min(self.max_tokens_per_doc, remaining - head_cost)
+                if limit < self.min_fill_tokens:
+                    stats["docs_dropped"] += 1
+                    continue
+                content = self._select_units(docs[i], content, q_terms, limit)
+                if not content:
+                    stats["docs_dropped"] += 1
+                    continue
+                cost = head_cost + self.count(content)
+                stats["docs_trimmed"] += 1
+            blocks.append(headers[i] + "\n" + content)
+            remaining -= cost
+
+        packed = self.max_tokens - remaining
+        stats["context_tokens"] = packed
+        stats["context_tokens_saved"] = max(0, original - packed)
+        metrics.inc("context_tokens", packed)
+        metrics.inc("context_tokens_saved", stats["context_tokens_saved"])
+        return _SEPARATOR.join(blocks), stats
+
+    def _doc_vectors(self, docs: List[Document], contents: List[str]) -> np.ndarray:
+        """
+        중복 판정에 쓸 정규화된 문서 벡터를 구합니다.
+        모든 문서의 벡터를 벡터저장소에서 찾으면 그대로 쓰고, 하나라도 없으면
+        (서로 다른 공간의 벡터를 비교하지 않도록) 모두 임베딩합니다.
+        """
+        if self.vector_lookup is not None and all(d.id for d in docs):
+            stored = self.vector_lookup([d.id for d in docs])
+            if all(d.id in stored for d in docs):
+                return _normalize(np.stack([stored[d.id] for d in docs]).astype(np.float32))
+        metrics.inc("context_doc_embeddings", len(docs))
+        return _normalize(np.asarray(self.embeddings.embed_documents(contents), dtype=np.float32))
+
+    def _unit_scores(self, q_terms: Set[str], units: List[str]) -> List[float]:
+        """
+        문서 안의 단위들을 각각 하나의 문서로 보고 질문과의 BM25 점수를 계산합니다.
+        """
+        tfs = []
+        lengths = []
+        for u in units:
+            tokens = tokenize(u)
+            lengths.append(len(tokens))
+            tfs.append(Counter(t for t in tokens if t in q_terms))
+        n = len(units)
+        avgdl = sum(lengths) / n or 1.0
+        df = Counter(t for tf in tfs for t in tf)
+        idf = {t: math.log(1 + (n - c + 0.5) / (c + 0.5)) for t, c in df.items()}
+        k1, b = self.k1, self.b
+        return [
+            sum(
+                idf[t] * c * (k1 + 1) / (c + k1 * (1 - b + b * length / avgdl))
+                for t, c in tf.items()
+            )
+            for tf, length in zip(tfs, lengths)
+        ]
+
+    def _select_units(self, doc: Document, content: str, q_terms: Set[str], limit: int) -> str:
+        """
+        긴 문서에서 질문과 관련 높은 단위(문장, 표는 행)만 골라 limit 토큰 안에 맞춥니다.
+        점수가 같으면 앞쪽 단위를 먼저 고르고, 선택한 단위는 원래 순서대로 이어 붙입니다.
+        Args:
+            doc: 원본 Document (type 확인용)
+            content: 문서 내용
+            q_terms: 질문의 BM25 토큰 집합
+            limit: 허용 토큰 수
+        Returns:
+            줄인 내용 (한 단위도 넣을 수 없으면 빈 문자열)
+        """
+        is_table = (doc.metadata or {}).get("type") == "table"
+        joiner = "\n" if is_table else " "
+        fixed: List[str] = []
+        if is_table:
+            lines = [ln for ln in content.splitlines() if ln.strip()]
+            # 마크다운 표 머리글(제목 행 + 구분 행)은 항상 유지
+            n_head = 2 if len(lines) > 1 and set(lines[1].strip()) <= set("|-: ") else 1
+            fixed, units = lines[:n_head], lines[n_head:]
+        else:
+            units = split_sentences(content)
+
+        budget = limit - sum(self.count(u) + 1 for u in fixed)
+        if not units or budget <= 0:
+            return ""
+
+        scores = self._unit_scores(q_terms, units)
+        chosen = []
+        for j in sorted(range(len(units)), key=lambda j: -scores[j]):
+            cost = self.count(units[j]) + 1
+            if cost <= budget:
+                chosen.append(j)
+                budget -= cost
+        if not chosen:
+            return ""
+        return joiner.join(fixed + [units[j] for j in sorted(chosen)])
@@ -1,29 +1,343 @@
+from __future__ import annotations
+
+import queue
+import threading
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, List
+
+from .. import metrics
+from ..config import get_app_config
 from ..loaders.multimodal_loader import MultiModalLoader
+from ..chunking.near_dedup import (
+    NearDuplicateIndex,
+    get_near_dup_index_path,
+    reset_near_dup_index,
+)
 from ..chunking.splitter import split_documents
-from ..embeddings import get_embeddings
-from ..vectorstores.chroma_store import create_chroma_from_documents
+from ..embeddings import get_embeddings, get_embedding_throughput
+from ..vectorstores import (
+    get_vectorstore,
+    upsert_embeddings,
+    delete_ids,
+    flush_vectorstore,
+    reset_vectorstore,
+)
+from ..vectorstores.lexical_index import (
+    LexicalIndex,
+    get_lexical_index_path,
+    reset_lexical_index,
+)
+from .manifest import IngestManifest, file_sha256, get_manifest_path, make_chunk_id
+from .retrieval import reset_retrieval_engine
+
+
+# 단계 종료 표시
+_END = object()
+
+
+@dataclass
+class _FileDone:
+    """
+    한 파일의 청크가 모두 파이프라인에 들어갔음을 알리는 표시입니다.
+    저장 단계가 이 표시를 받으면 그 파일의 청크는 모두 저장된 상태입니다.
+    """
+
+    path: Path
+    file_hash: str
+    ids: List[str]
+    n_docs: int
+    n_collapsed: int = 0
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """
+    큐가 가득 차 있으면 기다렸다가 넣되, 다른 단계가 실패하면 포기합니다.
+    Args:
+        q: 대상 큐
+        item: 넣을 항목
+        stop: 파이프라인 중단 이벤트
+    Returns:
+        넣었으면 True, 중단되어 포기했으면 False
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _force_put(q: queue.Queue, item) -> None:
+    """
+    기다리지 않고 항목을 넣습니다. 큐가 가득 차 있으면 남은 항목을 버려 자리를 만듭니다.
+    (중단 시 소비자가 멈춰 있어도 종료 표시가 반드시 전달되도록 사용)
+    Args:
+        q: 대상 큐
+        item: 넣을 항목
+    """
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def _start_stage(
+    target: Callable[[], None], out_q: queue.Queue, stop: threading.Event, errors: list
+) -> threading.Thread:
+    """
+    파이프라인 단계를 스레드로 실행합니다. 끝나면(실패 포함) 다음 단계에 종료 표시를 보냅니다.
+    정상 종료 시에는 다음 단계가 남은 항목을 모두 처리하도록 기다렸다가 넣고, 파이프라인이
+    중단된 경우에는 기다리지 않고 남은 항목을 버린 뒤 넣습니다.
+    Args:
+        target: 단계 함수
+        out_q: 다음 단계로 가는 큐
+        stop: 파이프라인 중단 이벤트
+        errors: 발생한 예외를 모을 리스트
+    Returns:
+        시작된 스레드
+    """
+
+    def _run():
+        try:
+            target()
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            if not _put(out_q, _END, stop):
+                _force_put(out_q, _END)
+
+    t = threading.Thread(target=_run, daemon=True)
+    t.start()
+    return t
 
 
-def ingest_documents(source_dir: str | Path):
+def ingest_documents(source_dir: str | Path, full_rebuild: bool = False):
     """
-    주어진 디렉토리에서 문서를 로드하고, 청크로 분할한 후 Chroma 벡터스토어에 저장합니다.
+    주어진 디렉토리에서 문서를 로드하고, 청크로 분할한 후 벡터스토어에 저장합니다.
+    매니페스트(파일 해시 → 청크 ID)를 비교하여 새로 추가/변경된 파일만 다시 파싱해 upsert하고,
+    삭제된 파일의 벡터는 제거합니다.
+    ingest.near_dedup이 켜져 있으면 거의 같은 청크는 임베딩/저장하지 않고 대표 청크의
+    참조 목록(source/page)에만 추가합니다.
+    로드 → 분할 → 배치 임베딩 → 배치 저장 단계는 크기가 제한된 큐로 연결되어 동시에 진행되므로,
+    코퍼스 크기와 관계없이 메모리 사용량이 일정합니다.
     Args:
         source_dir: 문서가 저장된 디렉토리 경로
+        full_rebuild: True면 컬렉션을 비우고 모든 파일을 다시 인덱싱
+            (매니페스트가 없거나 다른 컬렉션의 것이어도 같음)
     Returns:
-        vectordb: 생성된 Chroma 벡터스토어 객체
+        vectordb: 벡터스토어 객체
     """
+    cfg = get_app_config()
+    collection_name = cfg.vectorstore.collection_name
+    persist_dir = Path(cfg.vectorstore.persist_dir)
+    persist_dir.mkdir(parents=True, exist_ok=True)
+    batch_size = max(1, cfg.ingest.embed_batch_size)
+
+    manifest = IngestManifest(get_manifest_path(), collection_name)
+    # BM25 색인도 Chroma와 같은 청크 ID로 함께 갱신 (매니페스트가 없으면 새로 만듦)
+    lexical_path = get_lexical_index_path()
+    lexical = LexicalIndex.load(lexical_path) if manifest.files else None
+    if manifest.files and not full_rebuild and lexical is None:
+        # 색인 파일이 없거나 이전 형식이면 변경되지 않은 파일이 빠지므로 전부 다시 인덱싱
+        print("[INGEST] Lexical index is missing or outdated, re-indexing all files.")
+        full_rebuild = True
+    if lexical is None:
+        lexical = LexicalIndex()
+    near_cfg = cfg.ingest.near_dedup
+    near_path = get_near_dup_index_path()
+    near_index = NearDuplicateIndex.load(near_path) if manifest.files else None
+    stored = near_index.params if near_index is not None else None
+    wanted = NearDuplicateIndex.from_config(near_cfg).params if near_cfg.enabled else None
+    if manifest.files and not full_rebuild and stored != wanted:
+        # 저장된 청크가 다른 기준으로 합쳐져(또는 합쳐지지 않아) 있으므로 전부 다시 인덱싱
+        print("[INGEST] Near-duplicate settings changed, re-indexing all files.")
+        full_rebuild = True
+    if full_rebuild:
+        near_index = None
+    if near_cfg.enabled and near_index is None:
+        near_index = NearDuplicateIndex.from_config(near_cfg)
+    embeddings = get_embeddings()
+    vectordb = get_vectorstore(embeddings)
+    if full_rebuild or not manifest.files:
+        # 매니페스트로 추적하지 않는 벡터(예: 이전 버전이 Chroma.from_documents로 넣은 무작위 ID)가
+        # 남아 중복되지 않도록 컬렉션과 BM25 색인을 비우고 처음부터 다시 씀
+        print("[INGEST] Full rebuild: clearing the collection and lexical index.")
+        reset_vectorstore(vectordb)
+        lexical = LexicalIndex()
+        manifest.clear()
+        full_rebuild = True
+
     loader = MultiModalLoader()
-    print(f"[INGEST] Loading documents from {source_dir} ...")
-    docs = loader.load_directory(source_dir)
+    print(f"[INGEST] Scanning documents in {source_dir} ...")
+    files = loader.list_pdf_files(source_dir)
+    current = {str(fp): file_sha256(fp) for fp in files}
 
-    print(f"[INGEST] Loaded {len(docs)} documents. Splitting...")
-    chunks = split_documents(docs)
-    print(f"[INGEST] Created {len(chunks)} chunks.")
+    # 변경 사항 계산
+    deleted = [src for src in manifest.files if src not in current]
+    changed = [
+        fp
+        for fp in files
+        if full_rebuild or manifest.get_hash(str(fp)) != current[str(fp)]
+    ]
+    print(
+        f"[INGEST] {len(files)} files: {len(changed)} new/changed, "
+        f"{len(files) - len(changed)} unchanged, {len(deleted)} deleted."
+    )
 
-    embeddings = get_embeddings()
-    print("[INGEST] Creating Chroma vectorstore...")
-    vectordb = create_chroma_from_documents(chunks, embeddings)
+    # 삭제/변경된 파일의 대표 청크에 참조로만 들어 있던 다른 파일도 다시 인덱싱
+    if near_index is not None and not full_rebuild:
+        reprocess = {str(fp) for fp in changed}
+        pending = list(reprocess) + deleted
+        while pending:
+            for dep in near_index.remove_source(pending.pop()):
+                if dep in current and dep not in reprocess:
+                    reprocess.add(dep)
+                    pending.append(dep)
+        if len(reprocess) > len(changed):
+            print(
+                f"[INGEST] {len(reprocess) - len(changed)} unchanged files share removed "
+                "near-duplicate chunks, re-indexing them too."
+            )
+            changed = [fp for fp in files if str(fp) in reprocess]
+
+    # 삭제된 파일의 벡터 제거
+    for src in deleted:
+        delete_ids(vectordb, manifest.get_chunk_ids(src))
+        lexical.remove(manifest.get_chunk_ids(src))
+        manifest.remove(src)
+    if deleted:
+        manifest.save()
+
+    # ---------- 스트리밍 파이프라인 ----------
+    chunk_q: queue.Queue = queue.Queue(maxsize=cfg.ingest.queue_size * batch_size)
+    write_q: queue.Queue = queue.Queue(maxsize=cfg.ingest.queue_size)
+    stop = threading.Event()
+    errors: list = []
+
+    def load_and_split():
+        # 1) 로드 + 2) 분할: 파일 단위로 청크를 만들어 흘려보냄
+        for fp, docs in loader.iter_files(changed):
+            if stop.is_set():
+                return
+            chunks = split_documents(docs)
+            ids = [make_chunk_id(c, i) for i, c in enumerate(chunks)]
+            n_split = len(ids)
+            if near_index is not None:
+                with metrics.span("near_dedup") as span:
+                    ids, chunks = near_index.collapse(str(fp), ids, chunks)
+                    span.set(chunks=n_split, collapsed=n_split - len(ids))
+                metrics.inc("near_duplicate_chunks", n_split - len(ids))
+            for cid, chunk in zip(ids, chunks):
+                _put(chunk_q, (cid, chunk), stop)
+            done = _FileDone(fp, current[str(fp)], ids, len(docs), n_split - len(ids))
+            _put(chunk_q, done, stop)
+
+    def embed():
+        # 3) 배치 임베딩: batch_size개의 청크가 모이면 한 번에 임베딩
+        buf: list = []
+        n_chunks = 0
+
+        def flush():
+            items = [x for x in buf if not isinstance(x, _FileDone)]
+            vectors = (
+                embeddings.embed_documents([c.page_content for _, c in items]) if items else []
+            )
+            _put(write_q, (list(buf), vectors), stop)
+            buf.clear()
+
+        while not stop.is_set():
+            item = chunk_q.get()
+            if item is _END:
+                break
+            buf.append(item)
+            if not isinstance(item, _FileDone):
+                n_chunks += 1
+                if n_chunks % batch_size == 0:
+                    flush()
+        if buf and not stop.is_set():
+            flush()
+
+    threads = [
+        _start_stage(load_and_split, chunk_q, stop, errors),
+        _start_stage(embed, write_q, stop, errors),
+    ]
+
+    # 4) 배치 저장: 메인 스레드에서 벡터저장소에 쓰고, 끝난 파일은 매니페스트에 기록
+    total_chunks = 0
+    total_collapsed = 0
+    try:
+        while True:
+            item = write_q.get()
+            if item is _END:
+                break
+            buf, vectors = item
+            items = [x for x in buf if not isinstance(x, _FileDone)]
+            with metrics.timer("vectorstore_write", op="upsert"):
+                upsert_embeddings(
+                    vectordb,
+                    docs=[c for _, c in items],
+                    ids=[cid for cid, _ in items],
+                    embeddings=vectors,
+                )
+            lexical.add([cid for cid, _ in items], [c for _, c in items])
+            total_chunks += len(items)
+
+            for done in (x for x in buf if isinstance(x, _FileDone)):
+                src = str(done.path)
+                # 이전 버전의 청크 중 새 버전에 없는 것은 삭제
+                stale = set(manifest.get_chunk_ids(src)) - set(done.ids)
+                if stale:
+                    delete_ids(vectordb, sorted(stale))
+                    lexical.remove(stale)
+                # 파일 단위로 저장해 두어, 중간에 중단되어도 완료된 파일은 다시 처리하지 않음
+                manifest.set(src, done.file_hash, done.ids)
+                manifest.save()
+                total_collapsed += done.n_collapsed
+                collapsed = (
+                    f" (+{done.n_collapsed} near-duplicates collapsed)" if done.n_collapsed else ""
+                )
+                print(
+                    f"[INGEST] {done.path.name}: {done.n_docs} documents → "
+                    f"{len(done.ids)} chunks{collapsed}."
+                )
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for t in threads:
+            t.join(timeout=5)
+        with metrics.timer("vectorstore_write", op="flush"):
+            flush_vectorstore(vectordb)
+        lexical.save(lexical_path)
+        # 참조 목록은 중단되어도 저장 (완료되지 않은 파일은 다음 실행에서 다시 정리됨)
+        if near_index is not None:
+            near_index.save(near_path)
+        elif near_path.exists():
+            near_path.unlink()
+        # 실패해도 위에서 파일을 새로 썼으므로, 검색 엔진/색인 캐시가 새 상태를 다시 열도록 함
+        reset_retrieval_engine()
+        reset_lexical_index()
+        reset_near_dup_index()
+
+    if errors:
+        raise errors[0]
+
+    if loader.failed_files:
+        print(f"[INGEST] Skipped {len(loader.failed_files)} files that failed to load.")
+
+    throughput = get_embedding_throughput(embeddings)
+    if throughput and throughput["chunks"]:
+        print(f"[INGEST] Embedding throughput: {throughput}")
 
-    print("[INGEST] Done. Vectorstore persisted.")
+    if total_collapsed:
+        print(f"[INGEST] Collapsed {total_collapsed} near-duplicate chunks.")
+    print(f"[INGEST] Done. Upserted {total_chunks} chunks. Vectorstore persisted.")
     return vectordb
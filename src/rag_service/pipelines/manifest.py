@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from ..config import get_app_config
+
+
+MANIFEST_FILENAME = "ingest_manifest.json"
+
+
+def get_manifest_path() -> Path:
+    """
+    현재 설정의 벡터스토어에 대응하는 매니페스트 파일 경로를 반환합니다.
+    backend마다 저장된 내용이 다르므로 chroma 이외의 backend는 별도 파일을 사용합니다.
+    Returns:
+        Path: 매니페스트 파일 경로
+    """
+    cfg = get_app_config()
+    name = MANIFEST_FILENAME
+    if cfg.vectorstore.backend != "chroma":
+        name = name.replace(".json", f"_{cfg.vectorstore.backend}.json")
+    return Path(cfg.vectorstore.persist_dir) / name
+
+
+def collection_fingerprint() -> str:
+    """
+    벡터스토어 컬렉션의 현재 상태를 나타내는 문자열을 반환합니다.
+    인덱싱이 일어날 때마다 매니페스트가 다시 저장되므로 파일의 수정 시각/크기로 판단합니다.
+    Returns:
+        str: 컬렉션 fingerprint
+    """
+    cfg = get_app_config()
+    path = get_manifest_path()
+    try:
+        st = path.stat()
+        state = f"{st.st_mtime_ns}:{st.st_size}"
+    except FileNotFoundError:
+        state = "none"
+    return f"{cfg.vectorstore.collection_name}:{state}"
+
+
+def file_sha256(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    """
+    파일 내용의 sha256 해시를 계산합니다.
+    Args:
+        path: 파일 경로
+        chunk_size: 한 번에 읽을 바이트 수
+    Returns:
+        str: 16진수 해시 문자열
+    """
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def make_chunk_id(doc: Document, ordinal: int) -> str:
+    """
+    청크의 결정적(deterministic) ID를 만듭니다.
+    같은 파일에서 같은 순서로 같은 내용이 나오면 항상 같은 ID가 됩니다.
+    Args:
+        doc: 청크 Document
+        ordinal: 파일 내 청크 순번
+    Returns:
+        str: 청크 ID
+    """
+    m = doc.metadata or {}
+    key = "|".join(
+        str(x)
+        for x in (
+            m.get("source"),
+            m.get("type"),
+            m.get("page"),
+            ordinal,
+            hashlib.sha1((doc.page_content or "").encode("utf-8")).hexdigest(),
+        )
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class IngestManifest:
+    """
+    원본 파일 → (내용 해시, 청크 ID 목록)을 기록하는 JSON 매니페스트입니다.
+    증분 인덱싱 시 새로 추가/변경/삭제된 파일을 판단하는 데 사용합니다.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str | Path, collection_name: str):
+        self.path = Path(path)
+        self.collection_name = collection_name
+        self.files: Dict[str, Dict] = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            # 컬렉션이 다르거나 버전이 다르면 매니페스트를 무시하고 새로 만듦
+            if (
+                data.get("version") == self.VERSION
+                and data.get("collection") == collection_name
+            ):
+                self.files = data.get("files", {})
+
+    def get_hash(self, source: str) -> Optional[str]:
+        """
+        기록된 파일 해시를 반환합니다.
+        Args:
+            source: 원본 파일 경로
+        Returns:
+            기록된 해시, 없으면 None
+        """
+        entry = self.files.get(source)
+        return entry["hash"] if entry else None
+
+    def get_chunk_ids(self, source: str) -> List[str]:
+        """
+        파일에 속한 청크 ID 목록을 반환합니다.
+        Args:
+            source: 원본 파일 경로
+        Returns:
+            청크 ID 목록
+        """
+        entry = self.files.get(source)
+        return list(entry["chunk_ids"]) if entry else []
+
+    def set(self, source: str, file_hash: str, chunk_ids: List[str]) -> None:
+        """
+        파일의 해시와 청크 ID 목록을 기록합니다.
+        Args:
+            source: 원본 파일 경로
+            file_hash: 파일 내용 해시
+            chunk_ids: 청크 ID 목록
+        """
+        self.files[source] = {"hash": file_hash, "chunk_ids": list(chunk_ids)}
+
+    def remove(self, source: str) -> None:
+        """
+        파일 기록을 삭제합니다.
+        Args:
+            source: 원본 파일 경로
+        """
+        self.files.pop(source, None)
+
+    def clear(self) -> None:
+        """
+        모든 파일 기록을 삭제합니다. (전체 재인덱싱 시)
+        """
+        self.files = {}
+
+    def save(self) -> None:
+        """
+        매니페스트를 파일에 저장합니다. (임시 파일에 쓴 뒤 교체)
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps(
+                {
+                    "version": self.VERSION,
+                    "collection": self.collection_name,
+                    "files": self.files,
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        tmp.replace(self.path)
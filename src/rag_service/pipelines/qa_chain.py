@@ -1,11 +1,20 @@
-from langchain_core.runnables import RunnablePassthrough, RunnableLambda
+import asyncio
+import time
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import patch_config
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from typing import List
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
 
+from .. import metrics
+from ..config import get_app_config
 from ..llms import get_llm
-from .retrieval import retrieve_multi
+from .answer_cache import AnswerCache
+from .context_packer import ContextPacker, doc_header
+from .manifest import collection_fingerprint
+from .retrieval import RetrievalEngine, get_retrieval_engine
 
 
 def _format_docs(docs: List[Document]) -> str:
@@ -16,27 +25,308 @@ def _format_docs(docs: List[Document]) -> str:
     Returns:
         포맷팅된 문자열
     """
-    parts = []
+    return "\n\n".join(doc_header(d) + "\n" + (d.page_content or "") for d in docs)
+
+
+def build_answer_cache(
+    k_text: int, k_table: int, k_image: int, engine: Optional[RetrievalEngine] = None
+) -> Optional[AnswerCache]:
+    """
+    설정에 따라 답변 캐시를 만듭니다.
+    검색 개수가 다르면 답변도 달라질 수 있으므로 fingerprint에 포함합니다.
+    질문 벡터끼리 비교하므로 임베딩 모델과 차원도 fingerprint에 포함합니다.
+    Args:
+        k_text: 텍스트 청크 검색 개수
+        k_table: 표 청크 검색 개수
+        k_image: 이미지 청크 검색 개수
+        engine: 질문 임베딩에 사용할 검색 엔진 (None이면 공유 엔진)
+    Returns:
+        AnswerCache 객체, 비활성화 시 None
+    """
+    cfg = get_app_config()
+    cache_cfg = cfg.answer_cache
+    if not cache_cfg.enabled:
+        return None
+    model_key = f"{cfg.rag_mode}:{cfg.embeddings.model_name}:d{cfg.vectorstore.dimensions}"
+    return AnswerCache(
+        embeddings=(engine or get_retrieval_engine()).embeddings,
+        path=cache_cfg.path,
+        max_entries=cache_cfg.max_entries,
+        ttl_seconds=cache_cfg.ttl_seconds,
+        similarity_threshold=cache_cfg.similarity_threshold,
+        fingerprint_fn=lambda: (
+            f"{collection_fingerprint()}:{k_text}:{k_table}:{k_image}:{model_key}"
+        ),
+    )
+
+
+def format_sources(docs: List[Document]) -> List[Dict[str, Any]]:
+    """
+    검색된 문서의 출처 정보를 JSON으로 보낼 수 있는 형태로 정리합니다.
+    Args:
+        docs: Document의 목록
+    Returns:
+        id, source, page, type, duplicates(합쳐진 다른 source/page, exact: 본문 동일 여부)를
+        담은 dict의 목록
+    """
+    out = []
     for d in docs:
         m = d.metadata or {}
-        header = (
-            f"파일 출처: {m.get('source')} | 페이지: {m.get('page')} | 데이터 타입: {m.get('type')}"
+        out.append(
+            {
+                "id": d.id,
+                "source": m.get("source"),
+                "page": m.get("page"),
+                "type": m.get("type"),
+                "duplicates": m.get("duplicate_refs", []),
+            }
         )
-        parts.append(header + "\n" + (d.page_content or ""))
-    return "\n\n".join(parts)
+    return out
+
+
+def _cached_details(hit: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    답변 캐시 적중 결과를 details 형식으로 만듭니다. (출처는 캐시된 답변을 만들 때의 것)
+    """
+    return {
+        "answer": hit["answer"],
+        "sources": hit["sources"],
+        "retrieval_ms": 0.0,
+        "generation_ms": 0.0,
+        "cached": True,
+        "cached_question": hit["question"],
+        **hit["context"],
+    }
+
+
+def _cached_event(hit: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    답변 캐시 적중 결과를 sources 이벤트로 만듭니다.
+    """
+    return {
+        "type": "sources",
+        "sources": hit["sources"],
+        "cached": True,
+        "cached_question": hit["question"],
+        "context": hit["context"],
+    }
+
+
+def _details(
+    answer: str,
+    docs: List[Document],
+    retrieval_s: float,
+    generation_s: float,
+    cached=False,
+    context: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    return {
+        "answer": answer,
+        "sources": format_sources(docs),
+        "retrieval_ms": round(retrieval_s * 1000, 1),
+        "generation_ms": round(generation_s * 1000, 1),
+        "cached": cached,
+        **(context or {}),
+    }
 
 
-def build_rag_chain(k_text: int = 4, k_table: int = 3, k_image: int = 3):
+class RagChain(Runnable[str, str]):
+    """
+    검색 → 프롬프트 → LLM → 문자열 파싱으로 이어지는 RAG 체인입니다.
+    invoke/ainvoke/batch는 답변 문자열을, invoke_with_details는 출처와 소요 시간을 함께 반환하고,
+    stream/astream은 다음 이벤트(dict)를 순서대로 내보냅니다.
+    - {"type": "sources", "sources": [...], "cached": bool, "context": {...}}: 생성 시작 전 검색 결과
+    - {"type": "token", "text": str}: LLM이 생성하는 대로 전달되는 답변 조각
+    답변 캐시가 있으면 검색/생성 전에 확인하고, 캐시 적중 시에는 캐시된 답변을 만들 때의
+    sources/context와 함께 그 답변의 원래 질문(cached_question)을 반환합니다.
+    packer가 있으면 참조 문서를 토큰 예산에 맞춰 줄이고, 줄인 토큰 수를 details/sources에 포함합니다.
+    """
+
+    def __init__(
+        self,
+        retrieve: Callable[[str], List[Document]],
+        answer_chain: Runnable,
+        cache: Optional[AnswerCache] = None,
+        packer: Optional[ContextPacker] = None,
+    ):
+        self.retrieve = retrieve
+        self.answer_chain = answer_chain
+        self.cache = cache
+        self.packer = packer
+
+    def _answer_inputs(
+        self, question: str, docs: List[Document]
+    ) -> Tuple[Dict[str, str], Dict[str, int]]:
+        with metrics.timer("context_format"):
+            if self.packer is None:
+                return {"question": question, "context": _format_docs(docs)}, {}
+            context, stats = self.packer.pack(question, docs)
+            return {"question": question, "context": context}, stats
+
+    def _lookup(self, question: str) -> Optional[Dict[str, Any]]:
+        cached = self.cache.lookup(question)
+        metrics.inc("answer_cache_lookups", result="miss" if cached is None else "hit")
+        return cached
+
+    # ---------- 전체 답변 ----------
+
+    def invoke(self, input: str, config: Optional[RunnableConfig] = None, **kwargs) -> str:
+        return self.invoke_with_details(input, config)["answer"]
+
+    async def ainvoke(self, input: str, config: Optional[RunnableConfig] = None, **kwargs) -> str:
+        return (await self.ainvoke_with_details(input, config))["answer"]
+
+    def invoke_with_details(
+        self, question: str, config: Optional[RunnableConfig] = None
+    ) -> Dict[str, Any]:
+        """
+        답변과 함께 출처, 검색/생성 소요 시간(ms), 캐시 적중 여부를 반환합니다.
+        Args:
+            question: 질문
+            config: Runnable 설정
+        Returns:
+            answer, sources, retrieval_ms, generation_ms, cached를 담은 dict
+            (캐시 적중 시 답변의 원래 질문 cached_question 포함)
+        """
+        # 검색/생성 span이 같은 trace에 묶이도록 질문 단위 span으로 감쌈
+        with metrics.span("rag_query"):
+            return self._call_with_config(self._invoke_with_details, question, config)
+
+    async def ainvoke_with_details(
+        self, question: str, config: Optional[RunnableConfig] = None
+    ) -> Dict[str, Any]:
+        """
+        invoke_with_details의 비동기 버전입니다.
+        """
+        with metrics.span("rag_query"):
+            return await self._acall_with_config(self._ainvoke_with_details, question, config)
+
+    def _invoke_with_details(
+        self, question: str, run_manager, config: RunnableConfig
+    ) -> Dict[str, Any]:
+        if self.cache is not None:
+            cached = self._lookup(question)
+            if cached is not None:
+                return _cached_details(cached)
+        child = patch_config(config, callbacks=run_manager.get_child())
+        start = time.perf_counter()
+        docs = self.retrieve(question)
+        # retrieval_ms에는 참조 문서 구성(packing)까지 포함
+        inputs, context = self._answer_inputs(question, docs)
+        retrieved = time.perf_counter()
+        with metrics.span("llm_generate", mode="invoke"):
+            answer = self.answer_chain.invoke(inputs, child)
+        generated = time.perf_counter()
+        if self.cache is not None:
+            self.cache.store(question, answer, format_sources(docs), context)
+        return _details(answer, docs, retrieved - start, generated - retrieved, context=context)
+
+    async def _ainvoke_with_details(
+        self, question: str, run_manager, config: RunnableConfig
+    ) -> Dict[str, Any]:
+        # 캐시 조회/저장과 검색은 임베딩/SQLite/행렬곱을 포함하므로 이벤트 루프 밖에서 실행
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self._lookup, question)
+            if cached is not None:
+                return _cached_details(cached)
+        child = patch_config(config, callbacks=run_manager.get_child())
+        start = time.perf_counter()
+        docs = await asyncio.to_thread(self.retrieve, question)
+        # packer는 저장된 벡터 조회/토큰 계산을 하므로 스레드에서 실행 (retrieval_ms에 포함)
+        inputs, context = await asyncio.to_thread(self._answer_inputs, question, docs)
+        retrieved = time.perf_counter()
+        with metrics.span("llm_generate", mode="invoke"):
+            answer = await self.answer_chain.ainvoke(inputs, child)
+        generated = time.perf_counter()
+        if self.cache is not None:
+            await asyncio.to_thread(
+                self.cache.store, question, answer, format_sources(docs), context
+            )
+        return _details(answer, docs, retrieved - start, generated - retrieved, context=context)
+
+    # ---------- 스트리밍 ----------
+
+    def stream(
+        self, input: str, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        if self.cache is not None:
+            cached = self._lookup(input)
+            if cached is not None:
+                yield _cached_event(cached)
+                yield {"type": "token", "text": cached["answer"]}
+                return
+        docs = self.retrieve(input)
+        inputs, context = self._answer_inputs(input, docs)
+        sources = format_sources(docs)
+        yield {
+            "type": "sources",
+            "sources": sources,
+            "cached": False,
+            "context": context,
+        }
+        parts = []
+        # 스트림은 소비자 쪽 context에서 재개되므로 span 대신 히스토그램만 기록
+        start = time.perf_counter()
+        with metrics.timer("llm_generate", mode="stream"):
+            for chunk in self.answer_chain.stream(inputs, config):
+                if not parts:
+                    metrics.observe("llm_first_token_seconds", time.perf_counter() - start)
+                parts.append(chunk)
+                yield {"type": "token", "text": chunk}
+        if self.cache is not None:
+            self.cache.store(input, "".join(parts), sources, context)
+
+    async def astream(
+        self, input: str, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self._lookup, input)
+            if cached is not None:
+                yield _cached_event(cached)
+                yield {"type": "token", "text": cached["answer"]}
+                return
+        docs = await asyncio.to_thread(self.retrieve, input)
+        inputs, context = await asyncio.to_thread(self._answer_inputs, input, docs)
+        sources = format_sources(docs)
+        yield {
+            "type": "sources",
+            "sources": sources,
+            "cached": False,
+            "context": context,
+        }
+        parts = []
+        start = time.perf_counter()
+        with metrics.timer("llm_generate", mode="stream"):
+            async for chunk in self.answer_chain.astream(inputs, config):
+                if not parts:
+                    metrics.observe("llm_first_token_seconds", time.perf_counter() - start)
+                parts.append(chunk)
+                yield {"type": "token", "text": chunk}
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.store, input, "".join(parts), sources, context)
+
+
+def build_rag_chain(
+    k_text: int = 4,
+    k_table: int = 3,
+    k_image: int = 3,
+    use_cache: Optional[bool] = None,
+    llm=None,
+    engine: Optional[RetrievalEngine] = None,
+):
     """
     RAG(Retrieval-Augmented Generation) 체인을 구축합니다.
     Args:
         k_text: 텍스트 청크 검색 개수
         k_table: 표 청크 검색 개수
         k_image: 이미지 청크 검색 개수
+        use_cache: 답변 캐시 사용 여부 (None이면 설정값 사용)
+        llm: 사용할 LLM (None이면 설정에 따라 생성)
+        engine: 사용할 검색 엔진 (None이면 프로세스 공유 엔진)
     Returns:
-        LCEL로 구현된 RAG 체인 객체
+        RagChain: invoke/ainvoke로 답변을, stream/astream으로 출처와 토큰 이벤트를 반환
     """
-    llm = get_llm()
+    llm = llm if llm is not None else get_llm()
 
     prompt = ChatPromptTemplate.from_template(
         """
@@ -51,19 +341,22 @@ def build_rag_chain(k_text: int = 4, k_table: int = 3, k_image: int = 3):
         {context}
         """
     )
-    retriever = RunnableLambda(
-        lambda x: retrieve_multi(x, k_text=k_text, k_table=k_table, k_image=k_image)
-    )
-    format_ctx = RunnableLambda(lambda docs: _format_docs(docs))
 
-    rag_chain = (
-        {
-            "question": RunnablePassthrough(),
-            "context": retriever | format_ctx,
-        }
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
+    def retrieve(question: str) -> List[Document]:
+        return (engine or get_retrieval_engine()).retrieve(
+            question, k_text=k_text, k_table=k_table, k_image=k_image
+        )
 
-    return rag_chain
+    answer_chain = prompt | llm | StrOutputParser()
+    cache = None
+    if use_cache is not False:
+        cache = build_answer_cache(k_text, k_table, k_image, engine=engine)
+    # 참조 문서 토큰 예산 (max_tokens가 없으면 검색된 문서를 그대로 모두 사용)
+    context_cfg = get_app_config().context
+    packer = None
+    if context_cfg.max_tokens:
+        eng = engine or get_retrieval_engine()
+        packer = ContextPacker.from_config(
+            context_cfg, eng.embeddings, llm=llm, vector_lookup=eng.stored_vectors
+        )
+    return RagChain(retrieve, answer_chain, cache=cache, packer=packer)
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
-from typing import List, Dict, Tuple
+import threading
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
 from langchain_core.documents import Document
 
+from .. import metrics
 from ..embeddings import get_embeddings
-from ..vectorstores.chroma_store import load_chroma
+from ..vectorstores import get_vectorstore, get_vectors_by_ids
+from ..chunking.near_dedup import attach_duplicate_refs
+from ..vectorstores.lexical_index import get_lexical_index, reciprocal_rank_fusion
 from ..config import get_app_config
 
 
@@ -35,17 +41,179 @@ def _dedup_docs(docs: List[Document]) -> List[Document]:
     return out
 
 
+class RetrievalEngine:
+    """
+    임베딩 모델과 벡터저장소(Chroma 컬렉션 등)를 한 번만 열어 두고 재사용하는 검색 엔진입니다.
+    질문은 한 번만 임베딩하고, 같은 벡터로 text/table/image를 각각 검색합니다.
+    hybrid 설정이 켜져 있으면 BM25 검색 결과와 RRF로 합칩니다.
+    """
+
+    def __init__(self, embeddings=None, vectordb=None):
+        self.retrieval_cfg = get_app_config().retrieval
+        self.embeddings = embeddings if embeddings is not None else get_embeddings()
+        self.vectordb = (
+            vectordb if vectordb is not None else get_vectorstore(self.embeddings, read_only=True)
+        )
+
+    def embed_query(self, question: str) -> List[float]:
+        """
+        질문을 임베딩 벡터로 변환합니다.
+        Args:
+            question: 검색할 질문
+        Returns:
+            질문의 임베딩 벡터
+        """
+        return self.embeddings.embed_query(question)
+
+    def search_by_vector(
+        self, query_vec: List[float], k: int, doc_type: str | None = None
+    ) -> List[Document]:
+        """
+        이미 계산된 질문 벡터로 Document를 검색합니다.
+        Args:
+            query_vec: 질문 임베딩 벡터
+            k: 검색할 document의 수
+            doc_type: 검색할 document의 type
+        Returns:
+            검색된 Document의 목록
+        """
+        if k <= 0:
+            return []
+        filter_ = {"type": doc_type} if doc_type else None
+        return self.vectordb.similarity_search_by_vector(query_vec, k=k, filter=filter_)
+
+    def search_types(
+        self, query_vec: List[float], k_by_type: Dict[str, int]
+    ) -> Dict[str, List[Document]]:
+        """
+        같은 질문 벡터로 type별 top-k를 검색합니다.
+        벡터저장소가 search_multi를 지원하면(NumpyVectorStore) 한 번의 행렬곱으로 처리합니다.
+        Args:
+            query_vec: 질문 임베딩 벡터
+            k_by_type: type → 검색할 document의 수
+        Returns:
+            type → 검색된 Document의 목록
+        """
+        if hasattr(self.vectordb, "search_multi"):
+            return self.vectordb.search_multi(query_vec, k_by_type)
+        return {
+            doc_type: self.search_by_vector(query_vec, k=k, doc_type=doc_type)
+            for doc_type, k in k_by_type.items()
+        }
+
+    def stored_vectors(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        검색된 문서의 저장된 벡터를 가져옵니다. (문서를 다시 임베딩하지 않기 위해 사용)
+        Args:
+            ids: 청크 ID 목록
+        Returns:
+            ID → 벡터 dict (없는 ID는 제외)
+        """
+        return get_vectors_by_ids(self.vectordb, ids)
+
+    def _hydrate(self, ids: List[str], known: List[Document]) -> List[Document]:
+        """
+        청크 ID 목록을 Document로 바꿉니다. 벡터 검색 결과에 없는 것(BM25로만 찾은 것)만
+        벡터저장소에서 가져옵니다.
+        Args:
+            ids: 순서대로 정렬된 청크 ID 목록
+            known: 이미 가져온 Document 목록
+        Returns:
+            ids 순서의 Document 목록 (벡터저장소에 없는 ID는 제외)
+        """
+        by_id = {d.id: d for d in known}
+        missing = [cid for cid in ids if cid not in by_id]
+        if missing:
+            with metrics.timer("retrieval_stage", stage="hydrate"):
+                by_id.update((d.id, d) for d in self.vectordb.get_by_ids(missing))
+        return [by_id[cid] for cid in ids if cid in by_id]
+
+    def retrieve(
+        self, question: str, k_text: int = 4, k_table: int = 3, k_image: int = 3
+    ) -> List[Document]:
+        """
+        질문을 한 번 임베딩한 뒤 text/table/image를 각각 검색하고 중복을 제거합니다.
+        인덱싱 때 합쳐진 근사 중복 청크의 출처는 metadata["duplicate_refs"]로 붙입니다.
+        Args:
+            question: 검색할 질문
+            k_text: 검색할 텍스트 Document의 수
+            k_table: 검색할 테이블 Document의 수
+            k_image: 검색할 이미지 Document의 수
+        Returns:
+            중복이 제거된 Document의 목록
+        """
+        with metrics.span("retrieval") as span:
+            with metrics.timer("retrieval_stage", stage="embed_query"):
+                query_vec = self.embed_query(question)
+            k_by_type = {"text": k_text, "table": k_table, "image": k_image}
+            hybrid = self.retrieval_cfg.hybrid
+            mult = max(1, self.retrieval_cfg.candidate_multiplier) if hybrid else 1
+            with metrics.timer("retrieval_stage", stage="vector_search"):
+                vector_hits = self.search_types(
+                    query_vec, {t: k * mult for t, k in k_by_type.items()}
+                )
+
+            docs: List[Document] = []
+            for doc_type, k in k_by_type.items():
+                if k <= 0:
+                    continue
+                if not hybrid:
+                    docs.extend(vector_hits[doc_type])
+                    continue
+                with metrics.timer("retrieval_stage", stage="lexical_search"):
+                    lexical_ids = get_lexical_index().search(
+                        question, k=k * mult, doc_type=doc_type
+                    )
+                fused = reciprocal_rank_fusion(
+                    [[d.id for d in vector_hits[doc_type]], lexical_ids],
+                    k=k,
+                    rrf_k=self.retrieval_cfg.rrf_k,
+                )
+                docs.extend(self._hydrate(fused, vector_hits[doc_type]))
+            docs = attach_duplicate_refs(_dedup_docs(docs))
+            span.set(hybrid=hybrid, documents=len(docs))
+        return docs
+
+
+_engine_cache: Optional[RetrievalEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_retrieval_engine() -> RetrievalEngine:
+    """
+    프로세스 전체에서 공유하는 RetrievalEngine을 반환합니다.
+    (처음 호출할 때 한 번만 생성한 뒤 캐시)
+    Returns:
+        RetrievalEngine 객체
+    """
+    global _engine_cache
+    if _engine_cache is not None:
+        return _engine_cache
+    with _engine_lock:
+        if _engine_cache is None:
+            _engine_cache = RetrievalEngine()
+    return _engine_cache
+
+
+def reset_retrieval_engine() -> None:
+    """
+    캐시된 RetrievalEngine을 버립니다. (재인덱싱 후 컬렉션을 다시 열 때 사용)
+    """
+    global _engine_cache
+    with _engine_lock:
+        _engine_cache = None
+
+
 def get_retriever(k: int = 5, doc_type: str | None = None):
     """
-    chroma db를 로드하고, retriever를 만듭니다. doc_type이 주어지면, 해당 type의 document만 검색합니다.
+    벡터저장소를 로드하고, retriever를 만듭니다. doc_type이 주어지면, 해당 type의 document만 검색합니다.
     Args:
         k: 검색할 document의 수
         doc_type: 검색할 document의 type
     Returns:
-        Chroma의 retriever 객체
+        벡터저장소의 retriever 객체
     """
-    embeddings = get_embeddings()
-    vectordb = load_chroma(embeddings)
+    vectordb = get_retrieval_engine().vectordb
     search_kwargs = {"k": k}
     if doc_type:
         search_kwargs["filter"] = {"type": doc_type}
@@ -58,6 +226,7 @@ def retrieve_multi(
 ) -> List[Document]:
     """
     text/table/image를 각각 따로 검색 후 합친 뒤 중복을 제거한 Document의 목록을 반환합니다.
+    질문 임베딩은 한 번만 계산하고, 임베딩 모델과 벡터저장소 핸들은 재사용합니다.
     Args:
         question: 검색할 질문
         k_text: 검색할 텍스트 Document의 수
@@ -66,13 +235,6 @@ def retrieve_multi(
     Returns:
         중복이 제거된 Document의 목록
     """
-    docs: List[Document] = []
-    # 텍스트 / 테이블 / 이미지 각각 따로 검색
-    if k_text > 0:
-        docs.extend(get_retriever(k=k_text, doc_type="text").invoke(question))
-    if k_table > 0:
-        docs.extend(get_retriever(k=k_table, doc_type="table").invoke(question))
-    if k_image > 0:
-        docs.extend(get_retriever(k=k_image, doc_type="image").invoke(question))
-
-    return _dedup_docs(docs)
+    return get_retrieval_engine().retrieve(
+        question, k_text=k_text, k_table=k_table, k_image=k_image
+    )
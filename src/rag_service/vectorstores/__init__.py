@@ -0,0 +1,117 @@
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from langchain_core.documents import Document
+
+from ..config import get_app_config
+from .numpy_store import NumpyVectorStore
+
+# chroma_store(langchain_chroma → chromadb)는 import 비용이 크므로 chroma backend를 쓸 때만 import
+
+
+def get_vectorstore(embeddings, read_only: bool = False):
+    """
+    VectorStoreConfig.backend에 따라 적절한 벡터저장소를 엽니다.
+    Args:
+        embeddings: 임베딩 모델
+        read_only: 검색만 할 때 True (numpy backend: 쓰기 잠금/journal을 건드리지 않음)
+    Returns:
+        벡터저장소 인스턴스
+    """
+    cfg = get_app_config()
+    vs_cfg = cfg.vectorstore
+    if vs_cfg.backend == "chroma":
+        from . import chroma_store
+
+        if vs_cfg.quantization != "none" or vs_cfg.rescore:
+            print("[VECTORSTORE] quantization/rescore는 numpy backend에서만 적용됩니다.")
+        return chroma_store.load_chroma(embeddings, collection_name=vs_cfg.collection_name)
+    elif vs_cfg.backend == "numpy":
+        path = Path(vs_cfg.persist_dir) / f"{vs_cfg.collection_name}_numpy"
+        return NumpyVectorStore(
+            path,
+            embedding=embeddings,
+            dimensions=vs_cfg.dimensions,
+            quantization=vs_cfg.quantization,
+            rescore=vs_cfg.rescore,
+            rescore_multiplier=vs_cfg.rescore_multiplier,
+            read_only=read_only,
+        )
+    else:
+        raise ValueError(f"지원하지 않는 vectorstore backend: {vs_cfg.backend}")
+
+
+def upsert_embeddings(
+    vectordb, docs: List[Document], ids: List[str], embeddings: List[List[float]]
+) -> None:
+    """
+    이미 계산된 임베딩과 함께 문서를 벡터저장소에 저장합니다.
+    Args:
+        vectordb: 벡터저장소
+        docs: Document 목록
+        ids: 문서별 ID 목록
+        embeddings: 문서별 임베딩 벡터
+    """
+    if isinstance(vectordb, NumpyVectorStore):
+        vectordb.upsert(ids, embeddings, docs)
+    else:
+        from . import chroma_store
+
+        chroma_store.upsert_embeddings(vectordb, docs, ids, embeddings)
+
+
+def delete_ids(vectordb, ids: List[str]) -> None:
+    """
+    주어진 ID의 문서들을 벡터저장소에서 삭제합니다.
+    Args:
+        vectordb: 벡터저장소
+        ids: 삭제할 문서 ID 목록
+    """
+    if isinstance(vectordb, NumpyVectorStore):
+        vectordb.delete(ids)
+    else:
+        from . import chroma_store
+
+        chroma_store.delete_ids(vectordb, ids)
+
+
+def flush_vectorstore(vectordb) -> None:
+    """
+    쓰기 내용을 디스크에 반영합니다. (Chroma는 즉시 반영되므로 아무 것도 하지 않음)
+    Args:
+        vectordb: 벡터저장소
+    """
+    if isinstance(vectordb, NumpyVectorStore):
+        vectordb.flush()
+
+
+def get_vectors_by_ids(vectordb, ids: List[str]) -> Dict[str, np.ndarray]:
+    """
+    ID로 저장된 벡터를 가져옵니다. (임베딩 모델을 다시 호출하지 않음, 없는 ID는 제외)
+    Args:
+        vectordb: 벡터저장소
+        ids: 문서 ID 목록
+    Returns:
+        ID → 벡터 dict
+    """
+    if isinstance(vectordb, NumpyVectorStore):
+        return vectordb.get_vectors_by_ids(ids)
+    from . import chroma_store
+
+    return chroma_store.get_vectors_by_ids(vectordb, ids)
+
+
+def reset_vectorstore(vectordb) -> None:
+    """
+    벡터저장소의 모든 문서를 지웁니다. (전체 재인덱싱 전에 사용)
+    Args:
+        vectordb: 벡터저장소
+    """
+    if isinstance(vectordb, NumpyVectorStore):
+        vectordb.clear()
+    else:
+        from . import chroma_store
+
+        chroma_store.reset_collection(vectordb)
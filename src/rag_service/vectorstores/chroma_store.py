@@ -1,38 +1,9 @@
 from langchain_chroma.vectorstores import Chroma
 from langchain_core.embeddings import Embeddings
 from ..config import get_app_config
-from pathlib import Path
-from typing import List
+from typing import Dict, List
 from langchain_core.documents import Document
-
-
-def create_chroma_from_documents(
-    docs: List[Document],
-    embeddings: Embeddings,
-    collection_name: str = "rfp_rag",
-) -> Chroma:
-    """
-    주어진 문서들로 Chroma 벡터저장소를 생성하고 저장합니다.
-    Args:
-        docs: Document 목록
-        embeddings: 임베딩 모델
-        collection_name: 컬렉션 이름
-    Returns:
-        Chroma 벡터저장소
-    """
-    cfg = get_app_config()
-    # 벡터저장소 디렉토리 없을시 생성
-    persist_dir = Path(cfg.vectorstore.persist_dir)
-    persist_dir.mkdir(parents=True, exist_ok=True)
-
-    # 입력받은 문서로 벡터저장소 생성
-    vectordb = Chroma.from_documents(
-        documents=docs,
-        embedding=embeddings,
-        collection_name=collection_name,
-        persist_directory=str(persist_dir),
-    )
-    return vectordb
+import numpy as np
 
 
 def load_chroma(
@@ -54,3 +25,67 @@ def load_chroma(
         embedding_function=embeddings,
         persist_directory=cfg.vectorstore.persist_dir,
     )
+
+
+def upsert_embeddings(
+    vectordb: Chroma,
+    docs: List[Document],
+    ids: List[str],
+    embeddings: List[List[float]],
+) -> None:
+    """
+    이미 계산된 임베딩과 함께 문서를 벡터저장소에 저장합니다. (같은 ID가 있으면 덮어씀)
+    공개 API(add_texts/add_documents)는 embedding_function으로 항상 다시 임베딩하고 미리 계산한
+    벡터를 받지 않으므로, 임베딩 단계와 저장 단계를 분리하기 위해 Chroma 컬렉션에 직접 씁니다.
+    Args:
+        vectordb: Chroma 벡터저장소
+        docs: Document 목록
+        ids: 문서별 ID 목록
+        embeddings: 문서별 임베딩 벡터
+    """
+    if not docs:
+        return
+    vectordb._collection.upsert(
+        ids=ids,
+        embeddings=embeddings,
+        metadatas=[d.metadata or None for d in docs],
+        documents=[d.page_content for d in docs],
+    )
+
+
+def delete_ids(vectordb: Chroma, ids: List[str], batch_size: int = 1000) -> None:
+    """
+    주어진 ID의 문서들을 벡터저장소에서 삭제합니다.
+    Args:
+        vectordb: Chroma 벡터저장소
+        ids: 삭제할 문서 ID 목록
+        batch_size: 한 번에 삭제할 문서 수
+    """
+    for start in range(0, len(ids), batch_size):
+        vectordb.delete(ids=ids[start : start + batch_size])
+
+
+def get_vectors_by_ids(vectordb: Chroma, ids: List[str]) -> Dict[str, np.ndarray]:
+    """
+    ID로 저장된 임베딩 벡터를 가져옵니다. (없는 ID는 제외)
+    Args:
+        vectordb: Chroma 벡터저장소
+        ids: 문서 ID 목록
+    Returns:
+        ID → 벡터 dict
+    """
+    if not ids:
+        return {}
+    res = vectordb.get(ids=list(ids), include=["embeddings"])
+    return {
+        cid: np.asarray(vec, dtype=np.float32) for cid, vec in zip(res["ids"], res["embeddings"])
+    }
+
+
+def reset_collection(vectordb: Chroma) -> None:
+    """
+    컬렉션을 지우고 빈 컬렉션으로 다시 만듭니다.
+    Args:
+        vectordb: Chroma 벡터저장소
+    """
+    vectordb.reset_collection()
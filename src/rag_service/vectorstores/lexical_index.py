@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import gzip
+import heapq
+import pickle
+import re
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from ..config import get_app_config
+
+
+LEXICAL_INDEX_FILENAME = "lexical_index.pkl.gz"
+
+# 한글 연속 구간과 그 외 영문/숫자 연속 구간을 분리 (예: "1200000원이며" → "1200000", "원이며")
+_WORD_RE = re.compile(r"[가-힣]+|[^\W_가-힣]+")
+_THOUSANDS_RE = re.compile(r"(?<=\d),(?=\d{3})")
+
+
+def tokenize(text: str, n: int = 2) -> List[str]:
+    """
+    BM25용 토큰화를 합니다.
+    - 한글 구간: 글자 n-gram (조사/어미가 붙어도 매칭되도록)
+    - 숫자/영문 구간(예산, 사업 코드 등): 그대로 (천 단위 쉼표는 제거)
+    Args:
+        text: 텍스트
+        n: 한글 n-gram 크기
+    Returns:
+        토큰 목록
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _THOUSANDS_RE.sub("", text)
+    tokens: List[str] = []
+    for word in _WORD_RE.findall(text):
+        if "가" <= word[0] <= "힣" and len(word) > n:
+            tokens.extend(word[i : i + n] for i in range(len(word) - n + 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    Chroma 컬렉션과 같은 청크 ID를 쓰는 BM25 역색인입니다.
+    인덱싱 시 함께 만들어 디스크에 저장하고, 검색 시 필요할 때 로드합니다.
+    - 본문/메타데이터는 벡터저장소에 있으므로 저장하지 않고 청크 ID만 반환
+      (검색 결과의 Document는 벡터저장소에서 가져옴)
+    - 색인(add/remove) 중에는 dict 역색인을 쓰고, 저장/검색 시 type별 CSR 배열
+      (토큰별 문서 번호/출현 빈도)로 고정(freeze)하여 numpy로 점수를 한 번에 누적
+      (문서별 BM25 가중치는 고정할 때 미리 계산)
+    - 삭제된 문서의 역색인 항목은 고정할 때 한 번에 정리 (그 전까지는 남겨 둠)
+    """
+
+    # 저장 형식 버전 (다르면 load()가 None을 반환하여 다시 인덱싱)
+    VERSION = 3
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # ----- 색인 중(가변) 상태 -----
+        # 내부 문서 번호 → (청크 ID, type, 문서 길이)
+        self.docs: Dict[int, Tuple[str, str, int]] = {}
+        self.id_to_doc: Dict[str, int] = {}
+        # type → 토큰 → {내부 문서 번호: 출현 빈도}
+        self.postings: Dict[str, Dict[str, Dict[int, int]]] = {}
+        self.total_len = 0
+        self._next = 0
+        # 삭제되었지만 역색인에 남아 있는 문서 번호
+        self._stale: Set[int] = set()
+        # ----- 고정(검색/저장용) 상태 -----
+        # ids, types, lengths, vocab, postings(type → (indptr, 문서 번호, 출현 빈도))
+        self._frozen: Optional[Dict[str, Any]] = None
+        # 검색용 파생 배열: idf(토큰별), weights(type → CSR과 같은 순서의 BM25 가중치)
+        self._idf: Optional[np.ndarray] = None
+        self._weights: Dict[str, np.ndarray] = {}
+        # False면 dict 역색인이 비어 있고 _frozen만 있는 상태 (load 직후)
+        self._mutable = True
+
+    def __len__(self) -> int:
+        if self._mutable:
+            return len(self.docs)
+        return len(self._frozen["ids"])
+
+    # ---------- 색인 ----------
+
+    def add(self, ids: List[str], docs: List[Document]) -> None:
+        """
+        문서를 색인에 추가합니다. (같은 ID가 있으면 교체)
+        Args:
+            ids: 청크 ID 목록
+            docs: Document 목록
+        """
+        self._thaw()
+        self.remove([cid for cid in ids if cid in self.id_to_doc])
+        for cid, d in zip(ids, docs):
+            tf = Counter(tokenize(d.page_content or ""))
+            length = sum(tf.values())
+            doc_type = (d.metadata or {}).get("type", "text")
+            num = self._next
+            self._next += 1
+            self.docs[num] = (cid, doc_type, length)
+            self.id_to_doc[cid] = num
+            self.total_len += length
+            postings = self.postings.setdefault(doc_type, {})
+            for term, cnt in tf.items():
+                postings.setdefault(term, {})[num] = cnt
+
+    def remove(self, ids: Iterable[str]) -> None:
+        """
+        문서를 색인에서 제거합니다. (역색인 항목은 고정할 때 정리)
+        Args:
+            ids: 제거할 청크 ID 목록
+        """
+        self._thaw()
+        for cid in ids:
+            num = self.id_to_doc.pop(cid, None)
+            if num is None:
+                continue
+            _, _, length = self.docs.pop(num)
+            self.total_len -= length
+            self._stale.add(num)
+
+    def _thaw(self) -> None:
+        """
+        고정된 색인을 dict 역색인으로 되돌려 수정할 수 있게 합니다. (이후 고정 상태는 버림)
+        """
+        if not self._mutable:
+            fz = self._frozen
+            terms = [None] * len(fz["vocab"])
+            for term, tid in fz["vocab"].items():
+                terms[tid] = term
+            lengths = fz["lengths"].tolist()
+            types = [fz["type_names"][c] for c in fz["types"].tolist()]
+            self.docs = {num: (cid, types[num], lengths[num]) for num, cid in enumerate(fz["ids"])}
+            self.id_to_doc = {cid: num for num, cid in enumerate(fz["ids"])}
+            self.total_len = int(sum(lengths))
+            self._next = len(lengths)
+            self.postings = {}
+            for t, (indptr, nums, tfs) in fz["postings"].items():
+                postings = self.postings[t] = {}
+                bounds, nums, tfs = indptr.tolist(), nums.tolist(), tfs.tolist()
+                for tid, term in enumerate(terms):
+                    a, z = bounds[tid], bounds[tid + 1]
+                    if a < z:
+                        postings[term] = dict(zip(nums[a:z], tfs[a:z]))
+            self._mutable = True
+        self._frozen = None
+        self._idf = None
+        self._weights = {}
+
+    def _freeze(self) -> Dict[str, Any]:
+        """
+        dict 역색인을 type별 CSR 배열로 고정하고 검색용 가중치를 계산합니다.
+        삭제된 문서는 빼고 문서 번호를 0부터 다시 매깁니다.
+        Returns:
+            고정된 색인
+        """
+        if self._frozen is not None:
+            return self._frozen
+        nums = sorted(self.docs)
+        renum = {num: i for i, num in enumerate(nums)}
+        type_names = sorted({self.docs[n][1] for n in nums} | set(self.postings))
+        type_code = {t: i for i, t in enumerate(type_names)}
+        vocab: Dict[str, int] = {}
+        entries: Dict[str, List[Tuple[int, List[int], List[int]]]] = {}
+        for t, postings in self.postings.items():
+            rows = entries[t] = []
+            for term, plist in postings.items():
+                alive = [(renum[n], tf) for n, tf in plist.items() if n in renum]
+                if alive:
+                    tid = vocab.setdefault(term, len(vocab))
+                    rows.append((tid, [n for n, _ in alive], [tf for _, tf in alive]))
+        csr = {}
+        for t, rows in entries.items():
+            rows.sort(key=lambda r: r[0])
+            counts = np.zeros(len(vocab) + 1, dtype=np.int64)
+            for tid, ns, _ in rows:
+                counts[tid + 1] = len(ns)
+            csr[t] = (
+                np.cumsum(counts),
+                np.fromiter((n for r in rows for n in r[1]), dtype=np.int32),
+                np.fromiter((tf for r in rows for tf in r[2]), dtype=np.int32),
+            )
+        self._frozen = {
+            "ids": [self.docs[n][0] for n in nums],
+            "type_names": type_names,
+            "types": np.array([type_code[self.docs[n][1]] for n in nums], dtype=np.int16),
+            "lengths": np.array([self.docs[n][2] for n in nums], dtype=np.int32),
+            "vocab": vocab,
+            "postings": csr,
+        }
+        self._stale = set()
+        self._prepare()
+        return self._frozen
+
+    def _prepare(self) -> None:
+        """
+        고정된 색인으로 토큰별 idf와 CSR 항목별 BM25 가중치를 계산합니다.
+        idf는 전체 문서 기준이므로 type 필터와 관계없이 같은 점수입니다.
+        """
+        fz = self._frozen
+        n_docs = len(fz["ids"])
+        df = np.zeros(len(fz["vocab"]), dtype=np.float64)
+        for indptr, _, _ in fz["postings"].values():
+            df += np.diff(indptr)
+        self._idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        lengths = fz["lengths"].astype(np.float32)
+        avgdl = float(lengths.mean()) if n_docs and lengths.mean() > 0 else 1.0
+        norm = self.k1 * (1 - self.b + self.b * lengths / avgdl)
+        self._weights = {}
+        for t, (_, nums, tfs) in fz["postings"].items():
+            tf = tfs.astype(np.float32)
+            self._weights[t] = tf * (self.k1 + 1) / (tf + norm[nums])
+
+    # ---------- 검색 ----------
+
+    def search(self, query: str, k: int, doc_type: Optional[str] = None) -> List[str]:
+        """
+        BM25 점수로 상위 k개의 문서를 검색합니다.
+        질문 토큰마다 CSR 구간의 가중치를 문서 번호 위치에 한 번에 더합니다.
+        Args:
+            query: 질문
+            k: 검색할 문서 수
+            doc_type: 검색할 document의 type (None이면 전체)
+        Returns:
+            점수 순으로 정렬된 청크 ID 목록
+        """
+        fz = self._freeze()
+        n_docs = len(fz["ids"])
+        if k <= 0 or n_docs == 0:
+            return []
+        types = [doc_type] if doc_type else list(fz["postings"])
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            tid = fz["vocab"].get(term)
+            if tid is None:
+                continue
+            idf = self._idf[tid]
+            for t in types:
+                if t not in fz["postings"]:
+                    continue
+                indptr, nums, _ = fz["postings"][t]
+                a, z = indptr[tid], indptr[tid + 1]
+                if a < z:
+                    # 한 토큰의 구간 안에서 문서 번호는 겹치지 않으므로 fancy indexing으로 누적
+                    scores[nums[a:z]] += idf * self._weights[t][a:z]
+
+        top = np.flatnonzero(scores)
+        if len(top) > k:
+            top = np.sort(top[np.argpartition(-scores[top], k - 1)[:k]])
+        # 점수가 같으면 먼저 색인된 문서 순
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [fz["ids"][i] for i in top]
+
+    # ---------- 저장/로드 ----------
+
+    def save(self, path: str | Path) -> None:
+        """
+        색인을 고정하여 gzip pickle 파일로 저장합니다. (임시 파일에 쓴 뒤 교체)
+        Args:
+            path: 저장 경로
+        """
+        data = {"version": self.VERSION, "k1": self.k1, "b": self.b, "frozen": self._freeze()}
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with gzip.open(tmp, "wb", compresslevel=3) as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Optional["LexicalIndex"]:
+        """
+        저장된 색인을 로드합니다. (검색용 가중치를 바로 계산, 수정할 때 dict 역색인으로 되돌림)
+        Args:
+            path: 저장 경로
+        Returns:
+            LexicalIndex 객체, 파일이 없거나 저장 형식이 다르면 None
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        with gzip.open(path, "rb") as f:
+            data = pickle.load(f)
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            return None
+        index = cls(k1=data["k1"], b=data["b"])
+        index._frozen = data["frozen"]
+        index._mutable = False
+        index._prepare()
+        return index
+
+
+def get_lexical_index_path() -> Path:
+    """
+    현재 설정의 벡터스토어에 대응하는 BM25 색인 파일 경로를 반환합니다.
+    (매니페스트와 마찬가지로 chroma 이외의 backend는 별도 파일 사용)
+    Returns:
+        Path: 색인 파일 경로
+    """
+    cfg = get_app_config()
+    name = LEXICAL_INDEX_FILENAME
+    if cfg.vectorstore.backend != "chroma":
+        name = name.replace(".pkl.gz", f"_{cfg.vectorstore.backend}.pkl.gz")
+    return Path(cfg.vectorstore.persist_dir) / name
+
+
+_index_cache: Optional[LexicalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    """
+    검색용 BM25 색인을 처음 필요할 때 로드하여 반환합니다. (이후 캐시)
+    Returns:
+        LexicalIndex 객체
+    """
+    global _index_cache
+    if _index_cache is not None:
+        return _index_cache
+    with _index_lock:
+        if _index_cache is None:
+            index = LexicalIndex.load(get_lexical_index_path())
+            _index_cache = index if index is not None else LexicalIndex()
+    return _index_cache
+
+
+def reset_lexical_index() -> None:
+    """
+    캐시된 BM25 색인을 버립니다. (재인덱싱 후 다시 로드할 때 사용)
+    """
+    global _index_cache
+    with _index_lock:
+        _index_cache = None
+
+
+def reciprocal_rank_fusion(result_lists: List[List[str]], k: int, rrf_k: int = 60) -> List[str]:
+    """
+    여러 검색 결과를 reciprocal rank fusion(RRF)으로 합칩니다.
+    Args:
+        result_lists: 순위대로 정렬된 청크 ID 목록들
+        k: 반환할 문서 수
+        rrf_k: RRF 상수 (클수록 하위 순위의 영향이 커짐)
+    Returns:
+        합친 점수 순으로 정렬된 상위 k개의 청크 ID
+    """
+    scores: Dict[str, float] = {}
+    for results in result_lists:
+        for rank, cid in enumerate(results):
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return heapq.nlargest(k, scores, key=scores.__getitem__)
@@ -0,0 +1,888 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 쓰기 잠금 없이 동작
+    fcntl = None
+
+
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    """
+    각 행을 단위 길이로 정규화합니다.
+    Args:
+        x: (N, D) 벡터 배열
+    Returns:
+        정규화된 float32 배열
+    """
+    x = np.asarray(x, dtype=np.float32)
+    if x.ndim == 1:
+        x = x[None, :]
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def fit_pca(x: np.ndarray, dims: int, max_samples: int = 20000, seed: int = 0):
+    """
+    임베딩 벡터에 PCA 투영을 학습합니다. (표본이 많으면 max_samples개만 사용)
+    Args:
+        x: (N, D) 벡터 배열
+        dims: 줄일 차원 수
+        max_samples: 학습에 사용할 최대 표본 수
+        seed: 표본 추출 시드
+    Returns:
+        (mean, components): 평균 (D,)와 주성분 (dims, D)
+    """
+    if len(x) < dims:
+        raise ValueError(f"PCA 학습 표본 수({len(x)})가 차원 수({dims})보다 적습니다.")
+    if len(x) > max_samples:
+        rows = np.sort(np.random.default_rng(seed).choice(len(x), max_samples, replace=False))
+        x = x[rows]
+    x = np.asarray(x, dtype=np.float32)
+    mean = x.mean(axis=0)
+    _, _, vt = np.linalg.svd(x - mean, full_matrices=False)
+    return mean, np.ascontiguousarray(vt[:dims], dtype=np.float32)
+
+
+def project(x: np.ndarray, mean: Optional[np.ndarray], components: Optional[np.ndarray]):
+    """
+    PCA로 투영한 뒤 다시 단위 길이로 정규화합니다. (PCA가 없으면 정규화만)
+    """
+    x = np.asarray(x, dtype=np.float32)
+    if components is not None:
+        x = (x - mean) @ components.T
+    return _normalize_rows(x)
+
+
+def quantize(x: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    벡터를 저장 형식으로 변환합니다.
+    Args:
+        x: (N, D) 정규화된 float32 벡터
+        mode: none, float16, int8 (int8은 벡터별 scale 사용)
+    Returns:
+        (변환된 벡터, 벡터별 scale 또는 None)
+    """
+    if mode == "none":
+        return np.asarray(x, dtype=np.float32), None
+    if mode == "float16":
+        return x.astype(np.float16), None
+    if mode == "int8":
+        scales = np.abs(x).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        q = np.clip(np.rint(x / scales[:, None]), -127, 127).astype(np.int8)
+        return q, scales.astype(np.float32)
+    raise ValueError(f"지원하지 않는 quantization: {mode}")
+
+
+def approx_scores(
+    vectors: np.ndarray, scales: Optional[np.ndarray], q: np.ndarray, block: int = 65536
+) -> np.ndarray:
+    """
+    저장 형식의 벡터와 질문 벡터의 내적을 구합니다.
+    float32가 아니면 블록 단위로 변환하여 전체를 한 번에 float32로 올리지 않습니다.
+    Args:
+        vectors: (N, D) 저장된 벡터
+        scales: int8일 때의 벡터별 scale
+        q: (D,) 질문 벡터
+        block: 한 번에 변환할 행 수
+    Returns:
+        (N,) float32 점수
+    """
+    if vectors.dtype == np.float32:
+        return vectors @ q
+    out = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), block):
+        out[start : start + block] = vectors[start : start + block].astype(np.float32) @ q
+    if scales is not None:
+        out *= scales
+    return out
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    메모리 맵(.npy) 기반의 in-process flat 벡터 저장소입니다.
+    - vectors.npy: 정규화된 float32 벡터 (N, D), np.load(mmap_mode="r")로 열어 시작이 즉시 끝나고
+      여러 워커 프로세스가 OS 페이지 캐시를 공유합니다.
+    - ids/types/pages/source_codes.npy: 메타데이터 컬럼 배열
+    - docs.jsonl + doc_offsets.npy: 본문과 전체 메타데이터 (검색 결과에 대해서만 읽음)
+    위 파일들은 세대(generation) 디렉토리(gen-000001, ...)에 저장하고, CURRENT 파일이 현재 세대를
+    가리킵니다. 열 때 한 세대의 파일을 모두 메모리 맵으로 잡아 두므로, 다른 프로세스가 flush하여
+    새 세대로 바꿔도 이미 연 저장소는 자기 세대를 계속 일관되게 읽습니다.
+    type별 행 번호(필터 비트맵)를 미리 계산해 두고, 검색 시 한 번의 행렬곱으로
+    text/table/image 점수를 모두 구한 뒤 type별 top-k를 argpartition으로 고릅니다.
+
+    쓰기(upsert/delete)는 journal 파일(journal.f32 + journal.jsonl)에 추가만 하고,
+    flush()에서 기존 세대와 합쳐 새 세대를 쓴 뒤 CURRENT를 원자적으로 교체합니다.
+    첫 쓰기부터 flush()가 끝날 때까지 쓰기 잠금(write.lock)을 잡으며, 잠금을 잡을 때
+    이전에 쓰다 종료된 프로세스의 journal이 있으면 다시 읽어 반영합니다.
+    검색만 하는 프로세스(API 서버 등)는 read_only=True로 열며, journal을 읽거나 지우지 않습니다.
+
+    압축 옵션(처음 만들 때의 설정으로 고정, meta.json에 기록):
+    - dimensions: 입력 벡터가 더 크면 PCA(pca.npz)로 차원 축소. 벡터가
+      dimensions * PCA_SAMPLES_PER_DIM개 이상 모인 flush에서 한 번 학습하며, 그 전까지는
+      원래 차원으로 저장했다가 학습할 때 모두 다시 투영 (학습 차원/표본 수는 meta.json에 기록)
+    - quantization: vectors.npy를 float16 또는 int8(+ 벡터별 scale, scales.npy)로 저장
+    - rescore: 원래 float32 벡터(full.npy)를 함께 저장해 두고, 근사 점수 상위
+      k * rescore_multiplier개만 다시 계산 (full.npy는 메모리 맵이라 후보 행만 읽음)
+    """
+
+    JOURNAL_VECTORS = "journal.f32"
+    # PCA 학습에 필요한 차원당 최소 표본 수
+    PCA_SAMPLES_PER_DIM = 4
+    PCA_MAX_SAMPLES = 20000
+    JOURNAL_LOG = "journal.jsonl"
+    # 현재 세대 디렉토리 이름을 담은 파일 (없으면 저장소 디렉토리에 바로 저장된 이전 형식)
+    CURRENT_FILE = "CURRENT"
+    WRITE_LOCK = "write.lock"
+    GENERATION_PREFIX = "gen-"
+    # 한 세대의 파일 (scales/full/pca는 설정에 따라 없을 수 있음)
+    DATA_FILES = (
+        "vectors.npy",
+        "scales.npy",
+        "full.npy",
+        "pca.npz",
+        "ids.npy",
+        "types.npy",
+        "pages.npy",
+        "source_codes.npy",
+        "doc_offsets.npy",
+        "docs.jsonl",
+        "meta.json",
+    )
+
+    def __init__(
+        self,
+        path: str | Path,
+        embedding: Optional[Embeddings] = None,
+        dimensions: Optional[int] = None,
+        quantization: str = "none",
+        rescore: bool = False,
+        rescore_multiplier: int = 4,
+        read_only: bool = False,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._embedding = embedding
+        self.dimensions = dimensions
+        self.quantization = quantization
+        self.rescore = rescore
+        self.rescore_multiplier = max(1, rescore_multiplier)
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        # 쓰기 잠금 파일 (잡고 있을 때만 열려 있음)
+        self._write_lock = None
+        # 쓰기 대기 중인 항목: ID → (journal.f32 행 번호, journal.jsonl 오프셋)
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        self._journal_rows = 0
+        self._journal_dim: Optional[int] = None
+        self._deleted: set = set()
+        self._id_to_row: Optional[Dict[str, int]] = None
+        self._open()
+
+    # ---------- 로드 ----------
+
+    def _current_generation(self) -> Optional[Path]:
+        """
+        CURRENT가 가리키는 세대 디렉토리를 반환합니다.
+        Returns:
+            세대 디렉토리, 저장된 내용이 없으면 None (이전 형식이면 저장소 디렉토리)
+        """
+        try:
+            name = (self.path / self.CURRENT_FILE).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return self.path if (self.path / "meta.json").exists() else None
+        return self.path / name
+
+    def _open(self, retries: int = 3) -> None:
+        """
+        현재 세대의 저장소 파일을 메모리 맵으로 엽니다.
+        여는 도중 다른 프로세스가 새 세대로 바꾸고 이전 세대를 지웠으면 새 세대를 다시 엽니다.
+        """
+        for attempt in range(retries):
+            try:
+                self._load_generation(self._current_generation())
+                return
+            except FileNotFoundError:
+                if attempt == retries - 1:
+                    raise
+
+    def _load_generation(self, gen: Optional[Path]) -> None:
+        """
+        한 세대의 저장소 파일을 메모리 맵으로 엽니다. (gen이 None이면 빈 저장소)
+        docs.jsonl도 메모리 맵으로 잡아 두어, 이후 세대가 바뀌어도 경로로 다시 열지 않습니다.
+        """
+        self.generation = gen
+        self.scales: Optional[np.ndarray] = None
+        self.full: Optional[np.ndarray] = None
+        self.pca_mean: Optional[np.ndarray] = None
+        self.pca_components: Optional[np.ndarray] = None
+        if gen is None:
+            self.meta: Dict[str, Any] = {
+                "dim": None,
+                "native_dim": None,
+                "count": 0,
+                "type_names": [],
+                "sources": [],
+                "dimensions": self.dimensions,
+                "quantization": self.quantization,
+                "rescore": self.rescore,
+                "pca_dims": None,
+                "pca_samples": None,
+            }
+            self.vectors = np.zeros((0, 0), dtype=np.float32)
+            self.ids = np.zeros((0,), dtype="U1")
+            self.types = np.zeros((0,), dtype=np.int16)
+            self.pages = np.zeros((0,), dtype=np.int32)
+            self.source_codes = np.zeros((0,), dtype=np.int32)
+            self.doc_offsets = np.zeros((0,), dtype=np.int64)
+            self._docs: Any = b""
+        else:
+            self.meta = json.loads((gen / "meta.json").read_text(encoding="utf-8"))
+            self.vectors = np.load(gen / "vectors.npy", mmap_mode="r")
+            self.ids = np.load(gen / "ids.npy", mmap_mode="r")
+            self.types = np.load(gen / "types.npy", mmap_mode="r")
+            self.pages = np.load(gen / "pages.npy", mmap_mode="r")
+            self.source_codes = np.load(gen / "source_codes.npy", mmap_mode="r")
+            self.doc_offsets = np.load(gen / "doc_offsets.npy", mmap_mode="r")
+            with (gen / "docs.jsonl").open("rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                self._docs = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            # 압축 옵션이 없던 저장소는 float32 원본 그대로 저장된 것
+            self.meta.setdefault("native_dim", self.meta["dim"])
+            self.meta.setdefault("dimensions", None)
+            self.meta.setdefault("quantization", "none")
+            self.meta.setdefault("rescore", False)
+            if (gen / "pca.npz").exists():
+                with np.load(gen / "pca.npz") as pca:
+                    self.pca_mean = pca["mean"]
+                    self.pca_components = pca["components"]
+            # 학습 정보가 없던 저장소는 pca.npz의 차원으로 채움 (표본 수는 알 수 없음)
+            fitted = len(self.pca_components) if self.pca_components is not None else None
+            self.meta.setdefault("pca_dims", fitted)
+            self.meta.setdefault("pca_samples", None)
+            self._check_compression()
+            if (gen / "scales.npy").exists():
+                self.scales = np.load(gen / "scales.npy", mmap_mode="r")
+            if self.meta["rescore"]:
+                self.full = np.load(gen / "full.npy", mmap_mode="r")
+
+        self._id_to_row = None
+        # type별 행 번호 (필터 비트맵)
+        self.type_rows: Dict[str, np.ndarray] = {
+            name: np.flatnonzero(self.types == code)
+            for code, name in enumerate(self.meta["type_names"])
+        }
+
+    @property
+    def id_to_row(self) -> Dict[str, int]:
+        """
+        ID → 행 번호 dict. 쓰기 시에만 필요하므로 처음 사용할 때 만듭니다.
+        """
+        if self._id_to_row is None:
+            self._id_to_row = {str(cid): i for i, cid in enumerate(self.ids)}
+        return self._id_to_row
+
+    def _check_compression(self) -> None:
+        """
+        저장된 압축 옵션이 현재 설정과 같은지, 학습된 PCA가 설정한 차원인지 확인합니다.
+        """
+        stored = (self.meta["dimensions"], self.meta["quantization"], self.meta["rescore"])
+        wanted = (self.dimensions, self.quantization, self.rescore)
+        if stored != wanted:
+            raise ValueError(
+                f"저장소({self.path})의 압축 설정 (dimensions, quantization, rescore)={stored}가 "
+                f"현재 설정 {wanted}와 다릅니다. 디렉토리를 지우고 --rebuild로 다시 인덱싱하세요."
+            )
+        fitted = len(self.pca_components) if self.pca_components is not None else None
+        expected_dim = fitted if fitted is not None else self.meta["native_dim"]
+        if (
+            self.meta["pca_dims"] != fitted
+            or (fitted is not None and fitted != self.dimensions)
+            or self.meta["dim"] != expected_dim
+        ):
+            raise ValueError(
+                f"저장소({self.path})의 PCA 차원(pca_dims={self.meta['pca_dims']}, "
+                f"pca.npz={fitted}, dim={self.meta['dim']})이 설정한 dimensions={self.dimensions}와 "
+                "맞지 않습니다. (표본이 부족한 상태에서 학습된 저장소) "
+                "디렉토리를 지우고 --rebuild로 다시 인덱싱하세요."
+            )
+
+    def _pca_min_samples(self) -> int:
+        return int(self.dimensions or 0) * self.PCA_SAMPLES_PER_DIM
+
+    def _float_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        저장된 행을 정규화된 float32 벡터로 읽습니다. (full.npy가 없으면 검색용 벡터를 역양자화)
+        """
+        if self.full is not None:
+            return np.asarray(self.full[rows], dtype=np.float32)
+        x = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            x *= np.asarray(self.scales[rows])[:, None]
+        return _normalize_rows(x)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        검색 시 메모리에 올라가는 크기와 디스크 사용량을 바이트 단위로 반환합니다.
+        Returns:
+            search_bytes(vectors + scales), rescore_bytes(full.npy), bytes_per_vector를 담은 dict
+        """
+        search = int(self.vectors.nbytes)
+        if self.scales is not None:
+            search += int(self.scales.nbytes)
+        rescore = int(self.full.nbytes) if self.full is not None else 0
+        n = len(self.ids)
+        return {
+            "vectors": n,
+            "search_bytes": search,
+            "rescore_bytes": rescore,
+            "bytes_per_vector": search // n if n else 0,
+        }
+
+    # ---------- 검색 ----------
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding
+
+    def search_multi(
+        self, query_vec: List[float], k_by_type: Dict[Optional[str], int]
+    ) -> Dict[Optional[str], List[Document]]:
+        """
+        한 번의 행렬곱으로 모든 벡터의 점수를 구한 뒤, type별 top-k를 반환합니다.
+        Args:
+            query_vec: 질문 임베딩 벡터
+            k_by_type: type → 검색할 개수 (type이 None이면 전체에서 검색)
+        Returns:
+            type → 점수 순으로 정렬된 Document 목록
+        """
+        out: Dict[Optional[str], List[Document]] = {t: [] for t in k_by_type}
+        if len(self.ids) == 0:
+            return out
+        q_full = _normalize_rows(np.asarray(query_vec))[0]
+        if q_full.shape[0] != self.meta["native_dim"]:
+            raise ValueError(
+                f"질문 벡터 차원이 다릅니다: {q_full.shape[0]} != {self.meta['native_dim']}"
+            )
+        q = project(q_full, self.pca_mean, self.pca_components)[0]
+        scores = approx_scores(self.vectors, self.scales, q)
+
+        for doc_type, k in k_by_type.items():
+            if k <= 0:
+                continue
+            rows = self.type_rows.get(doc_type) if doc_type else np.arange(len(self.ids))
+            if rows is None or len(rows) == 0:
+                continue
+            if self._deleted:
+                alive = np.fromiter(
+                    (str(self.ids[r]) not in self._deleted for r in rows),
+                    dtype=bool,
+                    count=len(rows),
+                )
+                rows = rows[alive]
+            sub = scores[rows]
+            # rescore: 근사 점수로 후보를 넉넉히 고른 뒤 원래 벡터로 다시 계산
+            n_cand = k * self.rescore_multiplier if self.full is not None else k
+            kk = min(n_cand, len(rows))
+            top = np.argpartition(-sub, kk - 1)[:kk]
+            if self.full is not None:
+                cand = np.sort(rows[top])
+                exact = self.full[cand] @ q_full
+                order = np.argsort(-exact)[:k]
+                out[doc_type] = [self._read_doc(int(cand[i])) for i in order]
+            else:
+                top = top[np.argsort(-sub[top])]
+                out[doc_type] = [self._read_doc(int(rows[i])) for i in top]
+        return out
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, str]] = None, **kwargs
+    ) -> List[Document]:
+        """
+        벡터로 유사한 문서를 검색합니다. filter는 {"type": ...}만 지원합니다.
+        """
+        doc_type = None
+        if filter:
+            unsupported = set(filter) - {"type"}
+            if unsupported:
+                raise ValueError(f"NumpyVectorStore는 type 필터만 지원합니다: {unsupported}")
+            doc_type = filter.get("type")
+        return self.search_multi(embedding, {doc_type: k})[doc_type]
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, str]] = None, **kwargs
+    ) -> List[Document]:
+        """
+        질문 텍스트로 유사한 문서를 검색합니다.
+        """
+        if self._embedding is None:
+            raise ValueError("embedding 함수가 지정되지 않았습니다.")
+        vec = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector(vec, k=k, filter=filter)
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        """
+        ID로 저장된 문서를 가져옵니다. (없는 ID는 제외)
+        """
+        rows = [self.id_to_row.get(cid) for cid in ids if cid not in self._deleted]
+        return [self._read_doc(r) for r in rows if r is not None]
+
+    def get_vectors_by_ids(self, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        ID로 저장된 벡터를 가져옵니다. (정규화된 float32, 없는 ID는 제외)
+        rescore용 원래 벡터가 있으면 그것을, 없으면 검색용 벡터(PCA 투영/역양자화)를 반환하므로
+        같은 저장소에서 가져온 벡터끼리만 비교할 수 있습니다.
+        """
+        found = [
+            (cid, self.id_to_row[cid])
+            for cid in ids
+            if cid in self.id_to_row and cid not in self._deleted
+        ]
+        if not found:
+            return {}
+        vecs = self._float_rows(np.array([r for _, r in found], dtype=np.int64))
+        return {cid: vecs[i] for i, (cid, _) in enumerate(found)}
+
+    def _doc_line(self, row: int) -> bytes:
+        """
+        연 세대의 docs.jsonl(메모리 맵)에서 한 행의 JSON 줄을 읽습니다. (줄바꿈 포함)
+        """
+        start = int(self.doc_offsets[row])
+        end = self._docs.find(b"\n", start)
+        return self._docs[start : end + 1 if end >= 0 else len(self._docs)]
+
+    def _read_doc(self, row: int) -> Document:
+        """
+        docs.jsonl에서 한 행의 본문/메타데이터를 읽습니다.
+        """
+        rec = json.loads(self._doc_line(row))
+        return Document(id=rec["id"], page_content=rec["text"], metadata=rec["metadata"])
+
+    # ---------- 쓰기 ----------
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], docs: List[Document]) -> None:
+        """
+        벡터와 문서를 journal에 추가합니다. (flush() 시 반영)
+        Args:
+            ids: 문서 ID 목록
+            embeddings: 문서별 임베딩 벡터
+            docs: Document 목록
+        """
+        if not ids:
+            return
+        vecs = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            self._acquire_writer()
+            dim = self.meta["native_dim"] or self._journal_dim or vecs.shape[1]
+            if vecs.shape[1] != dim:
+                raise ValueError(f"벡터 차원이 다릅니다: {vecs.shape[1]} != {dim}")
+            self._journal_dim = dim
+            with (self.path / self.JOURNAL_VECTORS).open("ab") as fv:
+                fv.write(vecs.tobytes())
+            with (self.path / self.JOURNAL_LOG).open("ab") as fl:
+                for i, (cid, d) in enumerate(zip(ids, docs)):
+                    rec = {
+                        "op": "upsert",
+                        "id": cid,
+                        "row": self._journal_rows + i,
+                        "dim": dim,
+                        "text": d.page_content,
+                        "metadata": d.metadata or {},
+                    }
+                    self._pending[cid] = (self._journal_rows + i, fl.tell())
+                    fl.write(json.dumps(rec, ensure_ascii=False).encode("utf-8") + b"\n")
+                    if cid in self.id_to_row:
+                        self._deleted.add(cid)
+            self._journal_rows += len(ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs) -> Optional[bool]:
+        """
+        문서 삭제를 journal에 기록합니다. (flush() 시 반영)
+        """
+        if not ids:
+            return None
+        with self._lock:
+            self._acquire_writer()
+            with (self.path / self.JOURNAL_LOG).open("ab") as fl:
+                for cid in ids:
+                    fl.write(json.dumps({"op": "delete", "id": cid}).encode("utf-8") + b"\n")
+                    self._pending.pop(cid, None)
+                    if cid in self.id_to_row:
+                        self._deleted.add(cid)
+        return True
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs,
+    ) -> List[str]:
+        """
+        텍스트를 임베딩하여 저장하고 바로 flush합니다.
+        """
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+        vecs = self._embedding.embed_documents(texts)
+        docs = [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+        self.upsert(ids, vecs, docs)
+        self.flush()
+        return ids
+
+    def _acquire_writer(self, replay: bool = True) -> None:
+        """
+        쓰기 잠금을 잡습니다. 잡기 전에 다른 프로세스가 바꾼 세대를 다시 열고,
+        이전에 쓰다 종료된 프로세스의 journal이 남아 있으면 반영합니다. (lock을 잡은 상태에서 호출)
+        Args:
+            replay: 남은 journal을 반영할지 여부 (곧 모두 지울 때는 False)
+        """
+        if self.read_only:
+            raise ValueError(f"읽기 전용으로 연 저장소({self.path})에는 쓸 수 없습니다.")
+        if self._write_lock is not None:
+            return
+        f = (self.path / self.WRITE_LOCK).open("ab")
+        if fcntl is not None:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                raise RuntimeError(
+                    f"다른 프로세스가 저장소({self.path})에 쓰는 중입니다. 끝난 뒤 다시 실행하세요."
+                )
+        self._write_lock = f
+        self._open()
+        if replay:
+            self._replay_journal()
+
+    def _release_writer(self) -> None:
+        """
+        쓰기 잠금을 놓습니다. (journal을 모두 반영한 뒤, lock을 잡은 상태에서 호출)
+        """
+        if self._write_lock is not None:
+            self._write_lock.close()
+            self._write_lock = None
+
+    def _replay_journal(self) -> None:
+        """
+        이전에 flush되지 않은 journal이 있으면 다시 읽어 반영합니다. (쓰기 잠금을 잡은 상태에서 호출)
+        journal.f32 끝에 쓰다 만 행이 있을 수 있으므로 이어 쓰지 않고 바로 새 세대로 반영합니다.
+        """
+        log_path = self.path / self.JOURNAL_LOG
+        if not log_path.exists():
+            return
+        with log_path.open("rb") as fl:
+            while True:
+                offset = fl.tell()
+                line = fl.readline()
+                if not line:
+                    break
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    # 마지막 줄이 쓰다 만 상태일 수 있음
+                    break
+                cid = rec["id"]
+                if rec["op"] == "upsert":
+                    self._pending[cid] = (rec["row"], offset)
+                    self._journal_rows = max(self._journal_rows, rec["row"] + 1)
+                    self._journal_dim = rec["dim"]
+                else:
+                    self._pending.pop(cid, None)
+                if cid in self.id_to_row:
+                    self._deleted.add(cid)
+        self._flush_locked()
+
+    def flush(self) -> None:
+        """
+        기존 세대 + journal의 upsert - 삭제를 합쳐 새 세대를 쓰고 다시 연 뒤 쓰기 잠금을 놓습니다.
+        벡터는 메모리 맵에서 블록 단위로 복사하므로 메모리 사용량이 일정합니다.
+        """
+        with self._lock:
+            self._acquire_writer()
+            self._flush_locked()
+            self._release_writer()
+
+    def _flush_locked(self) -> None:
+        """
+        flush()의 본체입니다. (lock과 쓰기 잠금을 잡은 상태에서 호출)
+        """
+        if not self._pending and not self._deleted:
+            self._clear_journal()
+            return
+
+        keep_rows = np.array(
+            [r for r, cid in enumerate(self.ids) if str(cid) not in self._deleted],
+            dtype=np.int64,
+        )
+        new_ids = list(self._pending.keys())
+        total = len(keep_rows) + len(new_ids)
+        native_dim = int(self.meta["native_dim"] or self._journal_dim or 0)
+        journal_vecs = (
+            np.memmap(self.path / self.JOURNAL_VECTORS, dtype=np.float32, mode="r").reshape(
+                -1, native_dim
+            )
+            if new_ids
+            else None
+        )
+
+        # 새 세대 디렉토리에 쓰고, 다 쓴 뒤 CURRENT를 바꿈
+        gen_dir = self._new_generation_dir()
+
+        # 차원 축소가 필요하면 표본이 충분히 모였을 때 전체(기존 + 새) 벡터로 PCA 학습
+        # 학습 전에 원래 차원으로 저장해 둔 기존 행은 아래에서 다시 투영
+        reproject = False
+        pca_samples = self.meta.get("pca_samples")
+        if self.dimensions and native_dim > self.dimensions and self.pca_components is None:
+            if total >= self._pca_min_samples():
+                pick = np.arange(total)
+                if total > self.PCA_MAX_SAMPLES:
+                    rng = np.random.default_rng(0)
+                    pick = np.sort(rng.choice(total, self.PCA_MAX_SAMPLES, replace=False))
+                old, new = pick[pick < len(keep_rows)], pick[pick >= len(keep_rows)]
+                parts = [self._float_rows(keep_rows[old])] if len(old) else []
+                if len(new):
+                    rows = [self._pending[new_ids[i - len(keep_rows)]][0] for i in new]
+                    parts.append(np.asarray(journal_vecs[rows], dtype=np.float32))
+                self.pca_mean, self.pca_components = fit_pca(
+                    np.concatenate(parts), self.dimensions, max_samples=self.PCA_MAX_SAMPLES
+                )
+                pca_samples = len(pick)
+                reproject = len(keep_rows) > 0
+                print(
+                    f"[VECTORSTORE] Fitted PCA {native_dim} → {self.dimensions} dims "
+                    f"on {pca_samples} vectors."
+                )
+            else:
+                print(
+                    f"[VECTORSTORE] PCA deferred: {total} vectors < "
+                    f"{self._pca_min_samples()} needed for {self.dimensions} dims, "
+                    f"storing {native_dim}-dim vectors until then."
+                )
+        dim = len(self.pca_components) if self.pca_components is not None else native_dim
+        if self.pca_components is not None:
+            np.savez(gen_dir / "pca.npz", mean=self.pca_mean, components=self.pca_components)
+
+        type_names: List[str] = list(self.meta["type_names"])
+        sources: List[str] = list(self.meta["sources"])
+        type_code = {n: i for i, n in enumerate(type_names)}
+        source_code = {s: i for i, s in enumerate(sources)}
+
+        vec_dtype = {"none": np.float32, "float16": np.float16, "int8": np.int8}[self.quantization]
+        vec_out = np.lib.format.open_memmap(
+            gen_dir / "vectors.npy", mode="w+", dtype=vec_dtype, shape=(total, dim)
+        )
+        scales_out = (
+            np.lib.format.open_memmap(
+                gen_dir / "scales.npy", mode="w+", dtype=np.float32, shape=(total,)
+            )
+            if self.quantization == "int8"
+            else None
+        )
+        full_out = (
+            np.lib.format.open_memmap(
+                gen_dir / "full.npy", mode="w+", dtype=np.float32, shape=(total, native_dim)
+            )
+            if self.rescore
+            else None
+        )
+        ids_out, types_out, pages_out, src_out, offsets_out = [], [], [], [], []
+        journal_rows: List[int] = []
+        block = 8192
+
+        with (gen_dir / "docs.jsonl").open("wb") as fout:
+            # 1) 기존 행 복사 (블록 단위, 이미 압축된 형식 그대로)
+            for start in range(0, len(keep_rows), block):
+                rows = keep_rows[start : start + block]
+                if reproject:
+                    # PCA를 이번에 학습했으면 원래 차원으로 저장된 기존 행도 투영
+                    vecs, scales = quantize(
+                        project(self._float_rows(rows), self.pca_mean, self.pca_components),
+                        self.quantization,
+                    )
+                else:
+                    vecs, scales = self.vectors[rows], (
+                        self.scales[rows] if self.scales is not None else None
+                    )
+                vec_out[start : start + len(rows)] = vecs
+                if scales_out is not None:
+                    scales_out[start : start + len(rows)] = scales
+                if full_out is not None:
+                    full_out[start : start + len(rows)] = self.full[rows]
+            if len(keep_rows):
+                for r in keep_rows:
+                    offsets_out.append(fout.tell())
+                    fout.write(self._doc_line(int(r)))
+                ids_out.extend(str(x) for x in self.ids[keep_rows])
+                types_out.extend(self.types[keep_rows].tolist())
+                pages_out.extend(self.pages[keep_rows].tolist())
+                src_out.extend(self.source_codes[keep_rows].tolist())
+
+            # 2) journal의 새 행 추가
+            if new_ids:
+                with (self.path / self.JOURNAL_LOG).open("rb") as fl:
+                    for cid in new_ids:
+                        row, offset = self._pending[cid]
+                        fl.seek(offset)
+                        rec = json.loads(fl.readline())
+                        m = rec["metadata"]
+                        journal_rows.append(row)
+
+                        t = m.get("type", "text")
+                        if t not in type_code:
+                            type_code[t] = len(type_names)
+                            type_names.append(t)
+                        s = str(m.get("source"))
+                        if s not in source_code:
+                            source_code[s] = len(sources)
+                            sources.append(s)
+                        page = m.get("page")
+
+                        doc = {"id": cid, "text": rec["text"], "metadata": m}
+                        offsets_out.append(fout.tell())
+                        fout.write(json.dumps(doc, ensure_ascii=False).encode("utf-8") + b"\n")
+                        ids_out.append(cid)
+                        types_out.append(type_code[t])
+                        pages_out.append(int(page) if isinstance(page, int) else -1)
+                        src_out.append(source_code[s])
+
+            # 새 벡터는 블록 단위로 차원 축소/양자화하여 기록
+            base = len(keep_rows)
+            for start in range(0, len(journal_rows), block):
+                full = journal_vecs[journal_rows[start : start + block]]
+                lo, hi = base + start, base + start + len(full)
+                if full_out is not None:
+                    full_out[lo:hi] = full
+                vecs, scales = quantize(
+                    project(full, self.pca_mean, self.pca_components), self.quantization
+                )
+                vec_out[lo:hi] = vecs
+                if scales_out is not None:
+                    scales_out[lo:hi] = scales
+
+        for out in (vec_out, scales_out, full_out):
+            if out is not None:
+                out.flush()
+        del vec_out, scales_out, full_out, journal_vecs
+        np.save(gen_dir / "ids.npy", np.array(ids_out, dtype=str))
+        np.save(gen_dir / "types.npy", np.array(types_out, dtype=np.int16))
+        np.save(gen_dir / "pages.npy", np.array(pages_out, dtype=np.int32))
+        np.save(gen_dir / "source_codes.npy", np.array(src_out, dtype=np.int32))
+        np.save(gen_dir / "doc_offsets.npy", np.array(offsets_out, dtype=np.int64))
+        (gen_dir / "meta.json").write_text(
+            json.dumps(
+                {
+                    "dim": dim,
+                    "native_dim": native_dim,
+                    "count": total,
+                    "type_names": type_names,
+                    "sources": sources,
+                    "dimensions": self.dimensions,
+                    "quantization": self.quantization,
+                    "rescore": self.rescore,
+                    "pca_dims": dim if self.pca_components is not None else None,
+                    "pca_samples": pca_samples,
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+
+        self._switch_generation(gen_dir.name)
+        self._clear_journal()
+        self._open()
+        self._remove_old_generations()
+
+    def clear(self) -> None:
+        """
+        저장된 세대와 journal을 모두 지우고 빈 저장소로 다시 엽니다. (PCA도 다시 학습)
+        """
+        with self._lock:
+            self._acquire_writer(replay=False)
+            (self.path / self.CURRENT_FILE).unlink(missing_ok=True)
+            self._clear_journal()
+            self.generation = None
+            self._remove_old_generations()
+            self._open()
+            self._release_writer()
+
+    def _new_generation_dir(self) -> Path:
+        """
+        기존 세대(중단되어 남은 것 포함)보다 큰 번호의 빈 세대 디렉토리를 만듭니다.
+        """
+        numbers = [
+            int(child.name[len(self.GENERATION_PREFIX) :])
+            for child in self.path.glob(self.GENERATION_PREFIX + "*")
+            if child.name[len(self.GENERATION_PREFIX) :].isdigit()
+        ]
+        gen_dir = self.path / f"{self.GENERATION_PREFIX}{max(numbers, default=0) + 1:06d}"
+        gen_dir.mkdir()
+        return gen_dir
+
+    def _switch_generation(self, name: str) -> None:
+        """
+        CURRENT가 새 세대를 가리키도록 원자적으로 교체합니다. (lock을 잡은 상태에서 호출)
+        """
+        tmp = self.path / (self.CURRENT_FILE + ".tmp")
+        tmp.write_text(name, encoding="utf-8")
+        os.replace(tmp, self.path / self.CURRENT_FILE)
+
+    def _remove_old_generations(self) -> None:
+        """
+        현재 세대가 아닌 세대 디렉토리와 이전 형식의 파일을 지웁니다. (lock을 잡은 상태에서 호출)
+        이미 이전 세대를 연 다른 프로세스는 메모리 맵으로 잡아 둔 파일을 계속 읽을 수 있고,
+        지울 수 없는 파일(Windows에서 사용 중 등)은 다음 flush에서 다시 지웁니다.
+        """
+        for child in self.path.glob(self.GENERATION_PREFIX + "*"):
+            if child.is_dir() and child != self.generation:
+                shutil.rmtree(child, ignore_errors=True)
+        if self.generation != self.path:
+            for name in self.DATA_FILES:
+                try:
+                    (self.path / name).unlink(missing_ok=True)
+                except OSError:
+                    pass
+
+    def _clear_journal(self) -> None:
+        """
+        반영이 끝난 journal을 지웁니다. (lock을 잡은 상태에서 호출)
+        """
+        for name in (self.JOURNAL_VECTORS, self.JOURNAL_LOG):
+            (self.path / name).unlink(missing_ok=True)
+        self._pending = {}
+        self._deleted = set()
+        self._journal_rows = 0
+        self._journal_dim = None
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        path: str | Path = "numpy_store",
+        **kwargs,
+    ) -> "NumpyVectorStore":
+        """
+        텍스트 목록으로 저장소를 만듭니다.
+        """
+        options = ("dimensions", "quantization", "rescore", "rescore_multiplier")
+        store = cls(path, embedding=embedding, **{k: kwargs[k] for k in options if k in kwargs})
+        store.add_texts(texts, metadatas=metadatas, ids=kwargs.get("ids"))
+        return store